@@ -0,0 +1,409 @@
+# adjuntos.py
+# Almacenamiento de adjuntos: archivos sueltos en data/uploads mientras el periodo
+# está abierto y, para los periodos cerrados, paquetes mensuales en data/paquetes
+# (AAAA-MM.pack) con un índice de posiciones en la tabla adjuntos_paquetes.
+#
+# Un paquete es una secuencia de miembros (solo se agrega al final):
+#
+#   cabecera _CABECERA | ruta original (utf-8) | datos (zlib o tal cual)
+#
+# El índice guarda dónde empiezan los datos de cada miembro, así leer un adjunto es
+# un seek + un read, sin abrir ni recorrer el resto del paquete. La cabecera permite
+# reconstruir el índice a partir del paquete si hiciera falta.
+#
+#   python adjuntos.py empaquetar                     periodos anteriores al año en curso
+#   python adjuntos.py empaquetar --antes 2025-07-01 [--simular]
+#   python adjuntos.py revisar [--hilos 16] [--borrar-huerfanos] [--edad-horas 24]
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+DIR_UPLOADS = os.path.join("data", "uploads")
+DIR_PAQUETES = os.path.join("data", "paquetes")
+LOTE = 500
+
+_MAGIA = b"GEA1"
+_CABECERA = struct.Struct("<4sHBQQ32s")   # magia, largo ruta, método, largo, largo comprimido, sha256
+_METODOS = {"raw": 0, "zlib": 1}
+_COMPRIMIR_SI_AHORRA = 0.95                # PDF/JPG ya vienen comprimidos: se guardan tal cual
+
+
+# ---- Lectura ----
+def ubicar(archivos):
+    """{archivo: ubicación en paquete} de los adjuntos que ya no están sueltos (una consulta)."""
+    from ge_db import ubicar_adjuntos
+
+    faltan = [a for a in archivos if a and not os.path.exists(a)]
+    return ubicar_adjuntos(faltan) if faltan else {}
+
+
+def leer(archivo, ubicacion=None):
+    """Contenido del adjunto: del archivo suelto o, con `ubicacion`, de su paquete."""
+    if ubicacion is None:
+        with open(archivo, "rb") as f:
+            return f.read()
+    with open(os.path.join(DIR_PAQUETES, ubicacion["paquete"]), "rb") as f:
+        f.seek(int(ubicacion["inicio"]))
+        datos = f.read(int(ubicacion["largo_comprimido"]))
+    if ubicacion["metodo"] == "zlib":
+        datos = zlib.decompress(datos)
+    return datos
+
+
+# ---- Empaquetado ----
+def _nombre_paquete(fecha):
+    return f"{fecha:%Y-%m}.pack"
+
+
+def _agregar(paquete, archivos):
+    """
+    Agrega los archivos al final del paquete (fsync antes de volver).
+    Devuelve (filas de índice, archivos empaquetados, bytes originales, bytes escritos).
+    """
+    os.makedirs(DIR_PAQUETES, exist_ok=True)
+    filas, hechos, entrada, salida = [], [], 0, 0
+    with open(os.path.join(DIR_PAQUETES, paquete), "ab") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        for archivo in archivos:
+            try:
+                with open(archivo, "rb") as src:
+                    datos = src.read()
+            except OSError:
+                continue    # falta el archivo: lo reporta la revisión de integridad
+
+            digest = hashlib.sha256(datos).digest()
+            comprimido = zlib.compress(datos, 6)
+            metodo = "zlib" if len(comprimido) < len(datos) * _COMPRIMIR_SI_AHORRA else "raw"
+            cuerpo = comprimido if metodo == "zlib" else datos
+            ruta = archivo.encode("utf-8")
+
+            f.write(_CABECERA.pack(_MAGIA, len(ruta), _METODOS[metodo], len(datos), len(cuerpo), digest))
+            f.write(ruta)
+            inicio = pos + _CABECERA.size + len(ruta)
+            f.write(cuerpo)
+            pos = inicio + len(cuerpo)
+
+            filas.append((archivo, paquete, inicio, len(cuerpo), len(datos), metodo, digest.hex()))
+            hechos.append(archivo)
+            entrada += len(datos)
+            salida += len(cuerpo)
+        f.flush()
+        os.fsync(f.fileno())
+    return filas, hechos, entrada, salida
+
+
+def _borrar_sueltos(archivos):
+    for a in archivos:
+        try:
+            os.remove(a)
+        except OSError:
+            pass
+
+
+def _limpiar_ya_empaquetados():
+    """Sueltos que quedaron tras un corte entre registrar el índice y borrarlos."""
+    from ge_db import listar_empaquetados
+
+    n, despues = 0, ""
+    while True:
+        filas = listar_empaquetados(despues)
+        if not filas:
+            return n
+        despues = filas[-1]["archivo"]
+        for r in filas:
+            if os.path.exists(r["archivo"]) and _sha256(r["archivo"]) == r["sha256"]:
+                _borrar_sueltos([r["archivo"]])
+                n += 1
+
+
+def _sha256(path):
+    from duplicados import sha256_archivo
+    return sha256_archivo(path)
+
+
+class _Cerrojo:
+    """Un solo empaquetador a la vez (los paquetes solo admiten un escritor)."""
+
+    def __init__(self):
+        self.ruta = os.path.join(DIR_PAQUETES, ".empaquetando")
+
+    def __enter__(self):
+        os.makedirs(DIR_PAQUETES, exist_ok=True)
+        try:
+            self.fd = os.open(self.ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise RuntimeError(f"Ya hay un empaquetado en curso (o quedó {self.ruta} de uno interrumpido).")
+        return self
+
+    def __exit__(self, *exc):
+        os.close(self.fd)
+        os.remove(self.ruta)
+
+
+def empaquetar(corte, simular=False, lote=LOTE):
+    """
+    Mueve a paquetes mensuales los adjuntos de movimientos anteriores a `corte`.
+    Orden seguro ante cortes: datos al paquete (fsync) -> índice en la BD -> borrar
+    el suelto. Hasta que el índice está confirmado se sigue leyendo el suelto.
+    """
+    from ge_db import adjuntos_por_empaquetar, registrar_empaquetados
+
+    if corte > date.today().replace(day=1):
+        raise ValueError(f"El corte {corte} incluye el mes en curso.")
+
+    resumen = {"archivos": 0, "paquetes": set(), "bytes_originales": 0, "bytes_empaquetados": 0}
+    with _Cerrojo():
+        despues = ""
+        while True:
+            filas = adjuntos_por_empaquetar(corte, despues, lote)
+            if not filas:
+                break
+            despues = filas[-1]["archivo"]
+
+            por_paquete = defaultdict(list)
+            for r in filas:
+                por_paquete[_nombre_paquete(r["fecha_hora"])].append(r["archivo"])
+
+            if simular:
+                for paquete, archivos in por_paquete.items():
+                    existentes = [a for a in archivos if os.path.exists(a)]
+                    resumen["archivos"] += len(existentes)
+                    resumen["paquetes"].add(paquete)
+                    resumen["bytes_originales"] += sum(os.path.getsize(a) for a in existentes)
+                continue
+
+            indice, hechos = [], []
+            for paquete, archivos in por_paquete.items():
+                filas_idx, empaquetados, entrada, salida = _agregar(paquete, archivos)
+                indice += filas_idx
+                hechos += empaquetados
+                if empaquetados:
+                    resumen["paquetes"].add(paquete)
+                resumen["bytes_originales"] += entrada
+                resumen["bytes_empaquetados"] += salida
+
+            registrar_empaquetados(indice)
+            _borrar_sueltos(hechos)
+            resumen["archivos"] += len(hechos)
+
+        if not simular:
+            resumen["sueltos_limpiados"] = _limpiar_ya_empaquetados()
+
+    resumen["paquetes"] = len(resumen["paquetes"])
+    return resumen
+
+
+# ---- Integridad y huérfanos ----
+# Las rutas referenciadas llegan de la BD por lotes (cursor sin buffer) y cada
+# archivo se verifica en un pool de hilos mientras sigue la lectura: hashlib y la
+# E/S sueltan el GIL, así el sha256 usa todos los núcleos sin copiar datos entre
+# procesos. A lo sumo EN_VUELO_POR_HILO tareas por hilo esperan en cola.
+EN_VUELO_POR_HILO = 8
+EDAD_MIN_HUERFANO_HORAS = 24   # un adjunto recién subido aún puede estar en el diario local
+
+
+def _clave(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _examinar(archivo, ubicacion):
+    """(estado, sha256, bytes): estado "ok" | "falta" | "corrupto"."""
+    from duplicados import sha256_archivo
+
+    if os.path.exists(archivo):
+        sha = sha256_archivo(archivo)
+        if sha is None:
+            return "falta", None, 0
+        return "ok", sha, os.path.getsize(archivo)
+    if ubicacion is None:
+        return "falta", None, 0
+    try:
+        datos = leer(archivo, ubicacion)
+    except FileNotFoundError:
+        return "falta", None, 0
+    except (OSError, zlib.error):
+        return "corrupto", None, 0
+    sha = hashlib.sha256(datos).hexdigest()
+    return ("ok" if sha == ubicacion["sha256"] else "corrupto"), sha, len(datos)
+
+
+class _Pool:
+    """ThreadPoolExecutor con cola acotada; los resultados quedan en self.resultados[clave]."""
+
+    def __init__(self, hilos):
+        self.ex = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="adjuntos")
+        self.limite = hilos * EN_VUELO_POR_HILO
+        self.en_vuelo = {}          # future -> clave
+        self.enviadas = set()
+        self.resultados = {}
+
+    def enviar(self, clave, fn, *args):
+        if clave in self.enviadas:
+            return
+        self.enviadas.add(clave)
+        while len(self.en_vuelo) >= self.limite:
+            self._recoger(FIRST_COMPLETED)
+        self.en_vuelo[self.ex.submit(fn, *args)] = clave
+
+    def _recoger(self, cuando):
+        hechos, _ = wait(list(self.en_vuelo), return_when=cuando)
+        for fut in hechos:
+            self.resultados[self.en_vuelo.pop(fut)] = fut.result()
+
+    def terminar(self):
+        if self.en_vuelo:
+            self._recoger(ALL_COMPLETED)
+        self.ex.shutdown()
+        return self.resultados
+
+
+def _indice_empaquetados():
+    from ge_db import listar_empaquetados
+
+    out, despues = {}, ""
+    while True:
+        filas = listar_empaquetados(despues)
+        if not filas:
+            return out
+        despues = filas[-1]["archivo"]
+        for r in filas:
+            out[r["archivo"]] = r
+
+
+def revisar(hilos=None, borrar_huerfanos=False, edad_min_horas=EDAD_MIN_HUERFANO_HORAS):
+    """
+    Verifica los adjuntos referenciados (existen y su contenido coincide con la
+    huella guardada o con el sha256 del paquete) y busca archivos en DIR_UPLOADS
+    que nadie referencia. Con borrar_huerfanos, los elimina. Devuelve el informe.
+    """
+    from diario_local import DIARIO
+    from duplicados import huella_adjuntos
+    from ge_db import iterar_adjuntos_referenciados
+
+    hilos = hilos or min(32, (os.cpu_count() or 1) * 2)
+    t0 = time.perf_counter()
+    empaquetados = _indice_empaquetados()
+
+    pool = _Pool(hilos)
+    movimientos = {}            # movimiento_id -> (huella de adjuntos, [archivos])
+    referenciados = set()
+    for lote in iterar_adjuntos_referenciados():
+        for mov_id, archivo, huella_adj in lote:
+            mov = movimientos.setdefault(mov_id, (huella_adj, []))
+            mov[1].append(archivo)
+            referenciados.add(_clave(archivo))
+            pool.enviar(("ref", archivo), _examinar, archivo, empaquetados.get(archivo))
+
+    # Sueltos que nadie referencia (ni la BD ni el diario local pendiente)
+    protegidos = referenciados | {_clave(a) for a in DIARIO.archivos_pendientes()}
+    limite_mtime = time.time() - edad_min_horas * 3600
+    candidatos = []
+    try:
+        entradas = list(os.scandir(DIR_UPLOADS))
+    except FileNotFoundError:
+        entradas = []
+    for e in entradas:
+        if not e.is_file() or _clave(e.path) in protegidos:
+            continue
+        if e.stat().st_mtime > limite_mtime:
+            continue
+        candidatos.append(e.path)
+        pool.enviar(("huerfano", e.path), _examinar, e.path, None)
+
+    resultados = pool.terminar()
+
+    faltan, corruptos = [], []
+    for (tipo, archivo), (estado, _, _) in resultados.items():
+        if tipo == "ref" and estado == "falta":
+            faltan.append(archivo)
+        elif tipo == "ref" and estado == "corrupto":
+            corruptos.append(archivo)
+
+    # Sueltos: el contenido se contrasta con la huella de adjuntos del movimiento
+    movimientos_corruptos = []
+    for mov_id, (huella_adj, archivos) in movimientos.items():
+        estados = [resultados[("ref", a)] for a in archivos]
+        if huella_adj is None or any(e[0] != "ok" for e in estados):
+            continue
+        if huella_adjuntos([e[1] for e in estados]) != huella_adj:
+            movimientos_corruptos.append(mov_id)
+
+    # Contenido repetido entre sueltos (referenciados o no)
+    por_sha = defaultdict(list)
+    for (tipo, archivo), (estado, sha, n) in resultados.items():
+        if estado == "ok" and os.path.exists(archivo):
+            por_sha[sha].append((archivo, n))
+    duplicados = [g for g in por_sha.values() if len(g) > 1]
+
+    huerfanos = [(a, resultados[("huerfano", a)][2]) for a in candidatos]
+    liberados = 0
+    if borrar_huerfanos:
+        for a, n in huerfanos:
+            try:
+                os.remove(a)
+                liberados += n
+            except OSError:
+                pass
+
+    return {
+        "referencias": sum(len(a) for _, a in movimientos.values()),
+        "archivos_verificados": len(resultados),
+        "faltan": sorted(faltan),
+        "corruptos": sorted(corruptos),
+        "movimientos_con_adjuntos_alterados": sorted(movimientos_corruptos),
+        "huerfanos": sorted(a for a, _ in huerfanos),
+        "bytes_huerfanos": sum(n for _, n in huerfanos),
+        "bytes_liberados": liberados,
+        "grupos_duplicados": len(duplicados),
+        "bytes_duplicados": sum(sum(n for _, n in g[1:]) for g in duplicados),
+        "hilos": hilos,
+        "segundos": round(time.perf_counter() - t0, 1),
+    }
+
+
+def _imprimir_informe(informe, maximo=20):
+    for k, v in informe.items():
+        if isinstance(v, list):
+            print(f"{k}: {len(v)}")
+            for x in v[:maximo]:
+                print(f"    {x}")
+            if len(v) > maximo:
+                print(f"    ... y {len(v) - maximo} más")
+        else:
+            print(f"{k}: {v}")
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Adjuntos: empaquetado de periodos cerrados e integridad")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("empaquetar")
+    p.add_argument("--antes", type=date.fromisoformat, default=date(date.today().year, 1, 1),
+                   help="fecha de corte AAAA-MM-DD (defecto: 1 de enero del año en curso)")
+    p.add_argument("--simular", action="store_true", help="solo informa qué se empaquetaría")
+
+    p = sub.add_parser("revisar")
+    p.add_argument("--hilos", type=int, default=None)
+    p.add_argument("--borrar-huerfanos", action="store_true")
+    p.add_argument("--edad-horas", type=float, default=EDAD_MIN_HUERFANO_HORAS,
+                   help="solo se consideran huérfanos los archivos más viejos que esto")
+
+    args = ap.parse_args(argv)
+    if args.cmd == "empaquetar":
+        for k, v in empaquetar(args.antes, simular=args.simular).items():
+            print(f"{k}: {v}")
+    else:
+        informe = revisar(args.hilos, borrar_huerfanos=args.borrar_huerfanos, edad_min_horas=args.edad_horas)
+        _imprimir_informe(informe)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,172 @@
+# auditoria.py
+# Rastro de auditoría de las escrituras (movimientos y usuarios) sin pagar una ida y
+# vuelta a MySQL por acción:
+#
+# - registrar() solo agrega el evento a una cola en memoria (microsegundos) y, si
+#   el lote está lleno, despierta al hilo escritor.
+# - El hilo escritor vacía la cola con INSERT multi-fila (commit en grupo) cada
+#   INTERVALO_SEG o al juntar LOTE eventos, a la tabla auditoria (solo inserción,
+#   particionada por mes; ver esquema/0009_auditoria.py).
+# - Si MySQL está caído (OperationalError), los eventos vuelven a la cola y se
+#   reintentan; la cola está acotada (MAX_COLA) y lo que se descarta queda contado
+#   en las métricas. Si MySQL rechaza el lote por sus datos, se reintenta de a un
+#   evento y el que vuelve a fallar se descarta (contado en `rechazados` y al log)
+#   en vez de trabar la cola para siempre. Tabla o columna faltante (migración sin
+#   aplicar) o conexión cerrada no son problemas del evento: se reintentan igual
+#   que MySQL caído.
+# - Al salir el proceso se vacía lo pendiente (atexit).
+#
+#   AUDITORIA.registrar("usuario.crear", "usuario", 42, usuario="admin", detalle={...})
+import atexit
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import metricas
+
+log = logging.getLogger(__name__)
+
+LOTE = 200
+INTERVALO_SEG = 1.0
+MAX_COLA = 50000
+
+
+class Auditoria:
+    def __init__(self, escribir=None, lote=LOTE, intervalo=INTERVALO_SEG, max_cola=MAX_COLA):
+        self._escribir = escribir     # fn(filas); por defecto ge_db.insertar_auditoria
+        self.lote = lote
+        self.intervalo = intervalo
+        self.max_cola = max_cola
+        self._cola = deque()
+        self._lock = threading.Lock()
+        self._vaciando = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self.escritos = 0
+        self.lotes = 0
+        self.descartados = 0      # cola llena
+        self.rechazados = 0       # MySQL no los acepta (datos inválidos)
+
+    # ---- Camino caliente ----
+    def registrar(self, accion, entidad, entidad_id=None, usuario=None, detalle=None):
+        evento = (datetime.now(), usuario, accion, entidad, entidad_id, detalle)
+        with self._lock:
+            if len(self._cola) >= self.max_cola:
+                self._cola.popleft()
+                self.descartados += 1
+            self._cola.append(evento)
+            lleno = len(self._cola) >= self.lote
+        if self._hilo is None:
+            self._iniciar()
+        if lleno:
+            self._despertar.set()
+
+    # ---- Escritura en grupo ----
+    def _tomar(self):
+        with self._lock:
+            n = min(self.lote, len(self._cola))
+            return [self._cola.popleft() for _ in range(n)]
+
+    def _devolver(self, eventos):
+        with self._lock:
+            self._cola.extendleft(reversed(eventos))
+
+    @staticmethod
+    def _fila(evento):
+        momento, usuario, accion, entidad, entidad_id, detalle = evento
+        if detalle is not None:
+            detalle = json.dumps(detalle, ensure_ascii=False, default=str)
+        return momento, usuario, accion, entidad, entidad_id, detalle
+
+    def vaciar(self):
+        """Escribe todo lo pendiente, lote a lote. False si MySQL falló (los eventos quedan en cola)."""
+        import pymysql
+
+        reintentables = (
+            pymysql.err.OperationalError,
+            pymysql.err.ProgrammingError,    # 1146/1054: migración 0009 sin aplicar
+            pymysql.err.InterfaceError,      # conexión cerrada
+            pymysql.err.InternalError,
+        )
+        escribir = self._escribir
+        if escribir is None:
+            from ge_db import insertar_auditoria as escribir
+
+        with self._vaciando:
+            while True:
+                eventos = self._tomar()
+                if not eventos:
+                    return True
+                try:
+                    escribir([self._fila(e) for e in eventos])
+                except reintentables:
+                    self._devolver(eventos)     # MySQL caído, conexión o esquema: el próximo ciclo reintenta
+                    return False
+                except (pymysql.err.DataError, pymysql.err.IntegrityError):
+                    # Algún evento del lote es rechazado: de a uno, en orden, para aislarlo
+                    for i, e in enumerate(eventos):
+                        try:
+                            escribir([self._fila(e)])
+                        except reintentables:
+                            self._devolver(eventos[i:])
+                            return False
+                        except (pymysql.err.DataError, pymysql.err.IntegrityError) as err:
+                            self.rechazados += 1
+                            log.warning("Evento de auditoría descartado (%s): %r", err, e)
+                            continue
+                        except Exception:
+                            self._devolver(eventos[i:])
+                            raise
+                        self.escritos += 1
+                        self.lotes += 1
+                    continue
+                except Exception:
+                    self._devolver(eventos)     # desconocido: no se pierde nada; _bucle reintenta
+                    raise
+                self.escritos += len(eventos)
+                self.lotes += 1
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                self.vaciar()
+            except Exception:
+                pass    # el siguiente ciclo lo vuelve a intentar
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="auditoria", daemon=True)
+        self._hilo.start()
+
+    def pendientes(self):
+        return len(self._cola)
+
+
+AUDITORIA = Auditoria()
+
+
+def _al_salir():
+    try:
+        AUDITORIA.vaciar()
+    except Exception:
+        pass
+
+
+def _metricas_auditoria():
+    return [
+        ("ge_auditoria_pendientes", {}, AUDITORIA.pendientes()),
+        ("ge_auditoria_escritos_total", {}, AUDITORIA.escritos),
+        ("ge_auditoria_lotes_total", {}, AUDITORIA.lotes),
+        ("ge_auditoria_descartados_total", {}, AUDITORIA.descartados),
+        ("ge_auditoria_rechazados_total", {}, AUDITORIA.rechazados),
+    ]
+
+
+atexit.register(_al_salir)
+metricas.registrar_recolector(_metricas_auditoria)
@@ -1,7 +1,10 @@
 # auth.py
+import uuid
 import streamlit as st
 from login_view import login_screen   # 👈 antes era from login import ...
 from utils import apply_base_ui
+import metricas
+import perfil
 
 def require_login():
     if "auth" not in st.session_state:
@@ -10,6 +13,16 @@ def require_login():
     if st.session_state.auth is None:
         st.switch_page("pages/login.py")
 
+    # Identifica la sesión ante ge_db (lecturas en réplica salvo tras escribir)
+    from ge_db import set_sesion
+
+    if "_db_sesion" not in st.session_state:
+        st.session_state["_db_sesion"] = uuid.uuid4().hex
+    set_sesion(st.session_state["_db_sesion"], (st.session_state.auth or {}).get("usuario"))
+
+    metricas.iniciar_servidor()   # una vez por proceso (GE_METRICS_PORT)
+    perfil.iniciar_rerun()
+
 # (lo demás igual)
 
 def require_roles(*roles):
@@ -30,6 +43,10 @@ def sidebar_session():
         st.success(f"{nombre}\n\nRol: {rol}")
         st.divider()
 
+        if rol == "ADMIN":
+            perfil.controles()
+            st.divider()
+
         if st.button("Cerrar sesión", key="btn_logout"):
             st.session_state.clear()
             st.rerun()
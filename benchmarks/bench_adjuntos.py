@@ -0,0 +1,50 @@
+# benchmarks/bench_adjuntos.py
+# Verificación de adjuntos: sha256 de N archivos sintéticos en serie contra el pool
+# de hilos de adjuntos.revisar (mismo _examinar, cola acotada).
+#
+# Uso:  python benchmarks/bench_adjuntos.py [archivos] [kb_por_archivo]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adjuntos
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 2000
+    kb = int(argv[1]) if len(argv) > 1 else 256
+    carpeta = tempfile.mkdtemp(prefix="bench_adjuntos_")
+    try:
+        bloque = os.urandom(kb * 1024)
+        rutas = []
+        for i in range(n):
+            ruta = os.path.join(carpeta, f"adj_{i}.pdf")
+            with open(ruta, "wb") as f:
+                f.write(bloque[i % 97:] + bloque[:i % 97])
+            rutas.append(ruta)
+        print(f"{n} archivos de {kb} KB ({n * kb / 1024:.0f} MB), {os.cpu_count()} núcleos\n")
+
+        t = time.perf_counter()
+        for r in rutas:
+            adjuntos._examinar(r, None)
+        serie = time.perf_counter() - t
+        print(f"    en serie           {serie:7.2f} s   {n / serie:8.0f} archivos/s")
+
+        for hilos in (4, min(32, (os.cpu_count() or 1) * 2)):
+            t = time.perf_counter()
+            pool = adjuntos._Pool(hilos)
+            for r in rutas:
+                pool.enviar(r, adjuntos._examinar, r, None)
+            pool.terminar()
+            dt = time.perf_counter() - t
+            print(f"    pool {hilos:2d} hilos      {dt:7.2f} s   {n / dt:8.0f} archivos/s   x{serie / dt:.1f}")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,72 @@
+# benchmarks/bench_auditoria.py
+# Costo de auditar las escrituras: varios hilos "guardan" (ida y vuelta simulada a
+# MySQL) y auditan cada acción de tres formas:
+#   sin auditoría | fila síncrona (una ida y vuelta más) | auditoria.Auditoria (cola + commit en grupo)
+#
+# Uso:  python benchmarks/bench_auditoria.py [escrituras_por_hilo] [hilos]
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auditoria import Auditoria
+
+IDA_Y_VUELTA_SEG = 0.001       # commit de una fila en MySQL local
+POR_FILA_SEG = 0.00001         # costo extra por fila de un INSERT multi-fila
+
+
+def escribir_mysql(filas):
+    time.sleep(IDA_Y_VUELTA_SEG + POR_FILA_SEG * len(filas))
+
+
+def escenario(modo, n, hilos):
+    aud = Auditoria(escribir=escribir_mysql, intervalo=0.05)
+    costos = []
+    lock = threading.Lock()
+
+    def trabajador(h):
+        propios = []
+        for i in range(n):
+            time.sleep(IDA_Y_VUELTA_SEG * 2)            # guardar_movimiento (commit)
+            t = time.perf_counter()
+            if modo == "síncrona":
+                escribir_mysql([None])
+            elif modo == "cola":
+                aud.registrar("movimiento.crear", "movimiento", h * n + i, usuario="bench",
+                              detalle={"lineas": 3, "total_debito_cent": 12345})
+            propios.append(time.perf_counter() - t)
+        with lock:
+            costos.extend(propios)
+
+    t0 = time.perf_counter()
+    ts = [threading.Thread(target=trabajador, args=(h,)) for h in range(hilos)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    total = time.perf_counter() - t0
+    aud.vaciar()
+
+    costos.sort()
+    return {
+        "escrituras/s": round(n * hilos / total),
+        "auditar p50 (µs)": round(costos[len(costos) // 2] * 1e6, 1),
+        "auditar p99 (µs)": round(costos[int(len(costos) * 0.99)] * 1e6, 1),
+        "INSERT a MySQL": n * hilos if modo == "síncrona" else aud.lotes,
+    }
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 500
+    hilos = int(argv[1]) if len(argv) > 1 else 8
+    print(f"{hilos} hilos x {n} escrituras\n")
+    for modo in ("sin auditoría", "síncrona", "cola"):
+        print(f"{modo}:")
+        for k, v in escenario(modo, n, hilos).items():
+            print(f"    {k:20s} {v}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
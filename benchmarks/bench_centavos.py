@@ -0,0 +1,56 @@
+# benchmarks/bench_centavos.py
+# Totales de importes: como llegaban antes (Decimal por fila desde DictCursor,
+# decimal128 en Arrow) contra centavos int64 (BIGINT) con pyarrow.compute.
+# También mide el paso a unidades que se hace solo para mostrar.
+#
+# Uso:  python benchmarks/bench_centavos.py [filas]
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dinero import a_unidades, tabla_a_unidades, total_columna
+
+
+def medir(fn, repeticiones=5):
+    mejor = None
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        r = fn()
+        dt = time.perf_counter() - t
+        mejor = dt if mejor is None else min(mejor, dt)
+    return mejor, r
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 1_000_000
+    centavos = [(i * 3701) % 10_000_000 for i in range(n)]
+    decimales = [Decimal(c) / 100 for c in centavos]          # lo que devolvía pymysql
+    filas = [{"Débito": d} for d in decimales]
+    t_dec = pa.table({"Débito": pa.array(decimales, pa.decimal128(14, 2))})
+    t_int = pa.table({"Débito": pa.array(centavos, pa.int64())})
+
+    casos = [
+        ("dicts + Decimal (sum)", lambda: sum(f["Débito"] for f in filas)),
+        ("Arrow decimal128 (pc.sum)", lambda: pc.sum(t_dec.column("Débito")).as_py()),
+        ("Arrow int64 centavos", lambda: a_unidades(total_columna(t_int, "Débito"))),
+        ("int64 -> unidades (mostrar)", lambda: tabla_a_unidades(t_int, ["Débito"]).num_rows),
+    ]
+    print(f"{n:,} filas\n")
+    totales = set()
+    for nombre, fn in casos[:3]:
+        dt, r = medir(fn)
+        totales.add(Decimal(r).quantize(Decimal("0.01")))
+        print(f"    {nombre:30s} {dt * 1000:9.1f} ms   total={r}")
+    dt, _ = medir(casos[3][1])
+    print(f"    {casos[3][0]:30s} {dt * 1000:9.1f} ms")
+    print("\nMismo total en todos:", len(totales) == 1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,93 @@
+# benchmarks/bench_columnar.py
+# Compara la lectura actual (DictCursor -> lista de dicts -> pd.DataFrame)
+# con la lectura columnar (tuplas por lote -> columnas Arrow) sin tocar la BD:
+# las filas se generan con la misma forma que devuelve listar_movimientos.
+#
+# Uso:  python benchmarks/bench_columnar.py [filas]
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pyarrow as pa
+
+from ge_db import columnas_desde_lotes, LOTE_COLUMNAR
+
+NOMBRES = ["id", "Fecha", "Cliente", "Empresa", "Banco", "Débito", "Crédito", "Estado"]
+TIPOS = [pa.int64(), pa.date32(), pa.string(), pa.string(), pa.string(),
+         pa.int64(), pa.int64(), pa.string()]      # importes en centavos (BIGINT)
+
+
+def filas_simuladas(n, lote):
+    """Genera tuplas como las entrega un cursor sin buffer, en lotes."""
+    base = date(2026, 1, 1)
+    filas = []
+    for i in range(n):
+        filas.append((
+            i + 1,
+            base + timedelta(days=i % 365),
+            f"Cliente {i % 5000}",
+            f"Empresa {i % 40}",
+            f"Banco {i % 12}",
+            ((i * 37) % 100000) * 100 + i % 100,
+            0,
+            "OK",
+        ))
+        if len(filas) == lote:
+            yield filas
+            filas = []
+    if filas:
+        yield filas
+
+
+def via_dicts(n):
+    rows = []
+    for lote in filas_simuladas(n, LOTE_COLUMNAR):
+        rows.extend(dict(zip(NOMBRES, f)) for f in lote)   # lo que hace DictCursor
+    return pd.DataFrame(rows)
+
+
+def via_columnar(n):
+    tabla = columnas_desde_lotes(NOMBRES, TIPOS, filas_simuladas(n, LOTE_COLUMNAR))
+    return tabla.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def medir(fn, n):
+    # Tiempo sin tracemalloc (lo distorsiona); memoria en una segunda pasada
+    t0 = time.perf_counter()
+    df = fn(n)
+    dt = time.perf_counter() - t0
+    assert len(df) == n
+    del df
+
+    pool = pa.default_memory_pool()
+    arrow_antes = pool.bytes_allocated()
+    tracemalloc.start()
+    df = fn(n)
+    _, pico_py = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow = pool.bytes_allocated() - arrow_antes
+    del df
+    return dt, pico_py + max(arrow, 0)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"Filas: {n:,}")
+    print(f"{'modo':<12}{'tiempo (s)':>12}{'memoria pico (MB)':>20}")
+    res = {}
+    for nombre, fn in [("dicts", via_dicts), ("columnar", via_columnar)]:
+        dt, mem = medir(fn, n)
+        res[nombre] = (dt, mem)
+        print(f"{nombre:<12}{dt:>12.3f}{mem / 1e6:>20.1f}")
+
+    (t_d, m_d), (t_c, m_c) = res["dicts"], res["columnar"]
+    print(f"\ncolumnar: {t_c / t_d:.0%} del tiempo y {m_c / m_d:.0%} de la memoria de dicts")
+
+
+if __name__ == "__main__":
+    main()
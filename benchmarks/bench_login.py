@@ -0,0 +1,117 @@
+# benchmarks/bench_login.py
+# Ataque simulado contra el login: varios hilos prueban claves erróneas (sobre un
+# usuario real y sobre usuarios inventados) mientras un usuario legítimo entra cada
+# cierto tiempo. Se compara sin freno y con limite_login.LIMITADOR.
+#
+# autenticar se simula sin BD: 1 ms de "ida y vuelta" + el coste de bcrypt
+# (bcrypt real si está instalado, si no pbkdf2 con un coste parecido).
+#
+# Uso:  python benchmarks/bench_login.py [segundos] [hilos_atacantes]
+import hashlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limite_login import LimitadorLogin
+
+try:
+    import bcrypt
+
+    _HASH = bcrypt.hashpw(b"clave-buena", bcrypt.gensalt(rounds=10))
+
+    def _checkpw(pw):
+        return bcrypt.checkpw(pw, _HASH)
+except ImportError:
+    def _checkpw(pw):
+        return hashlib.pbkdf2_hmac("sha256", pw, b"sal", 60000) == hashlib.pbkdf2_hmac(
+            "sha256", b"clave-buena", b"sal", 60000
+        )
+
+USUARIOS = {"ana"}
+_bcrypt = [0]
+
+
+def autenticar(usuario, clave):
+    """(user|None, motivo) como ge_db.autenticar(..., con_motivo=True)."""
+    time.sleep(0.001)
+    if usuario not in USUARIOS:
+        return None, "no_existe"
+    _bcrypt[0] += 1
+    if _checkpw(clave):
+        return {"usuario": usuario}, "ok"
+    return None, "clave"
+
+
+def intento(limitador, usuario, clave, ip, contador):
+    if limitador is not None:
+        estado, _ = limitador.permitir(usuario, ip)
+        if estado != "ok":
+            if estado == "desconocido":
+                limitador.registrar(usuario, ip, "no_existe")
+            contador["frenados"] += 1
+            return None
+    contador["costosos"] += 1
+    user, motivo = autenticar(usuario, clave)
+    if limitador is not None:
+        limitador.registrar(usuario, ip, motivo)
+    return user
+
+
+def escenario(limitador, segundos, hilos):
+    contador = {"costosos": 0, "frenados": 0}
+    _bcrypt[0] = 0
+    fin = time.monotonic() + segundos
+    latencias, fallidos_legitimo = [], [0]
+
+    def atacante(n):
+        i = 0
+        while time.monotonic() < fin:
+            usuario = "ana" if i % 2 == 0 else f"inventado{n}_{i % 50}"
+            intento(limitador, usuario, b"mala%d" % i, f"10.0.0.{n}", contador)
+            i += 1
+            time.sleep(0.002)   # coste mínimo de una petición/rerun del atacante
+
+    def legitimo():
+        while time.monotonic() < fin:
+            t = time.perf_counter()
+            user = intento(limitador, "ana", b"clave-buena", "192.168.1.10", contador)
+            latencias.append(time.perf_counter() - t)
+            if user is None:
+                fallidos_legitimo[0] += 1
+            time.sleep(0.5)
+
+    cpu0 = time.process_time()
+    ts = [threading.Thread(target=atacante, args=(n,)) for n in range(hilos)]
+    ts.append(threading.Thread(target=legitimo))
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    cpu = time.process_time() - cpu0
+
+    lat = sorted(latencias) or [0]
+    return {
+        "intentos con BD": contador["costosos"],
+        "bcrypt ejecutados": _bcrypt[0],
+        "intentos frenados": contador["frenados"],
+        "CPU (s)": round(cpu, 2),
+        "legítimo p50 (ms)": round(lat[len(lat) // 2] * 1000, 1),
+        "legítimo rechazado": f"{fallidos_legitimo[0]}/{len(latencias)}",
+    }
+
+
+def main(argv):
+    segundos = float(argv[0]) if argv else 5
+    hilos = int(argv[1]) if len(argv) > 1 else 8
+    print(f"{hilos} atacantes, {segundos:.0f} s\n")
+    for nombre, lim in (("sin freno", None), ("con limite_login", LimitadorLogin())):
+        print(f"{nombre}:")
+        for k, v in escenario(lim, segundos, hilos).items():
+            print(f"    {k:26s} {v}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
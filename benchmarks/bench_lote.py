@@ -0,0 +1,108 @@
+# benchmarks/bench_lote.py
+# Carga de N egresos chicos: uno por transacción (como guardar_movimiento) contra
+# guardar_movimientos_lote (una transacción, INSERT multi-fila por tabla).
+# Usa ge_db._insertar_movimientos real sobre un cursor que simula la ida y vuelta a
+# MySQL, así que cuenta sentencias y tiempo de red, no el trabajo del servidor.
+#
+# Uso:  python benchmarks/bench_lote.py [movimientos] [lineas_por_movimiento]
+import itertools
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ge_db
+
+IDA_Y_VUELTA_SEG = 0.0005      # sentencia contra MySQL en la LAN
+POR_FILA_SEG = 0.000005        # costo extra por fila de un INSERT multi-fila
+COMMIT_SEG = 0.001             # fsync del redo log
+
+
+class CursorSimulado:
+    def __init__(self):
+        self.sentencias = 0
+        self.lastrowid = None
+        self._ids = itertools.count(1)
+        self._por_uuid = {}
+        self._filas = []
+
+    def _ida(self, filas=1):
+        self.sentencias += 1
+        time.sleep(IDA_Y_VUELTA_SEG + POR_FILA_SEG * filas)
+
+    def execute(self, sql, params=()):
+        if "INSERT INTO movimientos" in sql:
+            uuids = list(params)[6::7]
+            for u in uuids:
+                self.lastrowid = next(self._ids)
+                self._por_uuid[u] = self.lastrowid
+            self._ida(len(uuids))
+        elif sql.lstrip().startswith("SELECT"):
+            self._filas = [{"origen_uuid": u, "id": self._por_uuid[u]} for u in params]
+            self._ida()
+        else:
+            self._ida()    # UPDATE periodos_cierre (cierres desactualizados)
+
+    def executemany(self, sql, filas):
+        self._ida(len(filas))    # pymysql junta las filas en un solo INSERT
+
+    def fetchall(self):
+        return self._filas
+
+    def commit(self):
+        self.sentencias += 1
+        time.sleep(COMMIT_SEG)
+
+
+def movimientos(n, lineas):
+    return [
+        {
+            "fecha_dt": datetime(2026, 3, 1 + i % 28, 10, 0, 0),
+            "debito": 0,
+            "credito": 1500 * lineas,
+            "lineas": [
+                {"Cuenta": 510 + j, "Descripción": "taxi", "debito_cent": 0,
+                 "credito_cent": 1500, "Notas": "", "archivo": None}
+                for j in range(lineas)
+            ],
+            "cliente_id": 1, "empresa_id": 1, "banco_id": 1,
+            "origen_uuid": uuid.uuid4().hex,
+        }
+        for i in range(n)
+    ]
+
+
+def uno_por_uno(items):
+    cur = CursorSimulado()
+    for it in items:
+        ge_db._insertar_movimientos(cur, [it])
+        cur.commit()
+    return cur.sentencias
+
+
+def en_lote(items):
+    cur = CursorSimulado()
+    ge_db._insertar_movimientos(cur, items)
+    cur.commit()
+    return cur.sentencias
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    lineas = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    items = movimientos(n, lineas)
+
+    print(f"{n} movimientos de {lineas} líneas")
+    print(f"{'modo':<14}{'sentencias':>12}{'ms':>10}{'mov/s':>10}")
+    for nombre, fn in (("uno por uno", uno_por_uno), ("lote", en_lote)):
+        t = time.perf_counter()
+        sentencias = fn(items)
+        seg = time.perf_counter() - t
+        print(f"{nombre:<14}{sentencias:>12}{seg * 1000:>10.1f}{n / seg:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/perfil_arranque.py
+# Perfil de arranque de cada página: importa en un proceso nuevo lo que la página
+# importa a nivel de módulo (sin ejecutar Streamlit) y mide con `-X importtime`.
+# Sirve para vigilar que pandas, openpyxl, bcrypt o pymysql no vuelvan a cargarse
+# antes del primer pintado (login y app.py sobre todo).
+#
+# Uso:  python benchmarks/perfil_arranque.py [top]
+import ast
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ["pandas", "pyarrow", "openpyxl", "bcrypt", "pymysql"]
+
+
+def imports_de(ruta):
+    """Sentencias import de nivel de módulo de un archivo, como código ejecutable.
+    Cada una va en su try: si falta una dependencia se informa y se sigue con las demás."""
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read())
+    bloques = []
+    for n in arbol.body:
+        if isinstance(n, (ast.Import, ast.ImportFrom)):
+            bloques.append(
+                f"try:\n    {ast.unparse(n)}\n"
+                "except ImportError as e:\n    print('FALTA', e.name, file=sys.stderr)"
+            )
+    return "import sys\n" + "\n".join(bloques)
+
+
+def medir(codigo):
+    """[(cumulativo_us, modulo)] de primer nivel + conjunto de módulos cargados."""
+    r = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    arriba, cargados, faltan = [], set(), set()
+    for linea in r.stderr.splitlines():
+        if linea.startswith("FALTA "):
+            faltan.add(linea.split()[1])
+            continue
+        if not linea.startswith("import time:") or "[us]" in linea:
+            continue
+        _, acum, nombre = linea.split("|", 2)
+        nombre = nombre[1:]                        # un espacio fijo tras "|"; el resto es anidamiento
+        cargados.add(nombre.strip().split(".")[0])
+        if not nombre.startswith(" "):            # nivel 0: lo importó la página
+            arriba.append((int(acum), nombre.strip()))
+    return arriba, cargados, faltan
+
+
+def main(argv):
+    top = int(argv[0]) if argv else 5
+    paginas = ["app.py"] + sorted(
+        os.path.join("pages", f) for f in os.listdir(os.path.join(RAIZ, "pages")) if f.endswith(".py")
+    )
+
+    base, _, _ = medir("import sys")
+    base_us = sum(us for us, _ in base)   # intérprete + site: se descuenta de cada página
+
+    for pagina in paginas:
+        arriba, cargados, faltan = medir(imports_de(os.path.join(RAIZ, pagina)))
+        total = sum(us for us, _ in arriba) - base_us
+        pesados = [m for m in PESADOS if m in cargados]
+        print(f"{pagina:28s} {total / 1000:8.1f} ms  pesados: {', '.join(pesados) or '-'}")
+        if faltan:
+            print(f"    (no instalado: {', '.join(sorted(faltan))}; esa parte no se midió)")
+        vistos = {n for _, n in base}
+        for us, nombre in sorted(arriba, reverse=True)[:top]:
+            if nombre not in vistos:
+                print(f"    {us / 1000:8.1f} ms  {nombre}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
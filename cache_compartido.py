@@ -0,0 +1,167 @@
+# cache_compartido.py
+# Backend de caché compartido entre procesos del mismo servidor (varios Streamlit
+# detrás de un proxy). Es un archivo SQLite en modo WAL con mmap: sin servicios
+# externos, una sola copia para N workers e invalidación atómica (transacción).
+#
+# Misma interfaz que cache_consultas.CacheRangos: obtener / guardar / invalidar /
+# version / incrementar_version / estadisticas.
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+RUTA_DEFECTO = os.path.join("data", "cache", "compartido.sqlite")
+
+_ESQUEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS entradas (
+        clave TEXT PRIMARY KEY,
+        valor BLOB NOT NULL,
+        bytes INTEGER NOT NULL,
+        desde TEXT NULL,
+        hasta TEXT NULL,
+        usado REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_entradas_usado ON entradas (usado)",
+    "CREATE TABLE IF NOT EXISTS versiones (nombre TEXT PRIMARY KEY, valor INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS invalidaciones (t REAL NOT NULL, desde TEXT NULL, hasta TEXT NULL)",
+]
+
+# Condición de solape con [?, ?] (NULL = sin límite); fechas ISO se comparan como texto
+_SOLAPA = "((desde IS NULL OR ? IS NULL OR desde <= ?) AND (? IS NULL OR hasta IS NULL OR ? <= hasta))"
+
+
+class CacheRangosCompartido:
+    def __init__(self, ruta=RUTA_DEFECTO, max_bytes=64 * 1024 * 1024, margen_seg=5.0):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.margen_seg = margen_seg
+        self._local = threading.local()
+        self.aciertos = 0
+        self.fallos = 0
+
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        con = self._con()
+        with con:
+            for ddl in _ESQUEMA:
+                con.execute(ddl)
+
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute(f"PRAGMA mmap_size={self.max_bytes * 2}")
+            self._local.con = con
+        return con
+
+    @staticmethod
+    def _clave(clave):
+        return repr(clave)
+
+    @staticmethod
+    def _iso(v):
+        if v is None:
+            return None
+        if isinstance(v, datetime):
+            v = v.date()
+        return v.isoformat() if isinstance(v, date) else str(v)[:10]
+
+    def obtener(self, clave):
+        """(True, valor) si está; (False, momento) para pasar luego a guardar()."""
+        con = self._con()
+        k = self._clave(clave)
+        fila = con.execute("SELECT valor, usado FROM entradas WHERE clave = ?", (k,)).fetchone()
+        ahora = time.time()
+        if fila is None:
+            self.fallos += 1
+            return False, ahora
+        if fila[1] < ahora - 5:   # no escribir en cada lectura
+            con.execute("UPDATE entradas SET usado = ? WHERE clave = ?", (ahora, k))
+        self.aciertos += 1
+        return True, pickle.loads(fila[0])
+
+    def guardar(self, clave, valor, desde, hasta, inicio):
+        blob = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        d, h = self._iso(desde), self._iso(hasta)
+
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            # ¿Alguien escribió en el rango mientras se leía?
+            choque = con.execute(
+                f"SELECT 1 FROM invalidaciones WHERE t >= ? AND {_SOLAPA} LIMIT 1",
+                (inicio - self.margen_seg, h, h, d, d),
+            ).fetchone()
+            if choque:
+                con.execute("ROLLBACK")
+                return
+
+            con.execute(
+                "INSERT OR REPLACE INTO entradas (clave, valor, bytes, desde, hasta, usado) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._clave(clave), blob, len(blob), d, h, time.time()),
+            )
+
+            # LRU: desalojar los menos usados hasta quedar bajo el límite
+            total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM entradas").fetchone()[0]
+            if total > self.max_bytes:
+                for k, nb in con.execute("SELECT clave, bytes FROM entradas ORDER BY usado").fetchall():
+                    con.execute("DELETE FROM entradas WHERE clave = ?", (k,))
+                    total -= nb
+                    if total <= self.max_bytes:
+                        break
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+
+    def invalidar(self, desde=None, hasta=None):
+        """Borra en una transacción las entradas que se solapan con [desde, hasta] (None = todo)."""
+        d, h = self._iso(desde), self._iso(hasta)
+        ahora = time.time()
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.execute(f"DELETE FROM entradas WHERE {_SOLAPA}", (h, h, d, d))
+            con.execute("INSERT INTO invalidaciones (t, desde, hasta) VALUES (?, ?, ?)", (ahora, d, h))
+            con.execute("DELETE FROM invalidaciones WHERE t < ?", (ahora - 60 - self.margen_seg,))
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+
+    def version(self, nombre):
+        fila = self._con().execute("SELECT valor FROM versiones WHERE nombre = ?", (nombre,)).fetchone()
+        return fila[0] if fila else 0
+
+    def incrementar_version(self, nombre):
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.execute(
+                "INSERT INTO versiones (nombre, valor) VALUES (?, 1) "
+                "ON CONFLICT(nombre) DO UPDATE SET valor = valor + 1",
+                (nombre,),
+            )
+            valor = con.execute("SELECT valor FROM versiones WHERE nombre = ?", (nombre,)).fetchone()[0]
+            con.execute("COMMIT")
+            return valor
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+
+    def estadisticas(self):
+        n, total = self._con().execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entradas").fetchone()
+        return {
+            "entradas": n,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
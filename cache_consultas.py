@@ -0,0 +1,142 @@
+# cache_consultas.py
+# Caché de resultados de consultas por rango de fechas (Consultar / Detalle).
+#
+# - Clave: nombre de la consulta + parámetros normalizados.
+# - Memoria acotada (bytes estimados) con desalojo LRU.
+# - guardar_movimiento invalida solo las entradas cuyo rango contiene la fecha escrita
+#   (las que no dependen de fechas usan FUERA_DE_RANGO).
+# - Una lectura que empezó antes de una invalidación que la afecta no se guarda
+#   (evita dejar en caché datos viejos leídos en paralelo a una escritura o de una réplica atrasada).
+#
+# Backend: GE_CACHE_BACKEND=compartido (defecto, ver cache_compartido.py: una copia
+# para todos los procesos del servidor) o memoria (solo este proceso).
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import date, datetime
+
+MAX_BYTES = int(float(os.environ.get("GE_CACHE_MB", "64")) * 1024 * 1024)
+
+# Rango de las entradas que no dependen de fechas (catálogos: la versión va en la
+# clave). No se solapa con ninguna fecha escrita, así que guardar un movimiento no
+# las borra ni impide guardarlas; solo invalidar() sin rango las quita.
+FUERA_DE_RANGO = date.min
+
+
+def a_fecha(v):
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return date.fromisoformat(str(v)[:10])
+
+
+def tamano_aprox(valor) -> int:
+    if hasattr(valor, "nbytes"):          # pyarrow.Table / ndarray
+        n = valor.nbytes
+        return int(n() if callable(n) else n)
+    if isinstance(valor, list):
+        if not valor:
+            return 64
+        fila = valor[0]
+        por_fila = sys.getsizeof(fila)
+        if isinstance(fila, dict):
+            por_fila += sum(sys.getsizeof(v) for v in fila.values())
+        return 64 + len(valor) * por_fila
+    return sys.getsizeof(valor)
+
+
+class CacheRangos:
+    def __init__(self, max_bytes=MAX_BYTES, margen_seg=5.0):
+        self.max_bytes = max_bytes
+        self.margen_seg = margen_seg          # retraso máximo esperado de una réplica
+        self._datos = OrderedDict()           # clave -> (valor, bytes, desde, hasta)
+        self._bytes = 0
+        self._invalidaciones = deque()        # (momento, desde, hasta)
+        self._versiones = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def _solapa(a_desde, a_hasta, b_desde, b_hasta):
+        # None = sin límite por ese lado
+        return (a_desde is None or b_hasta is None or a_desde <= b_hasta) and \
+               (b_desde is None or a_hasta is None or b_desde <= a_hasta)
+
+    def obtener(self, clave):
+        """(True, valor) si está en caché; (False, momento) para pasar luego a guardar()."""
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None:
+                self.fallos += 1
+                return False, time.monotonic()
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return True, item[0]
+
+    def guardar(self, clave, valor, desde, hasta, inicio):
+        desde, hasta = a_fecha(desde), a_fecha(hasta)
+        n = tamano_aprox(valor)
+        if n > self.max_bytes:
+            return
+        with self._lock:
+            # ¿Hubo una escritura en el rango mientras se leía?
+            for t, i_desde, i_hasta in self._invalidaciones:
+                if t >= inicio - self.margen_seg and self._solapa(desde, hasta, i_desde, i_hasta):
+                    return
+
+            viejo = self._datos.pop(clave, None)
+            if viejo:
+                self._bytes -= viejo[1]
+            self._datos[clave] = (valor, n, desde, hasta)
+            self._bytes += n
+
+            while self._bytes > self.max_bytes and self._datos:
+                _, (_, nb, _, _) = self._datos.popitem(last=False)
+                self._bytes -= nb
+
+    def invalidar(self, desde=None, hasta=None):
+        """Quita las entradas cuyo rango se solapa con [desde, hasta] (None = todo)."""
+        desde, hasta = a_fecha(desde), a_fecha(hasta)
+        ahora = time.monotonic()
+        with self._lock:
+            self._invalidaciones.append((ahora, desde, hasta))
+            while self._invalidaciones and self._invalidaciones[0][0] < ahora - 60 - self.margen_seg:
+                self._invalidaciones.popleft()
+
+            for clave in [k for k, (_, _, d, h) in self._datos.items() if self._solapa(d, h, desde, hasta)]:
+                _, nb, _, _ = self._datos.pop(clave)
+                self._bytes -= nb
+
+    def version(self, nombre):
+        return self._versiones.get(nombre, 0)
+
+    def incrementar_version(self, nombre):
+        with self._lock:
+            self._versiones[nombre] = self._versiones.get(nombre, 0) + 1
+            return self._versiones[nombre]
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
+
+
+def _crear_cache():
+    if os.environ.get("GE_CACHE_BACKEND", "compartido") == "memoria":
+        return CacheRangos()
+    from cache_compartido import CacheRangosCompartido, RUTA_DEFECTO
+    return CacheRangosCompartido(os.environ.get("GE_CACHE_RUTA", RUTA_DEFECTO), max_bytes=MAX_BYTES)
+
+
+CACHE = _crear_cache()
@@ -0,0 +1,89 @@
+# catalogo_busqueda.py
+# Índice en memoria para buscar en catálogos (clientes, empresas, bancos, cuentas)
+# mientras el usuario escribe. Solo se envían al navegador los primeros resultados.
+import unicodedata
+from bisect import bisect_left
+
+
+def normalizar(texto) -> str:
+    """Minúsculas, sin acentos y con espacios colapsados."""
+    t = unicodedata.normalize("NFKD", str(texto or ""))
+    t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    return " ".join(t.lower().split())
+
+
+def etiqueta_catalogo(row: dict) -> str:
+    return f'{row["nombre"]} (ID {row["id"]})'
+
+
+class IndiceCatalogo:
+    """
+    Índice de prefijos/subcadenas sobre los nombres de un catálogo.
+
+    - Prefijo: búsqueda binaria sobre las palabras ordenadas (O(log n) + k).
+    - Subcadena: solo si el prefijo no llena el límite, recorre los nombres normalizados.
+    """
+
+    def __init__(self, filas, etiqueta=etiqueta_catalogo):
+        self.filas = list(filas or [])
+        self.etiquetas = [etiqueta(r) for r in self.filas]
+        self.por_etiqueta = {lab: r for lab, r in zip(self.etiquetas, self.filas)}
+
+        self._nombres = [normalizar(lab) for lab in self.etiquetas]
+
+        # (palabra, posición) ordenado -> cualquier palabra del nombre sirve de prefijo
+        palabras = []
+        for i, nombre in enumerate(self._nombres):
+            for p in set(nombre.split()):
+                palabras.append((p, i))
+        palabras.sort()
+        self._palabras = palabras
+
+    def __len__(self):
+        return len(self.filas)
+
+    def id_de(self, etiqueta):
+        row = self.por_etiqueta.get(etiqueta)
+        return row["id"] if row else None
+
+    def fila(self, etiqueta):
+        return self.por_etiqueta.get(etiqueta)
+
+    def buscar(self, texto: str, limite: int = 20) -> list:
+        """Devuelve hasta `limite` etiquetas que coinciden con `texto`."""
+        q = normalizar(texto)
+        if not q:
+            return self.etiquetas[:limite]
+
+        terminos = q.split()
+        primero = terminos[0]
+        resto = terminos[1:]
+
+        vistos = set()
+        out = []
+
+        # 1) Prefijo del primer término sobre cualquier palabra
+        pos = bisect_left(self._palabras, (primero, -1))
+        while pos < len(self._palabras) and len(out) < limite:
+            palabra, i = self._palabras[pos]
+            if not palabra.startswith(primero):
+                break
+            if i not in vistos and all(t in self._nombres[i] for t in resto):
+                vistos.add(i)
+                out.append(i)
+            pos += 1
+
+        # 2) Subcadena (solo si faltan resultados)
+        if len(out) < limite:
+            for i, nombre in enumerate(self._nombres):
+                if i in vistos:
+                    continue
+                if all(t in nombre for t in terminos):
+                    vistos.add(i)
+                    out.append(i)
+                    if len(out) >= limite:
+                        break
+
+        # Los que empiezan por el texto completo van primero
+        out.sort(key=lambda i: (not self._nombres[i].startswith(q), self._nombres[i]))
+        return [self.etiquetas[i] for i in out]
@@ -0,0 +1,185 @@
+# cierres.py
+# Cierre de períodos: instantánea mensual del saldo acumulado por cuenta, empresa y
+# banco (tabla saldos_cierre, esquema/0010_saldos_cierre.py). ge_db.saldo / saldos
+# parten del último cierre vigente y suman solo lo movido después.
+#
+#   python cierres.py cerrar [--hasta 2026-09]     cierra los meses completos pendientes
+#   python cierres.py recerrar [--desde 2026-03]   rehace cierres (movimientos tardíos)
+#   python cierres.py estado
+#
+# Cada cierre arrastra el saldo del mes anterior, así que se cierran en orden y sin
+# huecos desde el mes del primer movimiento. Un movimiento guardado con fecha en un
+# mes cerrado marca ese cierre y los siguientes como no vigentes
+# (ge_db._insertar_movimientos); cerrar rehace primero esos.
+import argparse
+import sys
+from datetime import date, timedelta
+
+from ge_db import AMBITOS_SALDO, fecha_primer_movimiento, get_connection, sql_actividad
+
+
+def _mes(texto):
+    """'AAAA-MM' (o una fecha) -> primer día del mes."""
+    if isinstance(texto, date):
+        return texto.replace(day=1)
+    anio, mes = str(texto)[:7].split("-")
+    return date(int(anio), int(mes), 1)
+
+
+def _siguiente(periodo):
+    return (periodo + timedelta(days=32)).replace(day=1)
+
+
+def _anterior(periodo):
+    return (periodo - timedelta(days=1)).replace(day=1)
+
+
+def _cerrar_periodo(cursor, periodo):
+    """Instantánea de `periodo` = la del mes anterior + lo movido en el mes."""
+    # Primero la fila del período: una escritura concurrente en este mes queda
+    # esperando el commit y después lo marca como no vigente
+    cursor.execute(
+        """
+        INSERT INTO periodos_cierre (periodo, vigente, cerrado_en) VALUES (%s, 1, NOW())
+        ON DUPLICATE KEY UPDATE vigente = 1, cerrado_en = NOW()
+        """,
+        (periodo,),
+    )
+    cursor.execute("DELETE FROM saldos_cierre WHERE periodo = %s", (periodo,))
+    filas = 0
+    for ambito in AMBITOS_SALDO:
+        filas += cursor.execute(
+            f"""
+            INSERT INTO saldos_cierre (periodo, ambito, ambito_id, debito_cent, credito_cent, saldo_cent)
+            SELECT %s, %s, ambito_id, SUM(debito_cent), SUM(credito_cent), SUM(saldo_cent)
+            FROM (
+                SELECT ambito_id, 0 AS debito_cent, 0 AS credito_cent, saldo_cent
+                FROM saldos_cierre
+                WHERE periodo = %s AND ambito = %s
+                UNION ALL
+                SELECT ambito_id, debito_cent, credito_cent, debito_cent - credito_cent AS saldo_cent
+                FROM ({sql_actividad(ambito, periodo)}) a
+            ) t
+            GROUP BY ambito_id
+            """,
+            (periodo, ambito, _anterior(periodo), ambito, periodo, _siguiente(periodo)),
+        )
+    return filas
+
+
+def _cerrados(cursor):
+    cursor.execute("SELECT periodo, vigente FROM periodos_cierre ORDER BY periodo")
+    return [(r["periodo"], bool(r["vigente"])) for r in cursor.fetchall()]
+
+
+def _rehacer(conn, cursor, periodos):
+    for p in periodos:
+        n = _cerrar_periodo(cursor, p)
+        conn.commit()    # un mes por transacción: no retiene bloqueos de todo el rango
+        print(f"{p:%Y-%m}: {n} saldos")
+    return len(periodos)
+
+
+def recerrar(desde=None):
+    """Rehace los cierres desde `desde` (por defecto el primero no vigente) hasta el último."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cerrados = _cerrados(cursor)
+            if desde is None:
+                no_vigentes = [p for p, vigente in cerrados if not vigente]
+                if not no_vigentes:
+                    print("Todos los cierres están vigentes.")
+                    return 0
+                desde = no_vigentes[0]
+            if not cerrados:
+                print("Sin cierres.")
+                return 0
+            desde = _mes(desde)
+            if desde <= cerrados[0][0]:
+                # Un movimiento tardío anterior al primer cierre adelanta el comienzo
+                desde = min(cerrados[0][0], _mes(fecha_primer_movimiento()))
+
+            periodos, p = [], desde
+            while p <= cerrados[-1][0]:
+                periodos.append(p)
+                p = _siguiente(p)
+            return _rehacer(conn, cursor, periodos)
+    finally:
+        conn.close()
+
+
+def cerrar(hasta=None):
+    """
+    Cierra los meses completos pendientes hasta `hasta` (por defecto el mes pasado),
+    rehaciendo antes los cierres no vigentes.
+    """
+    hasta = _mes(hasta) if hasta else _anterior(date.today().replace(day=1))
+    if hasta >= date.today().replace(day=1):
+        raise ValueError(f"El mes {hasta:%Y-%m} no está completo.")
+
+    recerrar()
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cerrados = _cerrados(cursor)
+            if cerrados:
+                p = _siguiente(cerrados[-1][0])
+            else:
+                primero = fecha_primer_movimiento()
+                if primero is None:
+                    print("No hay movimientos.")
+                    return 0
+                p = _mes(primero)
+
+            pendientes = []
+            while p <= hasta:
+                pendientes.append(p)
+                p = _siguiente(p)
+            if not pendientes:
+                print(f"Nada que cerrar hasta {hasta:%Y-%m}.")
+            return _rehacer(conn, cursor, pendientes)
+    finally:
+        conn.close()
+
+
+def estado():
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cerrados = _cerrados(cursor)
+    finally:
+        conn.close()
+    if not cerrados:
+        print("Sin cierres.")
+        return
+    print(f"Cerrado desde {cerrados[0][0]:%Y-%m} hasta {cerrados[-1][0]:%Y-%m}")
+    no_vigentes = [p for p, vigente in cerrados if not vigente]
+    if no_vigentes:
+        print("No vigentes (recerrar): " + ", ".join(f"{p:%Y-%m}" for p in no_vigentes))
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Cierres de período (saldos por cuenta, empresa y banco)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("cerrar")
+    p.add_argument("--hasta", help="AAAA-MM (por defecto el mes pasado)")
+
+    p = sub.add_parser("recerrar")
+    p.add_argument("--desde", help="AAAA-MM (por defecto el primer cierre no vigente)")
+
+    sub.add_parser("estado")
+
+    args = ap.parse_args(argv)
+    if args.cmd == "cerrar":
+        cerrar(args.hasta)
+    elif args.cmd == "recerrar":
+        recerrar(args.desde)
+    else:
+        estado()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,168 @@
+# conciliacion.py
+# Lectura de extractos bancarios (CSV/XLSX) y cruce contra movimientos.
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from dinero import a_centavos
+
+# Nombres de columna aceptados en el extracto (ya normalizados)
+COLS_FECHA = ["fecha", "date", "fecha_valor", "fecha_operacion"]
+COLS_MONTO = ["monto", "importe", "valor", "amount"]
+COLS_CARGO = ["debito", "cargo", "retiro"]      # salidas del banco
+COLS_ABONO = ["credito", "abono", "deposito"]   # entradas al banco
+COLS_DESC = ["descripcion", "concepto", "detalle", "glosa"]
+COLS_REF = ["referencia", "documento", "ref", "numero"]
+
+
+def _norm_col(c) -> str:
+    from catalogo_busqueda import normalizar
+    return normalizar(c).replace(" ", "_")
+
+
+def _primera(cols, candidatos):
+    for c in candidatos:
+        if c in cols:
+            return c
+    return None
+
+
+def _a_fecha(v):
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return v.date() if hasattr(v, "date") else v
+
+
+_VACIOS = {"", "-", "--", "—", "–"}
+
+
+def _a_decimal(texto) -> Decimal:
+    """
+    Monto tal como viene en el extracto -> Decimal. Acepta 1.234,56 y 1,234.56,
+    negativos contables "(10,00)" y con signo al final "10,00-". Vacío o un guion
+    solo ("-", típico de celdas sin importe) valen 0.
+    """
+    s = texto.strip()
+    negativo = bool(re.search(r"\(.*\d.*\)", s))
+    s = re.sub(r"[^\d,.\-]", "", s)
+    if s.endswith("-") and not s.startswith("-"):
+        negativo, s = True, s[:-1]
+    if not s.strip("-"):
+        if texto.strip() in _VACIOS:
+            return Decimal(0)
+        raise InvalidOperation(texto)
+    if re.search(r",\d{1,2}$", s):
+        s = s.replace(".", "").replace(",", ".")    # 1.234,56 -> 1234.56
+    else:
+        s = s.replace(",", "")                      # 1,234.56 -> 1234.56
+    d = Decimal(s)
+    return -d if negativo else d
+
+
+def leer_extracto(archivo, nombre: str) -> list:
+    """
+    Devuelve [{fecha, monto_cent, descripcion, referencia}] con el monto en
+    centavos, firmado desde el punto de vista del banco (abono positivo, cargo negativo).
+    """
+    import pandas as pd
+
+    if nombre.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(archivo, dtype=str)
+    else:
+        df = pd.read_csv(archivo, dtype=str, sep=None, engine="python")
+
+    df.columns = [_norm_col(c) for c in df.columns]
+    cols = set(df.columns)
+
+    c_fecha = _primera(cols, COLS_FECHA)
+    if not c_fecha:
+        raise ValueError("El extracto no tiene columna de fecha.")
+
+    def numero(col):
+        valores = []
+        # Fila 1 es el encabezado
+        for fila, v in enumerate(df[col].fillna("").astype(str), start=2):
+            try:
+                valores.append(_a_decimal(v))
+            except InvalidOperation:
+                raise ValueError(f"Fila {fila}: monto inválido en la columna '{col}': {v!r}.") from None
+        return valores
+
+    c_monto = _primera(cols, COLS_MONTO)
+    c_cargo = _primera(cols, COLS_CARGO)
+    c_abono = _primera(cols, COLS_ABONO)
+    if c_monto:
+        montos = numero(c_monto)
+    elif c_cargo or c_abono:
+        cargos = numero(c_cargo) if c_cargo else [Decimal(0)] * len(df)
+        abonos = numero(c_abono) if c_abono else [Decimal(0)] * len(df)
+        montos = [a - abs(c) for c, a in zip(cargos, abonos)]
+    else:
+        raise ValueError("El extracto no tiene columna de monto (o débito/crédito).")
+
+    fechas = pd.to_datetime(df[c_fecha], dayfirst=True, errors="coerce")
+    c_desc = _primera(cols, COLS_DESC)
+    c_ref = _primera(cols, COLS_REF)
+    descs = df[c_desc].fillna("").tolist() if c_desc else [""] * len(df)
+    refs = df[c_ref].fillna("").tolist() if c_ref else [""] * len(df)
+
+    lineas = []
+    for f, m, d, r in zip(fechas, montos, descs, refs):
+        if pd.isna(f):
+            continue
+        lineas.append({
+            "fecha": f.date(),
+            "monto_cent": a_centavos(m),
+            "descripcion": str(d)[:255],
+            "referencia": str(r)[:100],
+        })
+    return lineas
+
+
+def conciliar(lineas: list, movimientos: list, tolerancia_dias: int = 3):
+    """
+    Cruza líneas de extracto con movimientos: hash por monto en centavos y,
+    dentro de cada monto, merge por fecha (ambos ordenados) con tolerancia.
+    O(n log n) por el ordenamiento; cada movimiento se usa una sola vez.
+
+    Marca `movimiento_id` en las líneas conciliadas y devuelve
+    (n_conciliadas, lineas_pendientes, movimientos_pendientes).
+    """
+    tol = timedelta(days=int(tolerancia_dias))
+
+    movs_por_monto = defaultdict(list)
+    for m in movimientos:
+        movs_por_monto[int(m["monto_cent"])].append(m)
+
+    lineas_por_monto = defaultdict(list)
+    for l in lineas:
+        l["movimiento_id"] = None
+        lineas_por_monto[int(l["monto_cent"])].append(l)
+
+    usados = set()
+    n = 0
+    for cent, grupo in lineas_por_monto.items():
+        candidatos = movs_por_monto.get(cent)
+        if not candidatos:
+            continue
+
+        grupo.sort(key=lambda l: l["fecha"])
+        candidatos.sort(key=lambda m: (_a_fecha(m["fecha"]), m["id"]))
+
+        j = 0
+        for l in grupo:
+            # Los movimientos anteriores a la ventana tampoco sirven para las líneas siguientes
+            while j < len(candidatos) and _a_fecha(candidatos[j]["fecha"]) < l["fecha"] - tol:
+                j += 1
+            if j < len(candidatos) and _a_fecha(candidatos[j]["fecha"]) <= l["fecha"] + tol:
+                l["movimiento_id"] = candidatos[j]["id"]
+                usados.add(candidatos[j]["id"])
+                n += 1
+                j += 1
+
+    lineas_pend = [l for l in lineas if l["movimiento_id"] is None]
+    movs_pend = [m for m in movimientos if m["id"] not in usados]
+    return n, lineas_pend, movs_pend
@@ -0,0 +1,263 @@
+# diario_local.py
+# Diario local (SQLite, WAL) delante de guardar_movimiento: Enviar confirma en disco
+# local en microsegundos y un sincronizador en segundo plano lo pasa a MySQL.
+#
+# - Orden: las entradas se reproducen por id local, en lotes de una transacción
+#   (ge_db.aplicar_diario). Si MySQL no responde, el lote se reintenta más tarde
+#   sin saltarse ninguna.
+# - Idempotencia: cada entrada lleva un uuid que se guarda en movimientos.origen_uuid;
+#   un lote que se confirmó en MySQL pero no se llegó a marcar aquí no se duplica.
+# - Una entrada que MySQL rechaza por sus datos queda en ERROR y no bloquea a las demás;
+#   se puede corregir (vuelve a PENDIENTE) o descartar (DESCARTADO).
+#
+#   python diario_local.py            sincroniza lo pendiente y sale
+#   python diario_local.py --estado   resumen del diario
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import metricas
+
+RUTA_DEFECTO = os.path.join("data", "diario", "movimientos.sqlite")
+LOTE = 50
+INTERVALO_SEG = 5.0
+
+PENDIENTE, SINCRONIZADO, ERROR, DESCARTADO = "PENDIENTE", "SINCRONIZADO", "ERROR", "DESCARTADO"
+
+_ESQUEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS diario (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        uuid TEXT NOT NULL UNIQUE,
+        creado REAL NOT NULL,
+        usuario TEXT NULL,
+        datos TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        intentos INTEGER NOT NULL DEFAULT 0,
+        error TEXT NULL,
+        movimiento_id INTEGER NULL,
+        sincronizado REAL NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_diario_estado ON diario (estado, id)",
+]
+
+
+class Diario:
+    def __init__(self, ruta=RUTA_DEFECTO):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._sync_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        con = self._con()
+        with con:
+            for ddl in _ESQUEMA:
+                con.execute(ddl)
+
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=FULL")   # lo confirmado sobrevive a un corte de luz
+            self._local.con = con
+        return con
+
+    # ---- Escritura (Enviar) ----
+    def encolar(self, datos: dict, usuario=None):
+        """Guarda el movimiento en el diario. Devuelve (id_local, uuid)."""
+        u = uuid.uuid4().hex
+        cur = self._con().execute(
+            "INSERT INTO diario (uuid, creado, usuario, datos, estado) VALUES (?, ?, ?, ?, ?)",
+            (u, time.time(), usuario, json.dumps(datos, ensure_ascii=False), PENDIENTE),
+        )
+        self._despertar.set()
+        return cur.lastrowid, u
+
+    # ---- Sincronización ----
+    def _pendientes(self, limite):
+        return self._con().execute(
+            "SELECT id, uuid, usuario, datos FROM diario WHERE estado = ? ORDER BY id LIMIT ?",
+            (PENDIENTE, limite),
+        ).fetchall()
+
+    def _marcar(self, ids_por_uuid):
+        ahora = time.time()
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")
+        for u, mov_id in ids_por_uuid.items():
+            con.execute(
+                "UPDATE diario SET estado = ?, movimiento_id = ?, sincronizado = ?, error = NULL "
+                "WHERE uuid = ?",
+                (SINCRONIZADO, mov_id, ahora, u),
+            )
+        con.execute("COMMIT")
+
+    def _fallo(self, fila, error, definitivo):
+        self._con().execute(
+            "UPDATE diario SET intentos = intentos + 1, error = ?, estado = ? WHERE id = ?",
+            (str(error)[:500], ERROR if definitivo else PENDIENTE, fila["id"]),
+        )
+
+    def sincronizar(self, lote=LOTE):
+        """
+        Pasa a MySQL todo lo pendiente, en orden. Devuelve cuántas entradas quedaron
+        sincronizadas, o None si ya hay una pasada en curso en este proceso.
+        """
+        import pymysql
+        from ge_db import aplicar_diario
+
+        if not self._sync_lock.acquire(blocking=False):
+            return None     # ya hay una pasada en curso (p. ej. el hilo de fondo)
+        try:
+            total = 0
+            while True:
+                filas = self._pendientes(lote)
+                if not filas:
+                    return total
+                entradas = [(f["uuid"], dict(json.loads(f["datos"]), usuario=f["usuario"])) for f in filas]
+                try:
+                    ids = aplicar_diario(entradas)
+                except pymysql.err.OperationalError:
+                    return total    # MySQL caído o lento: se reintenta en la próxima pasada
+                except Exception:
+                    # Algún dato del lote es rechazado: de a una, en orden, para aislarlo
+                    for f, e in zip(filas, entradas):
+                        try:
+                            ids = aplicar_diario([e])
+                        except pymysql.err.OperationalError:
+                            return total
+                        except Exception as err:
+                            self._fallo(f, err, definitivo=True)
+                            continue
+                        self._marcar(ids)
+                        total += 1
+                    continue
+                self._marcar(ids)
+                total += len(ids)
+        finally:
+            self._sync_lock.release()
+
+    def reintentar_errores(self):
+        return self._con().execute(
+            "UPDATE diario SET estado = ? WHERE estado = ?", (PENDIENTE, ERROR)
+        ).rowcount
+
+    # ---- Entradas con error ----
+    def obtener(self, id_local):
+        f = self._con().execute(
+            "SELECT id, uuid, usuario, datos, estado, error FROM diario WHERE id = ?", (id_local,)
+        ).fetchone()
+        return dict(f, datos=json.loads(f["datos"])) if f else None
+
+    def corregir(self, id_local, datos: dict):
+        """Reemplaza los datos de una entrada en ERROR y la vuelve a PENDIENTE. False si no estaba en ERROR."""
+        n = self._con().execute(
+            "UPDATE diario SET datos = ?, estado = ?, error = NULL WHERE id = ? AND estado = ?",
+            (json.dumps(datos, ensure_ascii=False), PENDIENTE, id_local, ERROR),
+        ).rowcount
+        if n:
+            self._despertar.set()
+        return bool(n)
+
+    def descartar(self, id_local):
+        """Una entrada en ERROR que no se va a guardar: sus adjuntos dejan de estar protegidos."""
+        return bool(self._con().execute(
+            "UPDATE diario SET estado = ? WHERE id = ? AND estado = ?", (DESCARTADO, id_local, ERROR)
+        ).rowcount)
+
+    def errores(self, limite=50):
+        filas = self._con().execute(
+            "SELECT id, creado, usuario, intentos, error FROM diario WHERE estado = ? ORDER BY id LIMIT ?",
+            (ERROR, limite),
+        ).fetchall()
+        return [dict(f) for f in filas]
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(INTERVALO_SEG)
+            self._despertar.clear()
+            try:
+                self.sincronizar()
+            except Exception:
+                pass    # el siguiente ciclo lo vuelve a intentar
+
+    def iniciar_sincronizador(self):
+        """Hilo de fondo (uno por proceso) que vacía el diario cada INTERVALO_SEG o al encolar."""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._bucle, name="diario_local", daemon=True)
+            self._hilo.start()
+        return self._hilo
+
+    def archivos_pendientes(self):
+        """Adjuntos de entradas que aún no están en MySQL (no son huérfanos aunque la BD no los nombre)."""
+        out = set()
+        for (datos,) in self._con().execute(
+            "SELECT datos FROM diario WHERE estado IN (?, ?)", (PENDIENTE, ERROR)
+        ):
+            for l in json.loads(datos).get("lineas", []):
+                if l.get("archivo"):
+                    out.add(l["archivo"])
+        return out
+
+    # ---- Estado ----
+    def estado(self):
+        con = self._con()
+        conteo = {r["estado"]: r["n"] for r in con.execute(
+            "SELECT estado, COUNT(*) AS n FROM diario GROUP BY estado"
+        )}
+        antiguo = con.execute(
+            "SELECT MIN(creado) FROM diario WHERE estado = ?", (PENDIENTE,)
+        ).fetchone()[0]
+        return {
+            "pendientes": conteo.get(PENDIENTE, 0),
+            "sincronizados": conteo.get(SINCRONIZADO, 0),
+            "errores": conteo.get(ERROR, 0),
+            "descartados": conteo.get(DESCARTADO, 0),
+            "pendiente_mas_antiguo_seg": (time.time() - antiguo) if antiguo else None,
+        }
+
+    def ultimas(self, limite=50):
+        filas = self._con().execute(
+            """
+            SELECT id, uuid, creado, usuario, estado, intentos, error, movimiento_id, sincronizado
+            FROM diario ORDER BY id DESC LIMIT ?
+            """,
+            (limite,),
+        ).fetchall()
+        return [dict(f) for f in filas]
+
+
+DIARIO = Diario(os.environ.get("GE_DIARIO_RUTA", RUTA_DEFECTO))
+
+
+def _metricas_diario():
+    e = DIARIO.estado()
+    return [
+        ("ge_diario_entradas", {"estado": "pendiente"}, e["pendientes"]),
+        ("ge_diario_entradas", {"estado": "error"}, e["errores"]),
+        ("ge_diario_pendiente_antiguedad_segundos", {}, e["pendiente_mas_antiguo_seg"] or 0),
+    ]
+
+
+def main(argv):
+    if "--estado" not in argv:
+        n = DIARIO.sincronizar()
+        print("Ya hay una sincronización en curso." if n is None else f"Sincronizadas: {n}")
+    for k, v in DIARIO.estado().items():
+        print(f"{k}: {v}")
+
+
+metricas.registrar_recolector(_metricas_diario)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,70 @@
+# dinero.py
+# Los importes viajan como enteros de centavos (BIGINT en la BD, int64 en Arrow,
+# int en Python): sumas exactas y reducciones vectorizadas sin Decimal ni float.
+# Solo se pasa a unidades (Decimal / texto) para mostrar.
+from decimal import Decimal, ROUND_HALF_UP
+
+_CENTAVO = Decimal("0.01")
+
+
+def a_centavos(v) -> int:
+    """Importe en unidades (Decimal, str, float, int) -> centavos, redondeo comercial."""
+    if v is None or v == "":
+        return 0
+    d = v if isinstance(v, Decimal) else Decimal(str(v))
+    if d != d:   # NaN
+        return 0
+    return int(d.quantize(_CENTAVO, rounding=ROUND_HALF_UP) * 100)
+
+
+def a_unidades(centavos) -> Decimal:
+    return (Decimal(int(centavos or 0)) / 100).quantize(_CENTAVO)
+
+
+def fmt_centavos(centavos) -> str:
+    try:
+        return f"{a_unidades(centavos):,.2f}"
+    except Exception:
+        return "0.00"
+
+
+def filas_a_unidades(filas, columnas):
+    """Para mostrar filas dict: {x}_cent -> {x} en Decimal (nuevas dicts)."""
+    out = []
+    for f in filas:
+        f = dict(f)
+        for c in columnas:
+            if c in f:
+                f[c[: -len("_cent")] if c.endswith("_cent") else c] = a_unidades(f.pop(c))
+        out.append(f)
+    return out
+
+
+def tabla_a_unidades(tabla, columnas):
+    """Para mostrar una pyarrow.Table: columnas int64 de centavos -> decimal(19,2).
+
+    Sin dividir: un decimal de escala 2 guarda justamente los centavos como entero,
+    así que basta con reinterpretar el valor (exacto, sin pasar por float).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for c in columnas:
+        if c not in tabla.column_names:
+            continue
+        i = tabla.column_names.index(c)
+        enteros = pc.cast(tabla.column(i), pa.decimal128(19, 0))
+        unidades = pa.chunked_array(
+            [t.view(pa.decimal128(19, 2)) for t in enteros.chunks], type=pa.decimal128(19, 2)
+        )
+        tabla = tabla.set_column(i, c, unidades)
+    return tabla
+
+
+def total_columna(tabla, columna) -> int:
+    """Suma exacta (int64) de una columna de centavos de una pyarrow.Table."""
+    import pyarrow.compute as pc
+
+    if columna not in tabla.column_names or tabla.num_rows == 0:
+        return 0
+    return int(pc.sum(tabla.column(columna)).as_py() or 0)
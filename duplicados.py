@@ -0,0 +1,101 @@
+# duplicados.py
+# Huella de un movimiento para detectar re-ingresos (misma factura cargada días después).
+#
+#   huella  = sha256(empresa | banco | cliente | total redondeado a unidades | cuentas ordenadas)
+#   periodo = días desde 1970 // VENTANA_DIAS  (se consulta periodo-1, periodo, periodo+1)
+#   adjuntos = sha256 de los hashes de archivos (independiente del orden)
+#
+# Uso batch:  python duplicados.py            (completa huellas y marca duplicados)
+#             python duplicados.py --reporte  (solo lista los marcados)
+import hashlib
+import sys
+from datetime import date, datetime
+
+VENTANA_DIAS = 7
+_EPOCH = date(1970, 1, 1)
+
+
+def sha256_bytes(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_archivo(path, bloque=1024 * 1024):
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(bloque), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def periodo(fecha) -> int:
+    if isinstance(fecha, str):
+        fecha = datetime.strptime(fecha, "%d/%m/%Y %H:%M:%S")
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    return (fecha - _EPOCH).days // VENTANA_DIAS
+
+
+def huella_movimiento(empresa_id, banco_id, cliente_id, total_cent, cuentas) -> str:
+    cuentas_txt = ",".join(sorted(str(c) for c in cuentas if c not in (None, "")))
+    # Mismo redondeo que cuando el total venía en unidades (las huellas guardadas siguen valiendo)
+    partes = [empresa_id, banco_id, cliente_id, round(int(total_cent or 0) / 100), cuentas_txt]
+    return sha256_bytes("|".join(str(p) for p in partes).encode("utf-8"))
+
+
+def huella_adjuntos(hashes):
+    hashes = sorted(h for h in hashes if h)
+    if not hashes:
+        return None
+    return sha256_bytes("|".join(hashes).encode("ascii"))
+
+
+def huellas_desde_lineas(empresa_id, banco_id, cliente_id, total_debito_cent, total_credito_cent, lineas):
+    """(huella, adjuntos) a partir de las líneas que recibe guardar_movimiento."""
+    total = max(int(total_debito_cent or 0), int(total_credito_cent or 0))
+    cuentas = [l.get("Cuenta") for l in lineas]
+    hashes = []
+    for l in lineas:
+        h = l.get("archivo_sha256")
+        if not h and l.get("archivo"):
+            h = sha256_archivo(l["archivo"])
+        hashes.append(h)
+    return huella_movimiento(empresa_id, banco_id, cliente_id, total, cuentas), huella_adjuntos(hashes)
+
+
+def main(argv):
+    from ge_db import (
+        movimientos_sin_huella,
+        guardar_huellas,
+        marcar_duplicados_historicos,
+        listar_duplicados_marcados,
+    )
+
+    if "--reporte" not in argv:
+        total = 0
+        while True:
+            movs = movimientos_sin_huella(limite=2000)
+            if not movs:
+                break
+            filas = []
+            for m in movs:
+                h, adj = huellas_desde_lineas(
+                    m["empresa_id"], m["banco_id"], m["cliente_id"],
+                    m["total_debito_cent"], m["total_credito_cent"], m["lineas"],
+                )
+                filas.append((m["id"], h, periodo(m["fecha_hora"]), adj))
+            guardar_huellas(filas)
+            total += len(filas)
+        print(f"Huellas calculadas: {total}")
+
+        n = marcar_duplicados_historicos()
+        print(f"Movimientos marcados como posible duplicado: {n}")
+
+    for r in listar_duplicados_marcados():
+        print(f'Movimiento {r["movimiento_id"]} ≈ {r["posible_duplicado_de"]} ({r["motivo"]})')
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
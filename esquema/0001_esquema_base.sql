@@ -0,0 +1,69 @@
+-- Esquema base. CREATE TABLE IF NOT EXISTS: en bases creadas a mano no cambia nada.
+
+CREATE TABLE IF NOT EXISTS roles (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(50) NOT NULL,
+    UNIQUE KEY ux_roles_nombre (nombre)
+);
+
+INSERT IGNORE INTO roles (nombre) VALUES
+    ('ADMIN'), ('ASISTENTE'), ('SOCIO'), ('CONTADOR'), ('CONSULTA');
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario VARCHAR(60) NOT NULL,
+    nombre VARCHAR(120) NULL,
+    password_hash VARCHAR(100) NOT NULL,
+    rol_id INT NOT NULL,
+    activo TINYINT NOT NULL DEFAULT 1,
+    UNIQUE KEY ux_usuarios_usuario (usuario),
+    KEY ix_usuarios_rol (rol_id)
+);
+
+CREATE TABLE IF NOT EXISTS clientes (
+    id_cli INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_cli VARCHAR(200) NOT NULL,
+    status_cli VARCHAR(20) NULL DEFAULT 'HABILITADO'
+);
+
+CREATE TABLE IF NOT EXISTS empresas (
+    id_emp INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_emp VARCHAR(200) NOT NULL,
+    status_emp VARCHAR(20) NULL DEFAULT 'HABILITADO'
+);
+
+CREATE TABLE IF NOT EXISTS bancos (
+    id_ban INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_ban VARCHAR(200) NOT NULL,
+    status_ban VARCHAR(20) NULL DEFAULT 'HABILITADO'
+);
+
+CREATE TABLE IF NOT EXISTS cuentas (
+    id_cue INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_cue VARCHAR(200) NOT NULL,
+    tipo_cue VARCHAR(20) NOT NULL,
+    status_cue VARCHAR(20) NULL DEFAULT 'HABILITADO'
+);
+
+CREATE TABLE IF NOT EXISTS movimientos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    fecha_hora DATETIME NOT NULL,
+    total_debito DECIMAL(14,2) NOT NULL DEFAULT 0,
+    total_credito DECIMAL(14,2) NOT NULL DEFAULT 0,
+    cliente_id INT NULL,
+    empresa_id INT NULL,
+    banco_id INT NULL,
+    creado_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS movimiento_detalle (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    movimiento_id INT NOT NULL,
+    fecha_hora DATETIME NOT NULL,
+    cuenta INT NULL,
+    descripcion VARCHAR(255) NOT NULL DEFAULT '',
+    debito DECIMAL(14,2) NOT NULL DEFAULT 0,
+    credito DECIMAL(14,2) NOT NULL DEFAULT 0,
+    notas VARCHAR(500) NOT NULL DEFAULT '',
+    archivo VARCHAR(500) NULL
+);
@@ -0,0 +1,23 @@
+-- Conciliación bancaria (extractos importados y sus líneas)
+
+CREATE TABLE IF NOT EXISTS extractos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    banco_id INT NOT NULL,
+    archivo VARCHAR(255) NOT NULL,
+    desde DATE NULL,
+    hasta DATE NULL,
+    creado_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY ix_extractos_banco (banco_id)
+);
+
+CREATE TABLE IF NOT EXISTS extracto_lineas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    extracto_id INT NOT NULL,
+    fecha DATE NOT NULL,
+    descripcion VARCHAR(255) NOT NULL DEFAULT '',
+    referencia VARCHAR(100) NOT NULL DEFAULT '',
+    monto DECIMAL(14,2) NOT NULL,
+    movimiento_id INT NULL,
+    KEY ix_extracto_lineas_extracto (extracto_id),
+    KEY ix_extracto_lineas_mov (movimiento_id)
+);
@@ -0,0 +1,12 @@
+-- Índice de huellas para detectar movimientos duplicados (ver duplicados.py)
+
+CREATE TABLE IF NOT EXISTS movimiento_huellas (
+    movimiento_id INT PRIMARY KEY,
+    huella CHAR(64) NOT NULL,
+    periodo INT NOT NULL,
+    adjuntos CHAR(64) NULL,
+    posible_duplicado_de INT NULL,
+    motivo VARCHAR(20) NULL,
+    KEY ix_huellas_huella (huella, periodo),
+    KEY ix_huellas_adjuntos (adjuntos)
+);
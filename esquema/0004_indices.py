@@ -0,0 +1,6 @@
+# Índices de las consultas calientes de ge_db (solo crea los que faltan).
+from migraciones import crear_indices_faltantes
+
+
+def aplicar(cursor):
+    crear_indices_faltantes(cursor)
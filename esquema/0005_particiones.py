@@ -0,0 +1,21 @@
+# Particionado mensual de movimientos / movimiento_detalle (ver particiones.py).
+# Idempotente: omite los pasos ya hechos a mano con versiones anteriores.
+from datetime import date
+
+from migraciones import tiene_columna
+from particiones import ddl_migrar, _particiones_existentes
+
+
+def aplicar(cursor):
+    if _particiones_existentes(cursor, "movimientos"):
+        return
+
+    cursor.execute("SELECT YEAR(MIN(fecha_hora)) AS anio FROM movimientos")
+    desde = (cursor.fetchone() or {}).get("anio") or date.today().year
+    pasos = ddl_migrar(int(desde), date.today().year + 1)
+
+    if tiene_columna(cursor, "movimiento_detalle", "fecha_hora"):
+        pasos = pasos[1:]   # la columna ya existe (esquema base nuevo): sin ADD COLUMN
+
+    for ddl in pasos:
+        cursor.execute(ddl)
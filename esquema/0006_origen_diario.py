@@ -0,0 +1,27 @@
+# Clave de idempotencia de los movimientos que llegan desde el diario local
+# (diario_local.py): un reintento del sincronizador no duplica el movimiento.
+# En una tabla particionada toda UNIQUE debe incluir fecha_hora; la búsqueda por
+# origen_uuid usa el prefijo del índice.
+from migraciones import existe_tabla, tiene_columna
+
+
+def _tiene_indice(cursor, tabla, indice):
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """,
+        (tabla, indice),
+    )
+    return cursor.fetchone() is not None
+
+
+def aplicar(cursor):
+    if not tiene_columna(cursor, "movimientos", "origen_uuid"):
+        cursor.execute("ALTER TABLE movimientos ADD COLUMN origen_uuid CHAR(32) NULL")
+    if not _tiene_indice(cursor, "movimientos", "ux_movimientos_origen"):
+        cursor.execute("ALTER TABLE movimientos ADD UNIQUE KEY ux_movimientos_origen (origen_uuid, fecha_hora)")
+
+    # El archivo se llena con INSERT ... SELECT *: mismas columnas que movimientos
+    if existe_tabla(cursor, "movimientos_archivo") and not tiene_columna(cursor, "movimientos_archivo", "origen_uuid"):
+        cursor.execute("ALTER TABLE movimientos_archivo ADD COLUMN origen_uuid CHAR(32) NULL")
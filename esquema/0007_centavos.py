@@ -0,0 +1,32 @@
+# Importes en centavos enteros (BIGINT) en lugar de DECIMAL(14,2): pymysql ya no
+# devuelve Decimal, el lector columnar arma int64 y las sumas son exactas y baratas.
+# Cada columna nueva queda en la posición de la vieja (AFTER ...) y se aplica igual
+# a las tablas *_archivo: se llenan con INSERT ... SELECT * y se leen con UNION ALL.
+from migraciones import existe_tabla, tiene_columna
+
+# tabla -> [(columna vieja, columna nueva)]
+COLUMNAS = {
+    "movimientos": [("total_debito", "total_debito_cent"), ("total_credito", "total_credito_cent")],
+    "movimiento_detalle": [("debito", "debito_cent"), ("credito", "credito_cent")],
+    "extracto_lineas": [("monto", "monto_cent")],
+}
+CON_ARCHIVO = ("movimientos", "movimiento_detalle")
+
+
+def _pasar_a_centavos(cursor, tabla, columnas):
+    for vieja, nueva in columnas:
+        if not tiene_columna(cursor, tabla, vieja):
+            continue    # ya migrada
+        if not tiene_columna(cursor, tabla, nueva):
+            cursor.execute(
+                f"ALTER TABLE {tabla} ADD COLUMN {nueva} BIGINT NOT NULL DEFAULT 0 AFTER {vieja}"
+            )
+        cursor.execute(f"UPDATE {tabla} SET {nueva} = ROUND({vieja} * 100)")
+        cursor.execute(f"ALTER TABLE {tabla} DROP COLUMN {vieja}")
+
+
+def aplicar(cursor):
+    for tabla, columnas in COLUMNAS.items():
+        _pasar_a_centavos(cursor, tabla, columnas)
+        if tabla in CON_ARCHIVO and existe_tabla(cursor, f"{tabla}_archivo"):
+            _pasar_a_centavos(cursor, f"{tabla}_archivo", columnas)
@@ -0,0 +1,14 @@
+-- Índice de adjuntos empaquetados (ver adjuntos.py): dónde está cada archivo
+-- dentro de su paquete, para leerlo con un seek sin desempaquetar.
+
+CREATE TABLE IF NOT EXISTS adjuntos_paquetes (
+    archivo VARCHAR(500) NOT NULL PRIMARY KEY,
+    paquete VARCHAR(100) NOT NULL,
+    inicio BIGINT NOT NULL,
+    largo_comprimido BIGINT NOT NULL,
+    largo BIGINT NOT NULL,
+    metodo VARCHAR(10) NOT NULL,
+    sha256 CHAR(64) NOT NULL,
+    empaquetado_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY ix_adjuntos_paquetes_paquete (paquete)
+);
@@ -0,0 +1,58 @@
+# Rastro de auditoría (ver auditoria.py): solo inserción, particionado por mes.
+# - PK (id, momento): en una tabla particionada toda clave única incluye la columna
+#   de partición.
+# - Triggers que rechazan UPDATE y DELETE: lo escrito no se cambia. La retención
+#   se hace quitando meses enteros (ALTER TABLE ... DROP PARTITION).
+# - Los meses siguientes los agrega particiones.py extender.
+from datetime import date
+
+from particiones import _def_particion, _siguiente_mes
+
+MESES_ADELANTE = 12
+
+
+def _existe_trigger(cursor, nombre):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME = %s",
+        (nombre,),
+    )
+    return cursor.fetchone() is not None
+
+
+def aplicar(cursor):
+    hoy = date.today()
+    anio, mes = hoy.year, hoy.month
+    defs = []
+    for _ in range(MESES_ADELANTE + 1):
+        defs.append(_def_particion(anio, mes))
+        anio, mes = _siguiente_mes(anio, mes)
+    defs.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS auditoria (
+            id BIGINT NOT NULL AUTO_INCREMENT,
+            momento DATETIME(6) NOT NULL,
+            usuario VARCHAR(100) NULL,
+            accion VARCHAR(40) NOT NULL,
+            entidad VARCHAR(40) NOT NULL,
+            entidad_id BIGINT NULL,
+            detalle JSON NULL,
+            PRIMARY KEY (id, momento),
+            KEY ix_auditoria_entidad (entidad, entidad_id, momento)
+        )
+        PARTITION BY RANGE COLUMNS(momento) (
+            {",".join(defs)}
+        )
+        """
+    )
+
+    for operacion in ("UPDATE", "DELETE"):
+        nombre = f"auditoria_sin_{operacion.lower()}"
+        if not _existe_trigger(cursor, nombre):
+            cursor.execute(
+                f"""
+                CREATE TRIGGER {nombre} BEFORE {operacion} ON auditoria FOR EACH ROW
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'auditoria: solo se admite INSERT'
+                """
+            )
@@ -0,0 +1,34 @@
+# Cierres de período (ver cierres.py): saldo acumulado al final de cada mes por
+# cuenta, empresa y banco, y el estado de cada cierre.
+# - saldos_cierre trae una fila por id que haya tenido movimientos alguna vez
+#   (el saldo se arrastra mes a mes), así el saldo al cierre es una lectura por PK.
+# - periodos_cierre.vigente = 0: entró un movimiento con fecha en ese mes (o uno
+#   anterior) después de cerrarlo; cierres.py recerrar lo rehace.
+from migraciones import crear_indices_faltantes
+
+
+def aplicar(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS periodos_cierre (
+            periodo DATE NOT NULL PRIMARY KEY,
+            vigente TINYINT NOT NULL DEFAULT 1,
+            cerrado_en DATETIME NOT NULL
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS saldos_cierre (
+            periodo DATE NOT NULL,
+            ambito ENUM('cuenta', 'empresa', 'banco') NOT NULL,
+            ambito_id INT NOT NULL,
+            debito_cent BIGINT NOT NULL DEFAULT 0,
+            credito_cent BIGINT NOT NULL DEFAULT 0,
+            saldo_cent BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (periodo, ambito, ambito_id)
+        )
+        """
+    )
+    # Deltas desde el último cierre (ge_db.saldo) por cuenta y por empresa
+    crear_indices_faltantes(cursor)
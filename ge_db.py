@@ -1,60 +1,196 @@
-import pymysql
-import bcrypt
-from datetime import datetime
+import contextvars
+import functools
+import itertools
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
 
-def get_connection():
+from dinero import a_centavos
+from duplicados import huellas_desde_lineas, periodo as periodo_huella
+from cache_consultas import CACHE as CACHE_CONSULTAS
+import metricas
+from auditoria import AUDITORIA
+
+# -------- CONEXIÓN ----------
+# Por defecto el servidor local de siempre; se puede cambiar por variables de entorno:
+#   GE_DB_HOST / GE_DB_PORT / GE_DB_USER / GE_DB_PASSWORD / GE_DB_NAME
+#   GE_DB_REPLICAS="127.0.0.1:3308,127.0.0.1:3309"   réplicas de solo lectura
+#   GE_DB_STICKY_SEG=5   segundos que una sesión lee del primario tras escribir
+DB_CONFIG = {
+    "host": os.environ.get("GE_DB_HOST", "127.0.0.1"),
+    "port": int(os.environ.get("GE_DB_PORT", "3307")),
+    "user": os.environ.get("GE_DB_USER", "root"),
+    "password": os.environ.get("GE_DB_PASSWORD", ""),
+    "database": os.environ.get("GE_DB_NAME", "gestion_entreprise"),
+}
+
+
+def _parse_replicas(texto):
+    out = []
+    for item in (texto or "").split(","):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(":")
+            out.append((host, int(port or DB_CONFIG["port"])))
+    return out
+
+
+REPLICAS = _parse_replicas(os.environ.get("GE_DB_REPLICAS", ""))
+STICKY_SEG = float(os.environ.get("GE_DB_STICKY_SEG", "5"))
+REPLICA_REINTENTO_SEG = 30
+
+# Una réplica puede ir atrasada como mucho lo que dura la "pegada" al primario
+CACHE_CONSULTAS.margen_seg = STICKY_SEG
+
+_sesion_actual = contextvars.ContextVar("ge_db_sesion", default=None)
+_usuario_actual = contextvars.ContextVar("ge_db_usuario", default=None)   # autor en la auditoría
+_ultima_escritura = {}        # sesión -> time.monotonic() del último commit
+_replica_caida = {}           # (host, port) -> no reintentar hasta este momento
+_turno_replica = itertools.count()
+
+
+# pymysql y bcrypt se importan dentro de las funciones que los usan: importar
+# ge_db (auth, login) no los carga hasta la primera conexión / verificación.
+def _conectar(host, port, **extra):
+    import pymysql
+
+    destino = "primario" if (host, port) == (DB_CONFIG["host"], DB_CONFIG["port"]) else "replica"
+    metricas.contar("ge_db_conexiones_total", destino=destino)
     return pymysql.connect(
-        host="127.0.0.1",
-        user="root",
-        password="",
-        database="gestion_entreprise",
-        port=3307,
+        host=host,
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        database=DB_CONFIG["database"],
+        port=port,
         cursorclass=pymysql.cursors.DictCursor,
         autocommit=False,
+        **extra,
     )
 
-def verificar_login(usuario, password):
-    conn = get_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT u.id,
-                       u.usuario,
-                       u.nombre,
-                       u.password_hash,
-                       u.activo,
-                       r.nombre AS rol
-                FROM usuarios u
-                JOIN roles r ON u.rol_id = r.id
-                WHERE u.usuario = %s
-                LIMIT 1
-            """, (usuario,))
 
-            user = cursor.fetchone()
+def set_sesion(sesion_id, usuario=None):
+    """La página indica qué sesión (y usuario) está ejecutando: para leer lo que acaba de escribir y auditar."""
+    _sesion_actual.set(sesion_id)
+    _usuario_actual.set(usuario)
 
-            if not user:
-                return None
 
-            if user["activo"] != 1:
-                return None
+def _auditar(accion, entidad, entidad_id=None, detalle=None, usuario=None):
+    """Tras el commit: encola el evento (no espera a MySQL, ver auditoria.py)."""
+    AUDITORIA.registrar(accion, entidad, entidad_id, usuario or _usuario_actual.get(), detalle)
 
-            # Verificar contraseña bcrypt
-            if bcrypt.checkpw(password.encode(), user["password_hash"].encode()):
-                return {
-                    "id": user["id"],
-                    "usuario": user["usuario"],
-                    "nombre": user["nombre"],
-                    "rol": user["rol"]
-                }
 
-            return None
+def _registrar_escritura():
+    sesion = _sesion_actual.get()
+    if sesion is not None:
+        _ultima_escritura[sesion] = time.monotonic()
+
+
+def _sesion_pegada():
+    t = _ultima_escritura.get(_sesion_actual.get())
+    return t is not None and time.monotonic() - t < STICKY_SEG
+
+
+def _conectar_replica():
+    """Réplicas en turno rotativo; las que fallan se saltan un rato. None si ninguna responde."""
+    import pymysql
+
+    ahora = time.monotonic()
+    inicio = next(_turno_replica)
+    for k in range(len(REPLICAS)):
+        destino = REPLICAS[(inicio + k) % len(REPLICAS)]
+        if _replica_caida.get(destino, 0) > ahora:
+            continue
+        try:
+            return _conectar(*destino, connect_timeout=2)
+        except pymysql.err.OperationalError:
+            _replica_caida[destino] = ahora + REPLICA_REINTENTO_SEG
+    return None
+
+
+def get_connection(lectura=False):
+    """
+    lectura=True: la consulta puede ir a una réplica, salvo que la sesión haya
+    escrito hace menos de STICKY_SEG segundos o que ninguna réplica responda.
+    """
+    if lectura and REPLICAS and not _sesion_pegada():
+        conn = _conectar_replica()
+        if conn is not None:
+            return conn
+    return _conectar(DB_CONFIG["host"], DB_CONFIG["port"])
+
+# -------- LECTURA COLUMNAR ----------
+# En vez de un dict por fila + copia en DataFrame, se leen tuplas por lotes
+# (cursor sin buffer) y se construyen columnas Arrow tipadas directamente.
+# DECIMAL queda como decimal128, BIGINT (importes en centavos) como int64 y
+# DATETIME como timestamp (sin pasar a float/str).
+LOTE_COLUMNAR = 10000
+
+def _tipo_arrow(desc):
+    import pyarrow as pa
+    from pymysql.constants import FIELD_TYPE as T
+
+    code = desc[1]
+    if code in (T.DECIMAL, T.NEWDECIMAL):
+        precision = min(max(int(desc[4] or 38), int(desc[5] or 0) + 1), 38)
+        return pa.decimal128(precision, int(desc[5] or 0))
+    if code in (T.TINY, T.SHORT, T.LONG, T.LONGLONG, T.INT24, T.YEAR):
+        return pa.int64()
+    if code in (T.FLOAT, T.DOUBLE):
+        return pa.float64()
+    if code in (T.DATETIME, T.TIMESTAMP):
+        return pa.timestamp("us")
+    if code == T.DATE:
+        return pa.date32()
+    if code in (T.VARCHAR, T.VAR_STRING, T.STRING, T.BLOB, T.TINY_BLOB,
+                T.MEDIUM_BLOB, T.LONG_BLOB, T.ENUM, T.JSON):
+        return pa.string()
+    return None  # que Arrow lo infiera
+
+
+def columnas_desde_lotes(nombres, tipos, lotes):
+    """Convierte lotes de tuplas en una pyarrow.Table (una columna tipada por campo)."""
+    import pyarrow as pa
+
+    batches = []
+    for filas in lotes:
+        if not filas:
+            continue
+        cols = list(zip(*filas))
+        arrays = [pa.array(col, type=t) for col, t in zip(cols, tipos)]
+        batches.append(pa.RecordBatch.from_arrays(arrays, names=nombres))
+
+    if not batches:
+        campos = [pa.field(n, t or pa.null()) for n, t in zip(nombres, tipos)]
+        return pa.schema(campos).empty_table()
+    return pa.Table.from_batches(batches)
+
+
+def consultar_columnar(sql, params=None, lote=LOTE_COLUMNAR):
+    """Ejecuta `sql` y devuelve una pyarrow.Table (st.dataframe la acepta directo)."""
+    import pymysql
+
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(sql, params)
+            nombres = [d[0] for d in cursor.description]
+            tipos = [_tipo_arrow(d) for d in cursor.description]
+
+            def lotes():
+                while True:
+                    filas = cursor.fetchmany(lote)
+                    if not filas:
+                        break
+                    yield filas
+
+            return columnas_desde_lotes(nombres, tipos, lotes())
     finally:
         conn.close()
 
-
 # -------- ROLES ----------
 def listar_roles():
-    conn = get_connection()
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cur:
             cur.execute("SELECT id, nombre FROM roles ORDER BY nombre")
@@ -63,17 +199,93 @@ def listar_roles():
         conn.close()
 
 # -------- USUARIOS ----------
-def listar_usuarios():
-    conn = get_connection()
+SQL_LISTAR_USUARIOS = """
+    SELECT u.id, u.usuario, u.nombre, u.activo, r.nombre AS rol
+    FROM usuarios u
+    JOIN roles r ON r.id = u.rol_id
+    ORDER BY u.id DESC
+"""
+
+def listar_usuarios(columnar=False):
+    if columnar:
+        return consultar_columnar(SQL_LISTAR_USUARIOS)
+
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cur:
-            cur.execute("""
+            cur.execute(SQL_LISTAR_USUARIOS)
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+# Directorio paginado: filtro en el servidor y paginación por clave (id < último
+# id visto) en vez de OFFSET, así la página 500 cuesta lo mismo que la primera.
+# La versión "usuarios" sube con cada alta/cambio y sirve de clave a las cachés de página.
+def version_usuarios():
+    return CACHE_CONSULTAS.version("usuarios")
+
+
+def _filtro_usuarios(texto, rol_id, activo):
+    where, params = ["1=1"], []
+    texto = (texto or "").strip()
+    if texto:
+        where.append("(u.usuario LIKE %s OR u.nombre LIKE %s OR r.nombre LIKE %s)")
+        params += [f"%{texto}%"] * 3
+    if rol_id is not None:
+        where.append("u.rol_id = %s")
+        params.append(int(rol_id))
+    if activo is not None:
+        where.append("u.activo = %s")
+        params.append(int(activo))
+    return " AND ".join(where), params
+
+
+def listar_usuarios_pagina(texto="", rol_id=None, activo=None, antes_de=None, por_pagina=50):
+    """
+    Una página del directorio, de id mayor a menor. antes_de = último id de la página
+    anterior (None = primera). Devuelve (filas, siguiente) con siguiente = valor de
+    antes_de para la página que sigue, o None si no hay más.
+    """
+    where_sql, params = _filtro_usuarios(texto, rol_id, activo)
+    if antes_de is not None:
+        where_sql += " AND u.id < %s"
+        params.append(int(antes_de))
+
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
                 SELECT u.id, u.usuario, u.nombre, u.activo, r.nombre AS rol
                 FROM usuarios u
                 JOIN roles r ON r.id = u.rol_id
+                WHERE {where_sql}
                 ORDER BY u.id DESC
-            """)
-            return cur.fetchall()
+                LIMIT %s
+                """,
+                params + [int(por_pagina) + 1],   # una de más: dice si hay página siguiente
+            )
+            filas = cur.fetchall()
+    finally:
+        conn.close()
+
+    if len(filas) > por_pagina:
+        filas = filas[:por_pagina]
+        return filas, filas[-1]["id"]
+    return filas, None
+
+
+def contar_usuarios(texto="", rol_id=None, activo=None):
+    where_sql, params = _filtro_usuarios(texto, rol_id, activo)
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT COUNT(*) AS n FROM usuarios u JOIN roles r ON r.id = u.rol_id WHERE {where_sql}",
+                params,
+            )
+            return cur.fetchone()["n"]
     finally:
         conn.close()
 
@@ -83,10 +295,15 @@ def crear_usuario(username, nombre, password_hash, rol_id, activo=1):
     try:
         with conn.cursor() as cur:
             cur.execute("""
-                INSERT INTO usuarios (username, nombre, password_hash, rol_id, activo)
+                INSERT INTO usuarios (usuario, nombre, password_hash, rol_id, activo)
                 VALUES (%s, %s, %s, %s, %s)
             """, (username, nombre, password_hash, rol_id, activo))
+            nuevo_id = cur.lastrowid
         conn.commit()
+        _registrar_escritura()
+        CACHE_CONSULTAS.incrementar_version("usuarios")
+        _auditar("usuario.crear", "usuario", nuevo_id,
+                 {"usuario": username, "rol_id": rol_id, "activo": int(activo)})
         return True
     finally:
         conn.close()
@@ -97,6 +314,9 @@ def set_usuario_activo(user_id, activo: int):
         with conn.cursor() as cur:
             cur.execute("UPDATE usuarios SET activo=%s WHERE id=%s", (activo, user_id))
         conn.commit()
+        _registrar_escritura()
+        CACHE_CONSULTAS.incrementar_version("usuarios")
+        _auditar("usuario.activar" if int(activo) else "usuario.desactivar", "usuario", user_id)
     finally:
         conn.close()
 
@@ -106,117 +326,373 @@ def reset_password(user_id, new_hash):
         with conn.cursor() as cur:
             cur.execute("UPDATE usuarios SET password_hash=%s WHERE id=%s", (new_hash, user_id))
         conn.commit()
+        _registrar_escritura()
+        _auditar("usuario.reset_clave", "usuario", user_id)   # sin el hash
     finally:
         conn.close()
 
+def _centavos(d, clave, clave_unidades):
+    """Importe en centavos de `d`; lo encolado antes de los centavos trae unidades en clave_unidades."""
+    if clave in d:
+        return int(d[clave] or 0)
+    return a_centavos(d.get(clave_unidades))
+
+
+def _item_movimiento(d, origen_uuid=None):
+    """Datos de guardar_movimiento / del diario -> registro para _insertar_movimientos."""
+    return {
+        "fecha_dt": datetime.strptime(str(d["fecha_hora"]).strip(), "%d/%m/%Y %H:%M:%S"),
+        "debito": _centavos(d, "total_debito_cent", "total_debito"),
+        "credito": _centavos(d, "total_credito_cent", "total_credito"),
+        "lineas": d["lineas"],
+        "cliente_id": d.get("cliente_id"),
+        "empresa_id": d.get("empresa_id"),
+        "banco_id": d.get("banco_id"),
+        "origen_uuid": origen_uuid,
+        "usuario": d.get("usuario"),
+    }
+
+
+def validar_movimiento(d):
+    """
+    Lo que exige _item_movimiento, antes de encolar en el diario: así un error de
+    tipeo se avisa al enviar y no en la sincronización. ValueError con un mensaje
+    para el usuario.
+    """
+    try:
+        datetime.strptime(str(d.get("fecha_hora") or "").strip(), "%d/%m/%Y %H:%M:%S")
+    except ValueError:
+        raise ValueError(
+            f"Fecha y hora inválida: «{d.get('fecha_hora')}» (formato dd/mm/aaaa hh:mm:ss)."
+        ) from None
+    if not d.get("lineas"):
+        raise ValueError("El movimiento no tiene líneas.")
+    try:
+        _item_movimiento(d)
+    except (KeyError, TypeError, ArithmeticError) as e:
+        raise ValueError(f"Datos del movimiento inválidos: {e}") from None
+
+
+def _insertar_movimientos(cursor, items, lote=500):
+    """
+    Cabeceras + detalle + huellas de varios movimientos con el cursor dado (la
+    transacción la maneja quien llama), con INSERT multi-fila por tabla.
+    Con más de un movimiento cada item debe traer origen_uuid: los ids se leen por
+    él (con innodb_autoinc_lock_mode=2 los ids de un INSERT multi-fila no son
+    necesariamente consecutivos). Devuelve los ids en el orden de `items`.
+    """
+    if not items:
+        return []
+
+    # Un movimiento con fecha en un mes ya cerrado deja ese cierre y los siguientes
+    # desactualizados (ver cierres.py). Va primero: si hay un cierre en curso de ese
+    # mes, uno espera al otro en vez de quedar fuera de la instantánea sin marcarla.
+    cursor.execute(
+        "UPDATE periodos_cierre SET vigente = 0 WHERE periodo >= %s AND vigente = 1",
+        (min(it["fecha_dt"].date().replace(day=1) for it in items),),
+    )
+
+    ids = []
+    for i in range(0, len(items), lote):
+        chunk = items[i:i + lote]
+        cursor.execute(
+            f"""
+            INSERT INTO movimientos
+            (fecha_hora, total_debito_cent, total_credito_cent,
+             cliente_id, empresa_id, banco_id, origen_uuid)
+            VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(chunk))}
+            """,
+            [
+                v
+                for it in chunk
+                for v in (
+                    it["fecha_dt"].strftime("%Y-%m-%d %H:%M:%S"),
+                    int(it["debito"]),
+                    int(it["credito"]),
+                    it["cliente_id"],
+                    it["empresa_id"],
+                    it["banco_id"],
+                    it["origen_uuid"],
+                )
+            ],
+        )
+        if len(chunk) == 1:
+            ids.append(cursor.lastrowid)
+            continue
+        cursor.execute(
+            f"""
+            SELECT origen_uuid, id FROM movimientos
+            WHERE origen_uuid IN ({", ".join(["%s"] * len(chunk))})
+            """,
+            [it["origen_uuid"] for it in chunk],
+        )
+        por_uuid = {r["origen_uuid"]: r["id"] for r in cursor.fetchall()}
+        ids += [por_uuid[it["origen_uuid"]] for it in chunk]
+
+    detalle, huellas = [], []
+    for movimiento_id, it in zip(ids, items):
+        fecha_hora_sql = it["fecha_dt"].strftime("%Y-%m-%d %H:%M:%S")
+        for l in it["lineas"]:
+            detalle.append((
+                movimiento_id,
+                fecha_hora_sql,   # clave de partición (denormalizada)
+                l.get("Cuenta", "") or "",
+                l.get("Descripción", "") or "",
+                _centavos(l, "debito_cent", "Débito"),
+                _centavos(l, "credito_cent", "Crédito"),
+                l.get("Notas", "") or "",
+                l.get("archivo"),
+            ))
+        huella, huella_adj = huellas_desde_lineas(
+            it["empresa_id"], it["banco_id"], it["cliente_id"], it["debito"], it["credito"], it["lineas"]
+        )
+        huellas.append((movimiento_id, huella, periodo_huella(it["fecha_dt"]), huella_adj))
+
+    # executemany de pymysql junta las filas en INSERT multi-fila
+    cursor.executemany(
+        """
+        INSERT INTO movimiento_detalle
+        (movimiento_id, fecha_hora, cuenta, descripcion,
+         debito_cent, credito_cent, notas, archivo)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        detalle,
+    )
+    # Índice de huellas (detección de duplicados), en la misma transacción
+    cursor.executemany(
+        """
+        INSERT INTO movimiento_huellas (movimiento_id, huella, periodo, adjuntos)
+        VALUES (%s, %s, %s, %s)
+        """,
+        huellas,
+    )
+    return ids
+
+
+def _despues_de_guardar(movimiento_id, fecha_dt, total_debito_cent, total_credito_cent, lineas,
+                        origen_uuid=None, usuario=None):
+    """Tras el commit: caché del rango, auditoría y métricas."""
+    CACHE_CONSULTAS.invalidar(fecha_dt, fecha_dt)
+    _auditar(
+        "movimiento.crear", "movimiento", movimiento_id,
+        {
+            "fecha_hora": fecha_dt,
+            "total_debito_cent": int(total_debito_cent),
+            "total_credito_cent": int(total_credito_cent),
+            "lineas": len(lineas),
+            "origen_uuid": origen_uuid,
+        },
+        usuario=usuario,
+    )
+
+    metricas.contar("ge_movimientos_guardados_total")
+    metricas.observar("ge_movimiento_lineas", len(lineas))
+    adj = 0
+    for l in lineas:
+        if l.get("archivo"):
+            try:
+                adj += os.path.getsize(l["archivo"])
+            except OSError:
+                pass
+    if adj:
+        metricas.contar("ge_adjuntos_bytes_total", adj)
+
+
 def guardar_movimiento(
     fecha_hora,
     cliente,
     empresa,
     banco,
-    total_debito,
-    total_credito,
+    total_debito_cent,
+    total_credito_cent,
     lineas,
     cliente_id=None,
     empresa_id=None,
     banco_id=None,
 ):
-
-    fecha_hora_sql = datetime.strptime(
-        fecha_hora, "%d/%m/%Y %H:%M:%S"
-    ).strftime("%Y-%m-%d %H:%M:%S")
+    it = _item_movimiento({
+        "fecha_hora": fecha_hora,
+        "total_debito_cent": total_debito_cent,
+        "total_credito_cent": total_credito_cent,
+        "lineas": lineas,
+        "cliente_id": cliente_id,
+        "empresa_id": empresa_id,
+        "banco_id": banco_id,
+    })
 
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO movimientos
-                (fecha_hora, total_debito, total_credito,
-                 cliente_id, empresa_id, banco_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    fecha_hora_sql,
-                    total_debito,
-                    total_credito,
-                    cliente_id,
-                    empresa_id,
-                    banco_id,
-                ),
-            )
-
-            movimiento_id = cursor.lastrowid
-
-            for l in lineas:
-                cursor.execute(
-                    """
-                    INSERT INTO movimiento_detalle
-                    (movimiento_id, cuenta, descripcion,
-                     debito, credito, notas, archivo)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        movimiento_id,
-                        l.get("Cuenta", "") or "",
-                        l.get("Descripción", "") or "",
-                        float(l.get("Débito", 0) or 0),
-                        float(l.get("Crédito", 0) or 0),
-                        l.get("Notas", "") or "",
-                        l.get("archivo"),
-                    ),
-                )
+            movimiento_id = _insertar_movimientos(cursor, [it])[0]
 
         conn.commit()
+        _registrar_escritura()
+        _despues_de_guardar(movimiento_id, it["fecha_dt"], it["debito"], it["credito"], lineas)
         return movimiento_id
     finally:
         conn.close()
 
-def listar_movimientos(desde, hasta):
+
+def _guardar_lote(entradas):
+    """
+    [(origen_uuid, datos)] en UNA transacción. Idempotente: las que ya están (mismo
+    origen_uuid) no se insertan de nuevo. Devuelve {origen_uuid: movimiento_id}.
+    """
+    if not entradas:
+        return {}
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
+            marcadores = ", ".join(["%s"] * len(entradas))
             cursor.execute(
-                """
-                SELECT
-                    m.id,
-                    DATE(m.fecha_hora) AS Fecha,
-                    c.nombre AS Cliente,
-                    e.nombre AS Empresa,
-                    b.nombre AS Banco,
-                    m.total_debito AS Débito,
-                    m.total_credito AS Crédito,
-                    'OK' AS Estado
-                FROM movimientos m
-                LEFT JOIN clientes c ON c.id = m.cliente_id
-                LEFT JOIN empresas e ON e.id = m.empresa_id
-                LEFT JOIN bancos b ON b.id = m.banco_id
-                WHERE DATE(m.fecha_hora) BETWEEN %s AND %s
-                ORDER BY m.id DESC
-                """,
-                (str(desde), str(hasta))
+                f"SELECT origen_uuid, id FROM movimientos WHERE origen_uuid IN ({marcadores})",
+                [u for u, _ in entradas],
             )
-            return cursor.fetchall()
+            ids = {r["origen_uuid"]: r["id"] for r in cursor.fetchall()}
+
+            nuevos = [_item_movimiento(d, u) for u, d in entradas if u not in ids]
+            for it, movimiento_id in zip(nuevos, _insertar_movimientos(cursor, nuevos)):
+                ids[it["origen_uuid"]] = movimiento_id
+
+        conn.commit()
+        if nuevos:
+            _registrar_escritura()
+        for it in nuevos:
+            _despues_de_guardar(
+                ids[it["origen_uuid"]], it["fecha_dt"], it["debito"], it["credito"], it["lineas"],
+                origen_uuid=it["origen_uuid"], usuario=it["usuario"],
+            )
+        return ids
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 
 
+def aplicar_diario(entradas):
+    """
+    Reproduce entradas del diario local (diario_local.py) en UNA transacción, en orden.
+    entradas: [(origen_uuid, datos)] con datos = argumentos de guardar_movimiento
+    (+ "usuario" que lo envió, para la auditoría).
+    Idempotente: las que ya están (mismo origen_uuid) no se insertan de nuevo.
+    Devuelve {origen_uuid: movimiento_id}.
+    """
+    return _guardar_lote(entradas)
+
+
+def guardar_movimientos_lote(movimientos):
+    """
+    Varios movimientos (datos como los del diario) en una sola transacción, con
+    inserciones multi-fila. Cada uno puede traer "origen_uuid": reintentar el mismo
+    lote tras un error de red no duplica nada. Devuelve los ids en el mismo orden.
+    """
+    entradas = [(d.get("origen_uuid") or uuid.uuid4().hex, d) for d in movimientos]
+    ids = _guardar_lote(entradas)
+    return [ids[u] for u, _ in entradas]
+
+
+# ---- Archivo histórico ----
+# Los años cerrados se mueven a movimientos_archivo / movimiento_detalle_archivo
+# (ver particiones.py). Los lectores unen el archivo solo si el rango lo toca.
+_anios_archivados = None   # (set de años, momento de lectura)
+
+def anios_archivados(refrescar=False):
+    import pymysql
+
+    global _anios_archivados
+    if refrescar or _anios_archivados is None or time.monotonic() - _anios_archivados[1] > 300:
+        conn = get_connection(lectura=True)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT anio FROM archivo_periodos")
+                anios = {r["anio"] for r in cursor.fetchall()}
+        except pymysql.err.ProgrammingError:
+            anios = set()   # aún no se ha archivado nada
+        finally:
+            conn.close()
+        _anios_archivados = (anios, time.monotonic())
+    return _anios_archivados[0]
+
+
+def _tabla_movimientos(desde=None):
+    archivados = anios_archivados()
+    if archivados and (desde is None or int(str(desde)[:4]) <= max(archivados)):
+        return "(SELECT * FROM movimientos UNION ALL SELECT * FROM movimientos_archivo)"
+    return "movimientos"
+
+
+def _tabla_detalle(desde=None):
+    archivados = anios_archivados()
+    if archivados and (desde is None or int(str(desde)[:4]) <= max(archivados)):
+        return "(SELECT * FROM movimiento_detalle UNION ALL SELECT * FROM movimiento_detalle_archivo)"
+    return "movimiento_detalle"
+
+
+# Débito / Crédito salen en centavos (int64); la página los pasa a unidades al mostrar.
+SQL_LISTAR_MOVIMIENTOS = """
+    SELECT
+        m.id,
+        DATE(m.fecha_hora) AS Fecha,
+        c.nombre_cli AS Cliente,
+        e.nombre_emp AS Empresa,
+        b.nombre_ban AS Banco,
+        m.total_debito_cent AS Débito,
+        m.total_credito_cent AS Crédito,
+        'OK' AS Estado
+    FROM {movimientos} m
+    LEFT JOIN clientes c ON c.id_cli = m.cliente_id
+    LEFT JOIN empresas e ON e.id_emp = m.empresa_id
+    LEFT JOIN bancos b ON b.id_ban = m.banco_id
+    WHERE m.fecha_hora >= %s
+      AND m.fecha_hora < %s + INTERVAL 1 DAY
+    ORDER BY m.id DESC
+"""
+
+def listar_movimientos(desde, hasta, columnar=False):
+    """Resultado compartido vía caché: no modificar las filas devueltas."""
+    # "cent": la caché compartida puede tener filas de antes de los centavos (en unidades)
+    clave = ("listar_movimientos", "cent", str(desde), str(hasta), bool(columnar))
+    en_cache, valor = CACHE_CONSULTAS.obtener(clave)
+    if en_cache:
+        return valor
+    inicio = valor
+
+    # Rango directo sobre fecha_hora (sin DATE()) para que MySQL pode particiones
+    sql = SQL_LISTAR_MOVIMIENTOS.format(movimientos=_tabla_movimientos(desde))
+    params = (str(desde), str(hasta))
+    if columnar:
+        rows = consultar_columnar(sql, params)
+    else:
+        conn = get_connection(lectura=True)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+    CACHE_CONSULTAS.guardar(clave, rows, desde, hasta, inicio)
+    return rows
+
+
 def obtener_movimiento(mov_id: int):
-    conn = get_connection()
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cursor:
             cursor.execute(
-                """
+                f"""
                 SELECT
-                    m.id, m.fecha_hora, m.total_debito, m.total_credito, m.creado_en,
+                    m.id, m.fecha_hora, m.total_debito_cent, m.total_credito_cent, m.creado_en,
                     m.cliente_id, m.empresa_id, m.banco_id,
-                    c.nombre AS cliente,
-                    e.nombre AS empresa,
-                    b.nombre AS banco
-                FROM movimientos m
-                LEFT JOIN clientes c ON c.id = m.cliente_id
-                LEFT JOIN empresas e ON e.id = m.empresa_id
-                LEFT JOIN bancos b ON b.id = m.banco_id
+                    c.nombre_cli AS cliente,
+                    e.nombre_emp AS empresa,
+                    b.nombre_ban AS banco
+                FROM {_tabla_movimientos()} m
+                LEFT JOIN clientes c ON c.id_cli = m.cliente_id
+                LEFT JOIN empresas e ON e.id_emp = m.empresa_id
+                LEFT JOIN bancos b ON b.id_ban = m.banco_id
                 WHERE m.id = %s
                 """,
                 (mov_id,)
@@ -225,27 +701,175 @@ def obtener_movimiento(mov_id: int):
     finally:
         conn.close()
 
-def listar_detalle_movimiento(mov_id: int):
-    conn = get_connection()
+# Débito / Crédito en centavos, como en SQL_LISTAR_MOVIMIENTOS
+SQL_DETALLE_MOVIMIENTO = """
+    SELECT id, cuenta AS Cuenta, descripcion AS Descripción, debito_cent AS Débito,
+           credito_cent AS Crédito, notas AS Notas, archivo AS Archivo
+    FROM {detalle}
+    WHERE movimiento_id = %s
+    ORDER BY id ASC
+"""
+
+def listar_detalle_movimiento(mov_id: int, columnar=False):
+    sql = SQL_DETALLE_MOVIMIENTO.format(detalle=_tabla_detalle())
+    if columnar:
+        return consultar_columnar(sql, (mov_id,))
+
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cursor:
+            cursor.execute(sql, (mov_id,))
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+# ---- Catalogos ----
+# Versión de catálogos: se incrementa en cada escritura y sirve de clave
+# para las cachés/índices que dependen de ellos. Vive en la caché compartida,
+# así un cambio refresca a todos los procesos a la vez.
+def version_catalogos():
+    return CACHE_CONSULTAS.version("catalogos")
+
+def invalidar_catalogos():
+    CACHE_CONSULTAS.invalidar()   # los nombres de catálogo salen en los resultados
+    return CACHE_CONSULTAS.incrementar_version("catalogos")
+
+# Definición de cada catálogo: tabla + sufijo de columnas (id_cli, nombre_cli, status_cli...)
+CATALOGOS = {
+    "clientes": {"tabla": "clientes", "sufijo": "cli", "extra": []},
+    "empresas": {"tabla": "empresas", "sufijo": "emp", "extra": []},
+    "bancos": {"tabla": "bancos", "sufijo": "ban", "extra": []},
+    "cuentas": {"tabla": "cuentas", "sufijo": "cue", "extra": ["tipo_cue"]},
+}
+
+ESTADOS_CATALOGO = ["HABILITADO", "DESHABILITADO"]
+
+
+def _catalogo_cols(catalogo):
+    cfg = CATALOGOS[catalogo]   # KeyError si no existe (nunca se interpola texto del usuario)
+    suf = cfg["sufijo"]
+    return cfg["tabla"], f"id_{suf}", f"nombre_{suf}", f"status_{suf}", cfg["extra"]
+
+
+def listar_catalogo_pagina(catalogo, texto="", estado=None, pagina=1, por_pagina=50):
+    """Página filtrada en el servidor. Devuelve (filas, total)."""
+    tabla, c_id, c_nom, c_st, extra = _catalogo_cols(catalogo)
+
+    where = ["1=1"]
+    params = []
+    if texto:
+        where.append(f"{c_nom} LIKE %s")
+        params.append(f"%{texto.strip()}%")
+    if estado:
+        where.append(f"{c_st} = %s")
+        params.append(estado)
+    where_sql = " AND ".join(where)
+
+    cols_extra = "".join(f", {c}" for c in extra)
+    offset = max(int(pagina) - 1, 0) * int(por_pagina)
+
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {tabla} WHERE {where_sql}", params)
+            total = cursor.fetchone()["n"]
+
             cursor.execute(
-                """
-                SELECT id, cuenta AS Cuenta, descripcion AS Descripción, debito AS Débito,
-                       credito AS Crédito, notas AS Notas, archivo AS Archivo
-                FROM movimiento_detalle
-                WHERE movimiento_id = %s
-                ORDER BY id ASC
+                f"""
+                SELECT {c_id} AS id, {c_nom} AS nombre, {c_st} AS status{cols_extra}
+                FROM {tabla}
+                WHERE {where_sql}
+                ORDER BY {c_nom}
+                LIMIT %s OFFSET %s
                 """,
-                (mov_id,)
+                params + [int(por_pagina), offset],
             )
-            return cursor.fetchall()
+            return cursor.fetchall(), total
     finally:
         conn.close()
 
-# ---- Catalogos ----
-def listar_clientes():
+
+def upsert_catalogo(catalogo, filas, lote=500):
+    """
+    Inserta o actualiza filas {"id"?, "nombre", "status"?, extras?...} con
+    INSERT ... ON DUPLICATE KEY UPDATE, en lotes de `lote` filas por sentencia.
+    Solo se actualizan las columnas que vienen en `filas` (un CSV sin "status" no
+    rehabilita nada ni uno sin las extras las borra); las filas nuevas sin status
+    entran HABILITADO. La página valida antes (id numérico, status conocido).
+    Devuelve el número de filas procesadas.
+    """
+    tabla, c_id, c_nom, c_st, extra = _catalogo_cols(catalogo)
+    presentes = set().union(*(f.keys() for f in filas)) if filas else set()
+    extra = [c for c in extra if c in presentes]
+    con_status = "status" in presentes
+    cols = [c_id, c_nom, c_st] + extra
+
+    valores = []
+    for f in filas:
+        nombre = (f.get("nombre") or "").strip()
+        if not nombre:
+            continue
+        fila_id = f.get("id")
+        valores.append(
+            [int(fila_id) if fila_id not in (None, "") else None,
+             nombre,
+             f.get("status") or "HABILITADO"]    # solo cuenta al insertar si no vino status
+            + [f.get(c) for c in extra]
+        )
+
+    if not valores:
+        return 0
+
+    actualizar = [c_nom] + ([c_st] if con_status else []) + extra
+    update = ", ".join(f"{c} = VALUES({c})" for c in actualizar)
+    fila_sql = "(" + ", ".join(["%s"] * len(cols)) + ")"
+
     conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            for i in range(0, len(valores), lote):
+                chunk = valores[i:i + lote]
+                cursor.execute(
+                    f"""
+                    INSERT INTO {tabla} ({", ".join(cols)})
+                    VALUES {", ".join([fila_sql] * len(chunk))}
+                    ON DUPLICATE KEY UPDATE {update}
+                    """,
+                    [v for fila in chunk for v in fila],
+                )
+        conn.commit()
+        _registrar_escritura()
+    finally:
+        conn.close()
+
+    invalidar_catalogos()
+    return len(valores)
+
+
+def set_catalogo_status(catalogo, ids, status):
+    tabla, c_id, _, c_st, _ = _catalogo_cols(catalogo)
+    ids = [int(i) for i in ids]
+    if not ids:
+        return 0
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            n = cursor.execute(
+                f"UPDATE {tabla} SET {c_st}=%s WHERE {c_id} IN ({', '.join(['%s'] * len(ids))})",
+                [status] + ids,
+            )
+        conn.commit()
+        _registrar_escritura()
+    finally:
+        conn.close()
+
+    invalidar_catalogos()
+    return n
+
+
+def listar_clientes():
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cursor:
             cursor.execute("""
@@ -263,7 +887,7 @@ def listar_clientes():
 
 
 def listar_empresas():
-    conn = get_connection()
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cursor:
             cursor.execute("""
@@ -279,7 +903,7 @@ def listar_empresas():
 
 
 def listar_bancos():
-    conn = get_connection()
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cursor:
             cursor.execute("""
@@ -296,11 +920,13 @@ def listar_bancos():
 
         
 def debug_server_info():
+    import pymysql
+
     conn = pymysql.connect(
-        host="127.0.0.1",
-        user="root",
-        password="",
-        port=3307,
+        host=DB_CONFIG["host"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        port=DB_CONFIG["port"],
         cursorclass=pymysql.cursors.DictCursor,
     )
     try:
@@ -312,7 +938,26 @@ def debug_server_info():
         return info, dbs
     finally:
         conn.close()
-import bcrypt
+
+
+def estado_replicas():
+    """[(host, port, ok, puerto/read_only o error)] de cada réplica configurada."""
+    import pymysql
+
+    out = []
+    for host, port in REPLICAS:
+        try:
+            conn = _conectar(host, port, connect_timeout=2)
+        except pymysql.err.OperationalError as e:
+            out.append((host, port, False, str(e)))
+            continue
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT @@port AS port, @@read_only AS read_only")
+                out.append((host, port, True, cur.fetchone()))
+        finally:
+            conn.close()
+    return out
 
 def obtener_usuario_por_username(username: str):
     conn = get_connection()
@@ -334,6 +979,8 @@ def obtener_usuario_por_username(username: str):
         conn.close()
 
 def verificar_login(username: str, password: str):
+    import bcrypt
+
     user = obtener_usuario_por_username(username)
     if not user:
         return None
@@ -348,25 +995,17 @@ def verificar_login(username: str, password: str):
     # devolvemos solo lo necesario
     return {"id": user["id"], "usuario": user["usuario"], "nombre": user["nombre"], "rol": user["rol"]}
 
-def crear_usuario(username: str, nombre: str, password: str, rol_id: int):
-    pw_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-    conn = get_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO usuarios (usuario, nombre, password_hash, rol_id, activo)
-                VALUES (%s, %s, %s, %s, 1)
-                """,
-                (username, nombre, pw_hash, rol_id),
-            )
-        conn.commit()
-        return True
-    finally:
-        conn.close()
-import bcrypt
+def autenticar(username, password, con_motivo=False):
+    """
+    Usuario activo con esa clave, o None. con_motivo=True devuelve (usuario|None, motivo)
+    con motivo "ok" / "no_existe" / "clave" (para limite_login).
+    """
+    import bcrypt
+
+    def _fin(user, motivo):
+        metricas.contar("ge_logins_total", resultado="ok" if user else "fallo")
+        return (user, motivo) if con_motivo else user
 
-def autenticar(username, password):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
@@ -388,28 +1027,28 @@ def autenticar(username, password):
             user = cursor.fetchone()
 
             if not user:
-                return None
+                return _fin(None, "no_existe")
 
             # 🔐 Verificar contraseña bcrypt
             if bcrypt.checkpw(
                 password.encode("utf-8"),
                 user["password_hash"].encode("utf-8")
             ):
-                return {
+                return _fin({
                     "id": user["id"],
                     "usuario": user["usuario"],   # ✅ CORRECTO
                     "nombre": user.get("nombre"),
                     "rol": user["rol"],
                     "rol_id": user["rol_id"],
-                }
+                }, "ok")
 
-            return None
+            return _fin(None, "clave")
 
     finally:
         conn.close()
 
 def listar_cuentas_activas():
-    conn = get_connection()
+    conn = get_connection(lectura=True)
     try:
         with conn.cursor() as cursor:
             cursor.execute("""
@@ -427,3 +1066,696 @@ def listar_cuentas_activas():
         conn.close()
 
 
+
+# ---- Conciliación bancaria ----
+# Efecto de un movimiento en el banco: débito suma, crédito resta.
+def saldos_corridos_banco(banco_id, desde, hasta):
+    """Saldo acumulado por movimiento (window function sobre toda la historia del banco)."""
+    # Depende de toda la historia hasta `hasta`: cualquier escritura anterior lo invalida
+    clave = ("saldos_corridos_banco", "cent", banco_id, str(desde), str(hasta))
+    en_cache, valor = CACHE_CONSULTAS.obtener(clave)
+    if en_cache:
+        return valor
+    inicio = valor
+
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT id, fecha_hora, monto_cent, saldo_cent
+                FROM (
+                    SELECT
+                        m.id,
+                        m.fecha_hora,
+                        m.total_debito_cent - m.total_credito_cent AS monto_cent,
+                        CAST(SUM(m.total_debito_cent - m.total_credito_cent) OVER (
+                            PARTITION BY m.banco_id
+                            ORDER BY m.fecha_hora, m.id
+                            ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                        ) AS SIGNED) AS saldo_cent
+                    FROM {_tabla_movimientos()} m
+                    WHERE m.banco_id = %s
+                      AND m.fecha_hora < %s + INTERVAL 1 DAY
+                ) t
+                WHERE t.fecha_hora >= %s
+                ORDER BY t.fecha_hora, t.id
+                """,
+                (banco_id, str(hasta), str(desde)),
+            )
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    CACHE_CONSULTAS.guardar(clave, rows, None, hasta, inicio)
+    return rows
+
+
+def movimientos_por_conciliar(banco_id, desde, hasta):
+    """Movimientos del banco en el rango que aún no están ligados a una línea de extracto."""
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT m.id, DATE(m.fecha_hora) AS fecha,
+                       m.total_debito_cent - m.total_credito_cent AS monto_cent
+                FROM {_tabla_movimientos(desde)} m
+                LEFT JOIN extracto_lineas x ON x.movimiento_id = m.id
+                WHERE m.banco_id = %s
+                  AND m.fecha_hora >= %s
+                  AND m.fecha_hora < %s + INTERVAL 1 DAY
+                  AND x.id IS NULL
+                """,
+                (banco_id, str(desde), str(hasta)),
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def guardar_extracto(banco_id, archivo, lineas, lote=1000):
+    """
+    Guarda el extracto y sus líneas (con movimiento_id si ya se concilió).
+    Inserciones multi-fila en lotes. Devuelve el id del extracto.
+    """
+    fechas = [l["fecha"] for l in lineas]
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO extractos (banco_id, archivo, desde, hasta) VALUES (%s, %s, %s, %s)",
+                (banco_id, archivo, min(fechas) if fechas else None, max(fechas) if fechas else None),
+            )
+            extracto_id = cursor.lastrowid
+
+            valores = [
+                (extracto_id, l["fecha"], l.get("descripcion", "") or "",
+                 l.get("referencia", "") or "", int(l["monto_cent"]), l.get("movimiento_id"))
+                for l in lineas
+            ]
+            for i in range(0, len(valores), lote):
+                cursor.executemany(
+                    """
+                    INSERT INTO extracto_lineas
+                    (extracto_id, fecha, descripcion, referencia, monto_cent, movimiento_id)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    """,
+                    valores[i:i + lote],
+                )
+        conn.commit()
+        _registrar_escritura()
+        return extracto_id
+    finally:
+        conn.close()
+
+
+def listar_extractos(banco_id):
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT x.id, x.archivo, x.desde, x.hasta, x.creado_en,
+                       COUNT(l.id) AS lineas,
+                       SUM(l.movimiento_id IS NULL) AS pendientes
+                FROM extractos x
+                LEFT JOIN extracto_lineas l ON l.extracto_id = x.id
+                WHERE x.banco_id = %s
+                GROUP BY x.id
+                ORDER BY x.id DESC
+                """,
+                (banco_id,),
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def listar_lineas_pendientes(extracto_id):
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, fecha, descripcion, referencia, monto_cent
+                FROM extracto_lineas
+                WHERE extracto_id = %s AND movimiento_id IS NULL
+                ORDER BY fecha, id
+                """,
+                (extracto_id,),
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+# ---- Saldos por cuenta, empresa y banco (cierres de período, ver cierres.py) ----
+# Saldo = débito - crédito acumulado. Empresa y banco van por la cabecera (como
+# saldos_corridos_banco); la cuenta, por las líneas del detalle.
+# ámbito -> (tabla según el rango, columna del id, débito, crédito)
+AMBITOS_SALDO = {
+    "cuenta": (_tabla_detalle, "cuenta", "debito_cent", "credito_cent"),
+    "empresa": (_tabla_movimientos, "empresa_id", "total_debito_cent", "total_credito_cent"),
+    "banco": (_tabla_movimientos, "banco_id", "total_debito_cent", "total_credito_cent"),
+}
+_INICIO = date(1900, 1, 1)
+
+
+def sql_actividad(ambito, desde, por_id=False):
+    """
+    SELECT ambito_id, debito_cent, credito_cent movidos por id con fecha_hora en
+    [desde, hasta). Parámetros: ([ambito_id,] desde, hasta).
+    """
+    tabla, col, deb, cred = AMBITOS_SALDO[ambito]
+    return f"""
+        SELECT {col} AS ambito_id,
+               CAST(SUM({deb}) AS SIGNED) AS debito_cent,
+               CAST(SUM({cred}) AS SIGNED) AS credito_cent
+        FROM {tabla(desde)} t
+        WHERE {col} IS NOT NULL {"AND " + col + " = %s" if por_id else ""}
+          AND fecha_hora >= %s AND fecha_hora < %s
+        GROUP BY {col}
+    """
+
+
+def fecha_primer_movimiento():
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT MIN(fecha_hora) AS primero FROM {_tabla_movimientos()} m")
+            return cursor.fetchone()["primero"]
+    finally:
+        conn.close()
+
+
+def saldos(ambito, hasta=None, ambito_id=None):
+    """
+    Saldos (centavos) al final del día `hasta` (por defecto hoy) de todos los ids del
+    ámbito ("cuenta" | "empresa" | "banco"), o de uno solo con ambito_id.
+    Cada saldo es la instantánea del último cierre vigente anterior a `hasta` más lo
+    movido desde entonces: el costo no crece con la historia, solo con los meses
+    sin cerrar. Filas: ambito_id, corte (mes del cierre o None), cierre_cent,
+    delta_cent, saldo_cent.
+    """
+    if ambito not in AMBITOS_SALDO:
+        raise ValueError(f"Ámbito desconocido: {ambito}")
+    hasta = date.fromisoformat(str(hasta)[:10]) if hasta else date.today()
+    limite = hasta + timedelta(days=1)
+
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            # Último cierre vigente que termina a más tardar en `limite`, sin
+            # saltar por encima de uno no vigente (el arrastre pasa por él)
+            cursor.execute(
+                """
+                SELECT MAX(periodo) AS periodo FROM periodos_cierre
+                WHERE vigente = 1 AND periodo < %s
+                  AND periodo < COALESCE(
+                      (SELECT MIN(periodo) FROM periodos_cierre WHERE vigente = 0), '9999-12-31'
+                  )
+                """,
+                (limite.replace(day=1),),
+            )
+            corte = cursor.fetchone()["periodo"]
+
+            cierre = {}
+            if corte is not None:
+                cursor.execute(
+                    f"""
+                    SELECT ambito_id, saldo_cent FROM saldos_cierre
+                    WHERE periodo = %s AND ambito = %s {"AND ambito_id = %s" if ambito_id is not None else ""}
+                    """,
+                    (corte, ambito) + ((ambito_id,) if ambito_id is not None else ()),
+                )
+                cierre = {r["ambito_id"]: int(r["saldo_cent"]) for r in cursor.fetchall()}
+
+            # Delta: desde el primer día del mes siguiente al cierre
+            desde = (corte + timedelta(days=32)).replace(day=1) if corte is not None else _INICIO
+            cursor.execute(
+                sql_actividad(ambito, desde, por_id=ambito_id is not None),
+                ((ambito_id,) if ambito_id is not None else ()) + (str(desde), str(limite)),
+            )
+            delta = {
+                r["ambito_id"]: int(r["debito_cent"] or 0) - int(r["credito_cent"] or 0)
+                for r in cursor.fetchall()
+            }
+    finally:
+        conn.close()
+
+    return [
+        {
+            "ambito_id": i,
+            "corte": corte,
+            "cierre_cent": cierre.get(i, 0),
+            "delta_cent": delta.get(i, 0),
+            "saldo_cent": cierre.get(i, 0) + delta.get(i, 0),
+        }
+        for i in sorted(cierre.keys() | delta.keys())
+    ]
+
+
+def saldo(ambito, ambito_id, hasta=None):
+    """Saldo de un id (ver saldos); sin movimientos da una fila en cero."""
+    filas = saldos(ambito, hasta, ambito_id)
+    if filas:
+        return filas[0]
+    return {"ambito_id": ambito_id, "corte": None, "cierre_cent": 0, "delta_cent": 0, "saldo_cent": 0}
+
+
+# ---- Reportes (ver reportes.py) ----
+# Del primario: la firma y los datos de un reporte tienen que salir del mismo lado
+# (con una réplica atrasada quedarían datos viejos guardados bajo la clave nueva).
+def _filtro_reporte(empresa_id, banco_id, desde, hasta, alias="m"):
+    sql = f"{alias}.empresa_id = %s"
+    params = [empresa_id]
+    if banco_id is not None:
+        sql += f" AND {alias}.banco_id = %s"
+        params.append(banco_id)
+    sql += f" AND {alias}.fecha_hora >= %s AND {alias}.fecha_hora < %s + INTERVAL 1 DAY"
+    return sql, params + [str(desde), str(hasta)]
+
+
+def firma_reporte(empresa_id, desde, hasta, banco_id=None):
+    """
+    Resumen barato de lo que hay en el rango (cantidad, último id, totales): cambia
+    si entra un movimiento, y con él la clave del reporte en caché. Pasa por la
+    caché de consultas, que las escrituras del rango invalidan.
+    """
+    clave = ("firma_reporte", empresa_id, banco_id, str(desde), str(hasta))
+    en_cache, valor = CACHE_CONSULTAS.obtener(clave)
+    if en_cache:
+        return valor
+    inicio = valor
+
+    filtro, params = _filtro_reporte(empresa_id, banco_id, desde, hasta)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT COUNT(*) AS n, MAX(m.id) AS ultimo,
+                       CAST(COALESCE(SUM(m.total_debito_cent), 0) AS SIGNED) AS debito_cent,
+                       CAST(COALESCE(SUM(m.total_credito_cent), 0) AS SIGNED) AS credito_cent
+                FROM {_tabla_movimientos(desde)} m
+                WHERE {filtro}
+                """,
+                params,
+            )
+            r = cursor.fetchone()
+            firma = (r["n"], r["ultimo"], int(r["debito_cent"]), int(r["credito_cent"]))
+    finally:
+        conn.close()
+
+    CACHE_CONSULTAS.guardar(clave, firma, desde, hasta, inicio)
+    return firma
+
+
+def reporte_movimientos(empresa_id, desde, hasta, banco_id=None):
+    """Movimientos de la empresa (y banco) en el rango; importes en centavos."""
+    filtro, params = _filtro_reporte(empresa_id, banco_id, desde, hasta)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT m.id, m.fecha_hora, c.nombre_cli AS cliente, b.nombre_ban AS banco,
+                       m.total_debito_cent, m.total_credito_cent
+                FROM {_tabla_movimientos(desde)} m
+                LEFT JOIN clientes c ON c.id_cli = m.cliente_id
+                LEFT JOIN bancos b ON b.id_ban = m.banco_id
+                WHERE {filtro}
+                ORDER BY m.fecha_hora, m.id
+                """,
+                params,
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def reporte_cuentas(empresa_id, desde, hasta, banco_id=None):
+    """Débitos / créditos por cuenta de la empresa (y banco) en el rango, en centavos."""
+    filtro, params = _filtro_reporte(empresa_id, banco_id, desde, hasta)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT d.cuenta, cu.nombre_cue AS nombre, COUNT(*) AS lineas,
+                       CAST(SUM(d.debito_cent) AS SIGNED) AS debito_cent,
+                       CAST(SUM(d.credito_cent) AS SIGNED) AS credito_cent
+                FROM {_tabla_movimientos(desde)} m
+                JOIN {_tabla_detalle(desde)} d
+                  ON d.movimiento_id = m.id AND d.fecha_hora = m.fecha_hora
+                LEFT JOIN cuentas cu ON cu.id_cue = d.cuenta
+                WHERE {filtro}
+                GROUP BY d.cuenta, cu.nombre_cue
+                ORDER BY d.cuenta
+                """,
+                params,
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+# ---- Duplicados (huellas) ----
+def buscar_posibles_duplicados(huella, periodo, adjuntos=None, limite=5):
+    """Búsqueda por índice (huella + ventana de fechas vecinas, o mismo adjunto)."""
+    sql = """
+        SELECT h.movimiento_id, m.fecha_hora, m.total_debito_cent, m.total_credito_cent, 'HUELLA' AS motivo
+        FROM movimiento_huellas h
+        JOIN movimientos m ON m.id = h.movimiento_id
+        WHERE h.huella = %s AND h.periodo IN (%s, %s, %s)
+    """
+    params = [huella, periodo - 1, periodo, periodo + 1]
+    if adjuntos:
+        sql += """
+        UNION
+        SELECT h.movimiento_id, m.fecha_hora, m.total_debito_cent, m.total_credito_cent, 'ADJUNTO' AS motivo
+        FROM movimiento_huellas h
+        JOIN movimientos m ON m.id = h.movimiento_id
+        WHERE h.adjuntos = %s
+        """
+        params.append(adjuntos)
+    sql += " LIMIT %s"
+    params.append(int(limite))
+
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def movimientos_sin_huella(limite=2000):
+    """Movimientos antiguos sin huella, con sus líneas (Cuenta/archivo) para calcularla."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT m.id, m.fecha_hora, m.total_debito_cent, m.total_credito_cent,
+                       m.cliente_id, m.empresa_id, m.banco_id
+                FROM movimientos m
+                LEFT JOIN movimiento_huellas h ON h.movimiento_id = m.id
+                WHERE h.movimiento_id IS NULL
+                ORDER BY m.id
+                LIMIT %s
+                """,
+                (int(limite),),
+            )
+            movs = cursor.fetchall()
+            if not movs:
+                return []
+
+            por_id = {m["id"]: m for m in movs}
+            for m in movs:
+                m["lineas"] = []
+
+            cursor.execute(
+                f"""
+                SELECT movimiento_id, cuenta AS Cuenta, archivo
+                FROM movimiento_detalle
+                WHERE movimiento_id IN ({", ".join(["%s"] * len(por_id))})
+                """,
+                list(por_id.keys()),
+            )
+            for d in cursor.fetchall():
+                por_id[d["movimiento_id"]]["lineas"].append(d)
+            return movs
+    finally:
+        conn.close()
+
+
+def guardar_huellas(filas):
+    """filas: [(movimiento_id, huella, periodo, adjuntos)]"""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT IGNORE INTO movimiento_huellas (movimiento_id, huella, periodo, adjuntos)
+                VALUES (%s, %s, %s, %s)
+                """,
+                filas,
+            )
+        conn.commit()
+        _registrar_escritura()
+    finally:
+        conn.close()
+
+
+def marcar_duplicados_historicos():
+    """Marca cada movimiento con el primero anterior de igual huella (ventana vecina) o adjunto."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            n = cursor.execute(
+                """
+                UPDATE movimiento_huellas h
+                JOIN (
+                    SELECT h2.movimiento_id, MIN(h1.movimiento_id) AS orig
+                    FROM movimiento_huellas h2
+                    JOIN movimiento_huellas h1
+                      ON h1.huella = h2.huella
+                     AND h1.periodo BETWEEN h2.periodo - 1 AND h2.periodo + 1
+                     AND h1.movimiento_id < h2.movimiento_id
+                    GROUP BY h2.movimiento_id
+                ) d ON d.movimiento_id = h.movimiento_id
+                SET h.posible_duplicado_de = d.orig, h.motivo = 'HUELLA'
+                WHERE h.posible_duplicado_de IS NULL
+                """
+            )
+            n += cursor.execute(
+                """
+                UPDATE movimiento_huellas h
+                JOIN (
+                    SELECT h2.movimiento_id, MIN(h1.movimiento_id) AS orig
+                    FROM movimiento_huellas h2
+                    JOIN movimiento_huellas h1
+                      ON h1.adjuntos = h2.adjuntos
+                     AND h1.movimiento_id < h2.movimiento_id
+                    WHERE h2.adjuntos IS NOT NULL
+                    GROUP BY h2.movimiento_id
+                ) d ON d.movimiento_id = h.movimiento_id
+                SET h.posible_duplicado_de = d.orig, h.motivo = 'ADJUNTO'
+                WHERE h.posible_duplicado_de IS NULL
+                """
+            )
+        conn.commit()
+        _registrar_escritura()
+        return n
+    finally:
+        conn.close()
+
+
+def listar_duplicados_marcados():
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT movimiento_id, posible_duplicado_de, motivo
+                FROM movimiento_huellas
+                WHERE posible_duplicado_de IS NOT NULL
+                ORDER BY movimiento_id
+                """
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+
+# ---- Adjuntos empaquetados (ver adjuntos.py) ----
+def adjuntos_por_empaquetar(corte, despues_de="", limite=1000):
+    """
+    Adjuntos de movimientos anteriores a `corte` que aún no están en un paquete,
+    ordenados por ruta (paginación por clave: despues_de = última ruta vista).
+    """
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT d.archivo, MIN(d.fecha_hora) AS fecha_hora
+                FROM {_tabla_detalle(None)} d
+                LEFT JOIN adjuntos_paquetes p ON p.archivo = d.archivo
+                WHERE d.archivo IS NOT NULL AND d.archivo > %s
+                  AND d.fecha_hora < %s
+                  AND p.archivo IS NULL
+                GROUP BY d.archivo
+                ORDER BY d.archivo
+                LIMIT %s
+                """,
+                (despues_de or "", str(corte), int(limite)),
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def registrar_empaquetados(filas):
+    """filas: [(archivo, paquete, inicio, largo_comprimido, largo, metodo, sha256)]."""
+    if not filas:
+        return 0
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO adjuntos_paquetes
+                (archivo, paquete, inicio, largo_comprimido, largo, metodo, sha256)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                filas,
+            )
+        conn.commit()
+        _registrar_escritura()
+        return len(filas)
+    finally:
+        conn.close()
+
+
+def ubicar_adjuntos(archivos):
+    """{archivo: {paquete, inicio, largo_comprimido, largo, metodo, sha256}} de los que están empaquetados."""
+    archivos = [a for a in dict.fromkeys(archivos) if a]
+    if not archivos:
+        return {}
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT archivo, paquete, inicio, largo_comprimido, largo, metodo, sha256
+                FROM adjuntos_paquetes
+                WHERE archivo IN ({", ".join(["%s"] * len(archivos))})
+                """,
+                archivos,
+            )
+            return {r["archivo"]: r for r in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+def listar_empaquetados(despues_de="", limite=5000):
+    """Índice completo por tramos (paginación por ruta)."""
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT archivo, paquete, inicio, largo_comprimido, largo, metodo, sha256
+                FROM adjuntos_paquetes
+                WHERE archivo > %s
+                ORDER BY archivo
+                LIMIT %s
+                """,
+                (despues_de or "", int(limite)),
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+
+def iterar_adjuntos_referenciados(lote=LOTE_COLUMNAR):
+    """
+    Lotes de (movimiento_id, archivo, huella de adjuntos) de todo el detalle con
+    adjunto, leídos con cursor sin buffer (no se carga la tabla entera).
+    """
+    import pymysql
+
+    conn = get_connection(lectura=True)
+    try:
+        with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(
+                f"""
+                SELECT d.movimiento_id, d.archivo, h.adjuntos
+                FROM {_tabla_detalle(None)} d
+                LEFT JOIN movimiento_huellas h ON h.movimiento_id = d.movimiento_id
+                WHERE d.archivo IS NOT NULL AND d.archivo <> ''
+                """
+            )
+            while True:
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                yield filas
+    finally:
+        conn.close()
+
+
+# ---- Auditoría (ver auditoria.py) ----
+def insertar_auditoria(filas):
+    """filas: [(momento, usuario, accion, entidad, entidad_id, detalle_json)] en un INSERT multi-fila."""
+    if not filas:
+        return 0
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO auditoria (momento, usuario, accion, entidad, entidad_id, detalle)
+                VALUES {", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(filas))}
+                """,
+                [v for fila in filas for v in fila],
+            )
+        conn.commit()
+        return len(filas)
+    finally:
+        conn.close()
+
+
+# ---- Métricas ----
+# Latencia y errores de cada función pública de este módulo (etiqueta funcion=...),
+# sin tocar las páginas: se envuelven aquí, antes de que nadie las importe.
+_SIN_MEDIR = {
+    "set_sesion", "get_connection", "columnas_desde_lotes", "version_catalogos", "version_usuarios",
+    "iterar_adjuntos_referenciados",   # generador: la envoltura solo mediría su creación
+    "sql_actividad",                   # solo arma texto SQL
+    "validar_movimiento",              # no toca la BD
+}
+
+
+def _medida(fn):
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        t = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            metricas.contar("ge_db_errores_total", funcion=fn.__name__)
+            raise
+        finally:
+            metricas.observar("ge_db_consulta_segundos", time.perf_counter() - t, funcion=fn.__name__)
+    return envoltura
+
+
+for _nombre, _fn in list(globals().items()):
+    if (
+        callable(_fn)
+        and getattr(_fn, "__module__", None) == __name__
+        and not _nombre.startswith("_")
+        and _nombre not in _SIN_MEDIR
+        and not isinstance(_fn, type)
+    ):
+        globals()[_nombre] = _medida(_fn)
+
+
+def _metricas_cache():
+    e = CACHE_CONSULTAS.estadisticas()
+    return [
+        ("ge_cache_entradas", {}, e["entradas"]),
+        ("ge_cache_bytes", {}, e["bytes"]),
+        ("ge_cache_aciertos_total", {}, e["aciertos"]),
+        ("ge_cache_fallos_total", {}, e["fallos"]),
+    ]
+
+
+metricas.registrar_recolector(_metricas_cache)
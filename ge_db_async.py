@@ -0,0 +1,71 @@
+# ge_db_async.py
+# Variante asyncio de ge_db: cada función corre en un pool de hilos (pymysql es
+# bloqueante), así una página puede lanzar todas sus consultas a la vez y esperar
+# solo la más lenta.
+#
+#   from ge_db_async import ejecutar, listar_clientes, listar_bancos
+#   clientes, bancos = ejecutar(listar_clientes(), listar_bancos())
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import ge_db
+import metricas
+
+HILOS = int(os.environ.get("GE_DB_ASYNC_HILOS", "8"))
+_pool = ThreadPoolExecutor(max_workers=HILOS, thread_name_prefix="ge_db")
+metricas.fijar("ge_db_pool_hilos", HILOS)
+
+
+async def en_hilo(fn, *args, **kwargs):
+    """Ejecuta `fn` en el pool conservando el contexto (sesión de ge_db para réplicas)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    metricas.contar("ge_db_pool_ocupados", 1)
+    try:
+        return await loop.run_in_executor(_pool, functools.partial(ctx.run, fn, *args, **kwargs))
+    finally:
+        metricas.contar("ge_db_pool_ocupados", -1)
+
+
+def _asincrona(fn):
+    @functools.wraps(fn)
+    async def envoltura(*args, **kwargs):
+        return await en_hilo(fn, *args, **kwargs)
+    return envoltura
+
+
+def ejecutar(*corrutinas):
+    """Desde código síncrono (páginas): corre las corrutinas a la vez y devuelve sus resultados en orden."""
+    async def _todas():
+        return await asyncio.gather(*corrutinas)
+    return asyncio.run(_todas())
+
+
+# ---- Lecturas ----
+listar_roles = _asincrona(ge_db.listar_roles)
+listar_usuarios = _asincrona(ge_db.listar_usuarios)
+listar_usuarios_pagina = _asincrona(ge_db.listar_usuarios_pagina)
+contar_usuarios = _asincrona(ge_db.contar_usuarios)
+listar_movimientos = _asincrona(ge_db.listar_movimientos)
+obtener_movimiento = _asincrona(ge_db.obtener_movimiento)
+listar_detalle_movimiento = _asincrona(ge_db.listar_detalle_movimiento)
+listar_clientes = _asincrona(ge_db.listar_clientes)
+listar_empresas = _asincrona(ge_db.listar_empresas)
+listar_bancos = _asincrona(ge_db.listar_bancos)
+listar_cuentas_activas = _asincrona(ge_db.listar_cuentas_activas)
+listar_catalogo_pagina = _asincrona(ge_db.listar_catalogo_pagina)
+saldos_corridos_banco = _asincrona(ge_db.saldos_corridos_banco)
+saldos = _asincrona(ge_db.saldos)
+saldo = _asincrona(ge_db.saldo)
+movimientos_por_conciliar = _asincrona(ge_db.movimientos_por_conciliar)
+listar_extractos = _asincrona(ge_db.listar_extractos)
+listar_lineas_pendientes = _asincrona(ge_db.listar_lineas_pendientes)
+buscar_posibles_duplicados = _asincrona(ge_db.buscar_posibles_duplicados)
+
+# ---- Escrituras ----
+guardar_movimiento = _asincrona(ge_db.guardar_movimiento)
+guardar_movimientos_lote = _asincrona(ge_db.guardar_movimientos_lote)
+upsert_catalogo = _asincrona(ge_db.upsert_catalogo)
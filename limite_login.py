@@ -0,0 +1,166 @@
+# limite_login.py
+# Freno de intentos de login antes de tocar la BD o bcrypt (compartido por todas las
+# sesiones del proceso).
+#
+# - Cubetas de fichas por dirección, por usuario+dirección y por usuario (tope
+#   global de la cuenta): ráfagas cortas sí, ráfagas largas no. Una dirección desde
+#   la que el usuario ya entró bien (CONFIANZA_SEG) no depende del tope global.
+# - Retardo progresivo: desde el 3.er fallo seguido de un usuario desde una misma
+#   dirección, bloqueo de 1, 2, 4, 8... s (tope RETARDO_MAX_SEG). Va por
+#   usuario+dirección para que un ataque no deje fuera al dueño de la cuenta.
+# - Caché negativa: un usuario que no existe se rechaza durante TTL_DESCONOCIDO_SEG
+#   sin consultar la BD (con el mismo mensaje que una clave errónea).
+#
+#   estado, espera = LIMITADOR.permitir(usuario, ip)    # "ok" | "espera" | "desconocido"
+#   ...autenticar solo si estado == "ok"...
+#   LIMITADOR.registrar(usuario, ip, motivo)           # "ok" | "clave" | "no_existe"
+import os
+import threading
+import time
+from collections import OrderedDict
+
+FICHAS_IP = (20, 3.0)          # capacidad, segundos por ficha repuesta
+FICHAS_USUARIO_IP = (5, 30.0)
+FICHAS_USUARIO = (30, 2.0)
+FALLOS_ANTES_RETARDO = 3
+RETARDO_MAX_SEG = 300
+TTL_DESCONOCIDO_SEG = 120
+CONFIANZA_SEG = 24 * 3600
+MAX_CLAVES = 10000             # tope de memoria: se olvidan las más viejas
+# Solo detrás de un proxy propio que agrega la dirección real a X-Forwarded-For
+PROXY_CONFIABLE = os.environ.get("GE_PROXY_CONFIABLE", "0") == "1"
+
+
+class LimitadorLogin:
+    def __init__(self, fichas_ip=FICHAS_IP, fichas_usuario_ip=FICHAS_USUARIO_IP,
+                 fichas_usuario=FICHAS_USUARIO, max_claves=MAX_CLAVES):
+        self.fichas_ip = fichas_ip
+        self.fichas_usuario_ip = fichas_usuario_ip
+        self.fichas_usuario = fichas_usuario
+        self.max_claves = max_claves
+        self._lock = threading.Lock()
+        self._cubetas = OrderedDict()        # ("u"|"ip", clave) -> [fichas, momento]
+        self._fallos = OrderedDict()         # (usuario, ip) -> [fallos seguidos, bloqueado_hasta]
+        self._desconocidos = OrderedDict()   # usuario -> vence
+        self._confiables = OrderedDict()     # (usuario, ip) -> vence (último login correcto)
+
+    @staticmethod
+    def _norm(usuario):
+        return (usuario or "").strip().lower()
+
+    def _acotar(self, d):
+        while len(d) > self.max_claves:
+            d.popitem(last=False)
+
+    def _cubeta(self, clave, capacidad, cada_seg, ahora):
+        """Cubeta al día (fichas repuestas hasta `ahora`)."""
+        c = self._cubetas.get(clave)
+        if c is None:
+            c = self._cubetas[clave] = [float(capacidad), ahora]
+            self._acotar(self._cubetas)
+        else:
+            self._cubetas.move_to_end(clave)
+            c[0] = min(capacidad, c[0] + (ahora - c[1]) / cada_seg)
+            c[1] = ahora
+        return c
+
+    def _tomar(self, cubetas, ahora):
+        """Toma una ficha de cada cubeta solo si todas tienen; si no, segundos hasta poder."""
+        cs = [(self._cubeta(clave, cap, seg, ahora), seg) for clave, cap, seg in cubetas]
+        espera = max((1 - c[0]) * seg for c, seg in cs)
+        if espera > 0:
+            return espera
+        for c, _ in cs:
+            c[0] -= 1
+        return 0.0
+
+    def permitir(self, usuario, ip, ahora=None):
+        ahora = time.monotonic() if ahora is None else ahora
+        u, ip = self._norm(usuario), ip or "-"
+        with self._lock:
+            f = self._fallos.get((u, ip))
+            if f and f[1] > ahora:
+                return "espera", f[1] - ahora
+
+            # Un intento frenado no gasta fichas de las otras cubetas
+            # (así el ataque desde otra dirección no vacía la cuota del dueño)
+            cubetas = [
+                (("ip", ip), *self.fichas_ip),
+                (("u+ip", u, ip), *self.fichas_usuario_ip),
+            ]
+            if self._confiables.get((u, ip), 0) <= ahora:
+                cubetas.append((("u", u), *self.fichas_usuario))
+            espera = self._tomar(cubetas, ahora)
+            if espera:
+                return "espera", espera
+
+            vence = self._desconocidos.get(u)
+            if vence is not None:
+                if vence > ahora:
+                    return "desconocido", 0.0
+                del self._desconocidos[u]
+        return "ok", 0.0
+
+    def registrar(self, usuario, ip, motivo, ahora=None):
+        ahora = time.monotonic() if ahora is None else ahora
+        u, ip = self._norm(usuario), ip or "-"
+        with self._lock:
+            if motivo == "ok":
+                # Entrar bien no cuenta contra el usuario en esa dirección
+                self._fallos.pop((u, ip), None)
+                self._cubetas.pop(("u+ip", u, ip), None)
+                self._desconocidos.pop(u, None)
+                self._confiables[(u, ip)] = ahora + CONFIANZA_SEG
+                self._confiables.move_to_end((u, ip))
+                self._acotar(self._confiables)
+                return
+
+            if motivo == "no_existe":
+                self._desconocidos[u] = ahora + TTL_DESCONOCIDO_SEG
+                self._desconocidos.move_to_end(u)
+                self._acotar(self._desconocidos)
+
+            f = self._fallos.get((u, ip))
+            if f is None:
+                f = self._fallos[(u, ip)] = [0, 0.0]
+                self._acotar(self._fallos)
+            f[0] += 1
+            if f[0] >= FALLOS_ANTES_RETARDO:
+                f[1] = ahora + min(2 ** (f[0] - FALLOS_ANTES_RETARDO), RETARDO_MAX_SEG)
+
+    def olvidar(self, usuario):
+        """Tras crear o reactivar un usuario: que la caché negativa no lo bloquee."""
+        u = self._norm(usuario)
+        with self._lock:
+            self._desconocidos.pop(u, None)
+            for k in [k for k in self._fallos if k[0] == u]:
+                del self._fallos[k]
+
+    def olvidar_confianza(self, usuario):
+        """Tras cambiar la contraseña: ninguna dirección queda como confiable."""
+        u = self._norm(usuario)
+        with self._lock:
+            for k in [k for k in self._confiables if k[0] == u]:
+                del self._confiables[k]
+
+
+LIMITADOR = LimitadorLogin()
+
+
+def ip_cliente():
+    """
+    Dirección del navegador según Streamlit. X-Forwarded-For lo escribe el cliente,
+    así que solo se usa con GE_PROXY_CONFIABLE=1 (Streamlit detrás de un proxy
+    propio) y tomando la entrada que agregó ese proxy (la última), no la primera.
+    """
+    import streamlit as st
+
+    ctx = getattr(st, "context", None)
+    if ctx is None:
+        return None
+    if PROXY_CONFIABLE:
+        headers = getattr(ctx, "headers", None) or {}
+        saltos = [s.strip() for s in (headers.get("X-Forwarded-For") or "").split(",") if s.strip()]
+        if saltos:
+            return saltos[-1]
+    return getattr(ctx, "ip_address", None)
@@ -0,0 +1,140 @@
+# lineas_modelo.py
+# Líneas del detalle en edición (pestaña Crear de Movimientos).
+#
+# Se guardan en session_state como registros con __slots__ (sin DataFrame): la
+# cuenta es su id, no la etiqueta del selectbox. El DataFrame solo existe en el
+# borde con st.data_editor (a_editor / desde_editor) y las líneas se mutan en su
+# sitio, así la memoria por sesión y el trabajo por rerun crecen solo con las líneas.
+# El monto se guarda en centavos (int); el editor lo muestra en unidades.
+
+from dinero import a_centavos
+
+COLUMNAS_EDITOR = ["cuenta", "descripcion", "monto", "notas"]
+SIN_CUENTA = "Seleccione"
+
+
+class Linea:
+    __slots__ = ("cuenta_id", "descripcion", "monto_cent", "notas")
+
+    def __init__(self, cuenta_id=None, descripcion="", monto_cent=0, notas=""):
+        self.cuenta_id = cuenta_id
+        self.descripcion = descripcion
+        self.monto_cent = monto_cent
+        self.notas = notas
+
+    def copia(self):
+        return Linea(self.cuenta_id, self.descripcion, self.monto_cent, self.notas)
+
+
+def _texto(v) -> str:
+    # NaN / None del editor -> ""
+    return "" if v is None or v != v else str(v)
+
+
+def _centavos(v) -> int:
+    try:
+        return a_centavos(v)
+    except (TypeError, ValueError, ArithmeticError):
+        return 0
+
+
+class Lineas:
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items = [Linea()]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    # ---- Acciones de los botones ----
+    def nueva(self):
+        self.items.append(Linea())
+
+    def duplicar_ultima(self):
+        self.items.append(self.items[-1].copia() if self.items else Linea())
+
+    def limpiar(self):
+        del self.items[1:]
+        if self.items:
+            l = self.items[0]
+            l.cuenta_id, l.descripcion, l.monto_cent, l.notas = None, "", 0, ""
+        else:
+            self.items.append(Linea())
+
+    def cuentas_usadas(self) -> list:
+        vistas = []
+        for l in self.items:
+            if l.cuenta_id is not None and l.cuenta_id not in vistas:
+                vistas.append(l.cuenta_id)
+        return vistas
+
+    # ---- Borde con st.data_editor ----
+    def a_editor(self, id_to_label: dict):
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "cuenta": [id_to_label.get(l.cuenta_id, SIN_CUENTA) for l in self.items],
+                "descripcion": [l.descripcion for l in self.items],
+                "monto": [l.monto_cent / 100 for l in self.items],
+                "notas": [l.notas for l in self.items],
+            },
+            columns=COLUMNAS_EDITOR,
+        )
+
+    def desde_editor(self, df, label_to_id: dict):
+        """Aplica lo devuelto por el editor sobre las líneas existentes (altas/bajas al final)."""
+        if df is None:
+            return
+        cols = {c: (list(df[c]) if c in df.columns else None) for c in COLUMNAS_EDITOR}
+        n = len(df)
+
+        if n < len(self.items):
+            del self.items[n:]
+        while len(self.items) < n:
+            self.items.append(Linea())
+
+        for i, l in enumerate(self.items):
+            if cols["cuenta"] is not None:
+                l.cuenta_id = label_to_id.get(_texto(cols["cuenta"][i]))
+            if cols["descripcion"] is not None:
+                l.descripcion = _texto(cols["descripcion"][i])
+            if cols["monto"] is not None:
+                l.monto_cent = _centavos(cols["monto"][i])
+            if cols["notas"] is not None:
+                l.notas = _texto(cols["notas"][i])
+
+    # ---- Validación y salida hacia guardar_movimiento ----
+    def validar(self, cuentas_validas) -> list:
+        if not self.items:
+            return ["Debe existir al menos 1 línea."]
+        errores = []
+        for i, l in enumerate(self.items):
+            if l.cuenta_id is None or l.cuenta_id not in cuentas_validas:
+                errores.append(f"Línea {i+1}: selecciona una cuenta válida.")
+            if l.monto_cent <= 0:
+                errores.append(f"Línea {i+1}: el monto debe ser mayor a 0.")
+        return errores
+
+    def para_guardar(self, id_to_nat: dict):
+        """(lineas_out, total_debito_cent, total_credito_cent, diff_cent) para guardar_movimiento."""
+        lineas_out = []
+        total_debito = total_credito = 0
+        for l in self.items:
+            nat = id_to_nat.get(l.cuenta_id, "DEBITO")  # DEBITO/CREDITO
+            deb = l.monto_cent if nat == "DEBITO" else 0
+            cre = l.monto_cent if nat == "CREDITO" else 0
+            total_debito += deb
+            total_credito += cre
+            lineas_out.append({
+                "Cuenta": l.cuenta_id,               # <- BD (movimiento_detalle.cuenta)
+                "Descripción": l.descripcion,
+                "debito_cent": deb,
+                "credito_cent": cre,
+                "Notas": l.notas,
+            })
+        return lineas_out, total_debito, total_credito, total_debito - total_credito
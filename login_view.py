@@ -1,6 +1,6 @@
 # login_view.py
 import streamlit as st
-from ge_db import autenticar
+from limite_login import LIMITADOR, ip_cliente
 
 def login_screen():
     st.markdown("""
@@ -97,7 +97,26 @@ def login_screen():
             ok = st.form_submit_button("Entrar")
 
         if ok:
-            user = autenticar(username, password)
+            # Freno antes de cualquier trabajo de BD / bcrypt
+            ip = ip_cliente()
+            estado, espera = LIMITADOR.permitir(username, ip)
+            if estado == "espera":
+                import metricas
+
+                metricas.contar("ge_logins_total", resultado="limitado")
+                st.error(f"Demasiados intentos. Espera {max(1, round(espera))} s y vuelve a intentar.")
+                st.stop()
+
+            user = None
+            if estado == "ok":
+                from ge_db import autenticar   # pymysql/bcrypt solo al enviar el formulario
+
+                user, motivo = autenticar(username, password, con_motivo=True)
+                LIMITADOR.registrar(username, ip, motivo)
+            else:
+                # Usuario inexistente en caché negativa: mismo mensaje, sin BD
+                LIMITADOR.registrar(username, ip, "no_existe")
+
             if user:
                 st.session_state.auth = user
                 st.session_state["rol"] = user.get("rol", "CONSULTA")
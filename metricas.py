@@ -0,0 +1,203 @@
+# metricas.py
+# Métricas de operación en formato de texto de Prometheus, servidas en un puerto
+# local al lado de Streamlit (un hilo con http.server, sin dependencias).
+#
+#   GE_METRICS_PORT=9464   puerto (0 = desactivado). Con varios procesos detrás de
+#                          un proxy, cada uno toma el primero libre entre
+#   GE_METRICS_PORT_RANGE=8  GE_METRICS_PORT y GE_METRICS_PORT + 7 (o se le da su
+#                          propio GE_METRICS_PORT); si no hay ninguno libre, avisa al log.
+#
+#   metricas.contar("ge_logins_total", resultado="ok")
+#   metricas.observar("ge_db_consulta_segundos", 0.012, funcion="listar_movimientos")
+#   with metricas.cronometro("ge_db_consulta_segundos", funcion="..."): ...
+#
+# Los contadores viven en memoria del proceso; Prometheus calcula tasas y percentiles.
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PUERTO = int(os.environ.get("GE_METRICS_PORT", "9464"))
+RANGO_PUERTOS = max(int(os.environ.get("GE_METRICS_PORT_RANGE", "8")), 1)
+
+log = logging.getLogger(__name__)
+
+# Límites de los histogramas (segundos por defecto)
+CUBETAS_SEG = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CUBETAS = {
+    "ge_movimiento_lineas": (1, 2, 5, 10, 20, 50, 100, 200),
+}
+
+AYUDA = {
+    "ge_logins_total": ("counter", "Intentos de login por resultado (ok / fallo)."),
+    "ge_movimientos_guardados_total": ("counter", "Movimientos guardados."),
+    "ge_movimiento_lineas": ("histogram", "Líneas por movimiento guardado."),
+    "ge_adjuntos_bytes_total": ("counter", "Bytes de adjuntos escritos en data/uploads."),
+    "ge_db_consulta_segundos": ("histogram", "Duración de las llamadas de ge_db por función."),
+    "ge_db_errores_total": ("counter", "Llamadas de ge_db que terminaron en excepción."),
+    "ge_db_conexiones_total": ("counter", "Intentos de conexión a MySQL por destino (primario / replica)."),
+    "ge_db_pool_ocupados": ("gauge", "Tareas en curso en el pool de hilos de ge_db_async."),
+    "ge_db_pool_hilos": ("gauge", "Tamaño del pool de hilos de ge_db_async."),
+    "ge_rerun_segundos": ("histogram", "Duración de un rerun completo por página."),
+    "ge_diario_entradas": ("gauge", "Entradas del diario local por estado (pendiente / error)."),
+    "ge_diario_pendiente_antiguedad_segundos": ("gauge", "Antigüedad de la entrada pendiente más vieja del diario."),
+    "ge_auditoria_pendientes": ("gauge", "Eventos de auditoría en cola, aún no escritos en MySQL."),
+    "ge_auditoria_escritos_total": ("counter", "Eventos de auditoría escritos."),
+    "ge_auditoria_lotes_total": ("counter", "INSERT multi-fila de auditoría (commits en grupo)."),
+    "ge_auditoria_descartados_total": ("counter", "Eventos de auditoría descartados por cola llena."),
+    "ge_auditoria_rechazados_total": ("counter", "Eventos de auditoría rechazados por MySQL (datos inválidos)."),
+    "ge_reportes_en_curso": ("gauge", "Reportes en generación en el pool de procesos."),
+    "ge_reportes_generados_total": ("counter", "Reportes generados por formato."),
+    "ge_reportes_errores_total": ("counter", "Reportes cuya generación falló, por formato."),
+    "ge_reportes_segundos": ("histogram", "Duración de la generación de un reporte por formato."),
+    "ge_reportes_cache_total": ("counter", "Búsquedas en la caché de reportes (acierto / fallo)."),
+    "ge_cache_entradas": ("gauge", "Entradas en la caché de consultas."),
+    "ge_cache_bytes": ("gauge", "Bytes en la caché de consultas."),
+    "ge_cache_aciertos_total": ("counter", "Aciertos de la caché de consultas (este proceso)."),
+    "ge_cache_fallos_total": ("counter", "Fallos de la caché de consultas (este proceso)."),
+}
+
+_lock = threading.Lock()
+_contadores = {}       # (nombre, etiquetas) -> valor
+_histogramas = {}      # (nombre, etiquetas) -> [cubetas..., suma, cuenta]
+_recolectores = []     # funciones -> [(nombre, etiquetas_dict, valor)] leídas al exportar
+_servidor = None
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+
+def contar(nombre, valor=1, **etiquetas):
+    k = _clave(nombre, etiquetas)
+    with _lock:
+        _contadores[k] = _contadores.get(k, 0) + valor
+
+
+def fijar(nombre, valor, **etiquetas):
+    with _lock:
+        _contadores[_clave(nombre, etiquetas)] = valor
+
+
+def observar(nombre, valor, **etiquetas):
+    limites = CUBETAS.get(nombre, CUBETAS_SEG)
+    k = _clave(nombre, etiquetas)
+    with _lock:
+        h = _histogramas.get(k)
+        if h is None:
+            h = _histogramas[k] = [0] * (len(limites) + 2)
+        for i, le in enumerate(limites):
+            if valor <= le:
+                h[i] += 1
+        h[-2] += valor
+        h[-1] += 1
+
+
+@contextmanager
+def cronometro(nombre, **etiquetas):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, time.perf_counter() - t, **etiquetas)
+
+
+def registrar_recolector(fn):
+    """`fn()` -> [(nombre, {etiquetas}, valor)]; se llama en cada lectura de /metrics."""
+    _recolectores.append(fn)
+
+
+def _etiquetas_txt(etiquetas):
+    if not etiquetas:
+        return ""
+    partes = []
+    for k, v in etiquetas:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{k}="{v}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def exportar() -> str:
+    """Todas las métricas en formato de exposición de texto de Prometheus."""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {k: list(v) for k, v in _histogramas.items()}
+    for fn in _recolectores:
+        try:
+            for nombre, etiquetas, valor in fn():
+                contadores[_clave(nombre, etiquetas)] = valor
+        except Exception:
+            pass   # una métrica que no se puede leer no tumba el endpoint
+
+    por_nombre = {}
+    for (nombre, etiquetas), v in contadores.items():
+        por_nombre.setdefault(nombre, []).append((etiquetas, v))
+    for (nombre, etiquetas), h in histogramas.items():
+        por_nombre.setdefault(nombre, []).append((etiquetas, h))
+
+    out = []
+    for nombre in sorted(por_nombre):
+        tipo, ayuda = AYUDA.get(nombre, ("untyped", ""))
+        if ayuda:
+            out.append(f"# HELP {nombre} {ayuda}")
+        out.append(f"# TYPE {nombre} {tipo}")
+        for etiquetas, v in sorted(por_nombre[nombre]):
+            if tipo != "histogram":
+                out.append(f"{nombre}{_etiquetas_txt(etiquetas)} {v}")
+                continue
+            for le, n in zip(CUBETAS.get(nombre, CUBETAS_SEG), v):
+                out.append(f"{nombre}_bucket{_etiquetas_txt(etiquetas + (('le', le),))} {n}")
+            out.append(f"{nombre}_bucket{_etiquetas_txt(etiquetas + (('le', '+Inf'),))} {v[-1]}")
+            out.append(f"{nombre}_sum{_etiquetas_txt(etiquetas)} {v[-2]}")
+            out.append(f"{nombre}_count{_etiquetas_txt(etiquetas)} {v[-1]}")
+    return "\n".join(out) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        cuerpo = exportar().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor(puerto=None, rango=None):
+    """
+    Arranca el endpoint una vez por proceso, en el primer puerto libre entre
+    `puerto` y `puerto + rango - 1`. Si están todos ocupados lo avisa al log y no
+    reintenta.
+    """
+    global _servidor
+    puerto = PUERTO if puerto is None else puerto
+    rango = RANGO_PUERTOS if rango is None else rango
+    with _lock:
+        if _servidor is not None or not puerto:
+            return _servidor
+        for p in range(puerto, puerto + rango):
+            try:
+                _servidor = ThreadingHTTPServer(("127.0.0.1", p), _Handler)
+                break
+            except OSError:
+                continue
+        else:
+            _servidor = False     # no reintentar en cada rerun
+            log.warning(
+                "Métricas desactivadas en este proceso (pid %s): puertos %s-%s ocupados. "
+                "Suba GE_METRICS_PORT_RANGE o dele a cada proceso su GE_METRICS_PORT.",
+                os.getpid(), puerto, puerto + rango - 1,
+            )
+            return None
+    if p != puerto:
+        log.info("Métricas en 127.0.0.1:%s (pid %s; %s ocupado)", p, os.getpid(), puerto)
+    threading.Thread(target=_servidor.serve_forever, name="metricas", daemon=True).start()
+    return _servidor
@@ -0,0 +1,216 @@
+# migraciones.py
+# Migraciones versionadas del esquema (carpeta esquema/).
+#
+#   esquema/0001_nombre.sql   sentencias separadas por ';'
+#   esquema/0004_nombre.py    define aplicar(cursor)
+#
+#   python migraciones.py estado    versiones aplicadas / pendientes
+#   python migraciones.py aplicar   aplica las pendientes en orden
+#   python migraciones.py indices   revisa índices faltantes en la BD viva
+#
+# Cada versión aplicada queda en schema_migraciones (con checksum del archivo).
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+
+from ge_db import get_connection
+
+CARPETA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "esquema")
+
+# Índices que necesitan las consultas de ge_db: (tabla, columnas iniciales, quién la usa)
+INDICES = [
+    ("usuarios", ("usuario",), "autenticar / obtener_usuario_por_username"),
+    ("usuarios", ("rol_id",), "listar_usuarios / listar_usuarios_pagina (filtro por rol)"),
+    ("movimientos", ("fecha_hora",), "listar_movimientos (rango de fechas)"),
+    ("movimientos", ("banco_id", "fecha_hora"), "saldos_corridos_banco / movimientos_por_conciliar"),
+    ("movimiento_detalle", ("movimiento_id",), "listar_detalle_movimiento"),
+    ("movimiento_detalle", ("cuenta", "fecha_hora"), "saldo / saldos (delta por cuenta desde el cierre)"),
+    ("movimientos", ("empresa_id", "fecha_hora"), "saldo / saldos (delta por empresa desde el cierre)"),
+    ("clientes", ("status_cli", "nombre_cli"), "listar_clientes"),
+    ("empresas", ("status_emp", "nombre_emp"), "listar_empresas"),
+    ("bancos", ("status_ban", "nombre_ban"), "listar_bancos"),
+    ("cuentas", ("tipo_cue", "nombre_cue"), "listar_cuentas_activas"),
+    ("extracto_lineas", ("movimiento_id",), "movimientos_por_conciliar (LEFT JOIN)"),
+    ("movimiento_huellas", ("huella", "periodo"), "buscar_posibles_duplicados"),
+]
+
+_PATRON = re.compile(r"^(\d{4})_([\w]+)\.(sql|py)$")
+
+
+def archivos_migracion():
+    out = []
+    for nombre in sorted(os.listdir(CARPETA)):
+        m = _PATRON.match(nombre)
+        if m:
+            out.append((int(m.group(1)), m.group(2), os.path.join(CARPETA, nombre)))
+    return out
+
+
+def _checksum(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _sentencias_sql(texto):
+    lineas = [l for l in texto.splitlines() if not l.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lineas).split(";") if s.strip()]
+
+
+def _asegurar_tabla(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migraciones (
+            version INT PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            aplicada_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def versiones_aplicadas(cursor):
+    _asegurar_tabla(cursor)
+    cursor.execute("SELECT version, nombre, checksum, aplicada_en FROM schema_migraciones ORDER BY version")
+    return {r["version"]: r for r in cursor.fetchall()}
+
+
+def _ejecutar(cursor, path):
+    if path.endswith(".sql"):
+        with open(path, encoding="utf-8") as f:
+            for sentencia in _sentencias_sql(f.read()):
+                cursor.execute(sentencia)
+    else:
+        spec = importlib.util.spec_from_file_location(f"migracion_{os.path.basename(path)[:4]}", path)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        mod.aplicar(cursor)
+
+
+def aplicar(hasta=None):
+    """Aplica en orden las migraciones pendientes. Devuelve las versiones aplicadas."""
+    hechas = []
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            aplicadas = versiones_aplicadas(cursor)
+            for version, nombre, path in archivos_migracion():
+                if version in aplicadas:
+                    continue
+                if hasta is not None and version > hasta:
+                    break
+                print(f"Aplicando {version:04d}_{nombre} ...")
+                # El DDL de MySQL hace commit implícito: se registra tras terminar sin error
+                _ejecutar(cursor, path)
+                cursor.execute(
+                    "INSERT INTO schema_migraciones (version, nombre, checksum) VALUES (%s, %s, %s)",
+                    (version, nombre, _checksum(path)),
+                )
+                conn.commit()
+                hechas.append(version)
+    finally:
+        conn.close()
+    return hechas
+
+
+def estado():
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            aplicadas = versiones_aplicadas(cursor)
+    finally:
+        conn.close()
+
+    for version, nombre, path in archivos_migracion():
+        r = aplicadas.get(version)
+        if r is None:
+            print(f"{version:04d}_{nombre}: PENDIENTE")
+        elif r["checksum"] != _checksum(path):
+            print(f"{version:04d}_{nombre}: aplicada {r['aplicada_en']} (¡archivo modificado después!)")
+        else:
+            print(f"{version:04d}_{nombre}: aplicada {r['aplicada_en']}")
+
+
+# -------- Ayudas para migraciones .py idempotentes ----------
+def tiene_columna(cursor, tabla, columna):
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (tabla, columna),
+    )
+    return cursor.fetchone() is not None
+
+
+def existe_tabla(cursor, tabla):
+    cursor.execute("SHOW TABLES LIKE %s", (tabla,))
+    return cursor.fetchone() is not None
+
+
+# -------- ÍNDICES ----------
+def _indices_existentes(cursor, tabla):
+    cursor.execute(
+        """
+        SELECT INDEX_NAME AS idx, SEQ_IN_INDEX AS seq, COLUMN_NAME AS col
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """,
+        (tabla,),
+    )
+    por_idx = {}
+    for r in cursor.fetchall():
+        por_idx.setdefault(r["idx"], []).append(r["col"])
+    return [tuple(cols) for cols in por_idx.values()]
+
+
+def indices_faltantes(cursor):
+    """[(tabla, columnas, uso)] sin un índice cuyo prefijo sean esas columnas."""
+    faltan = []
+    cache = {}
+    for tabla, cols, uso in INDICES:
+        if tabla not in cache:
+            cache[tabla] = _indices_existentes(cursor, tabla)
+        if not cache[tabla] and not existe_tabla(cursor, tabla):
+            continue   # tabla aún no creada
+        if not any(idx[:len(cols)] == cols for idx in cache[tabla]):
+            faltan.append((tabla, cols, uso))
+    return faltan
+
+
+def crear_indices_faltantes(cursor):
+    for tabla, cols, _ in indices_faltantes(cursor):
+        nombre = f"ix_{tabla}_{'_'.join(cols)}"[:64]
+        cursor.execute(f"CREATE INDEX {nombre} ON {tabla} ({', '.join(cols)})")
+        print(f"  índice {nombre}")
+
+
+def main(argv):
+    cmd = argv[0] if argv else "estado"
+    if cmd == "aplicar":
+        hechas = aplicar()
+        print(f"{len(hechas)} migraciones aplicadas.")
+    elif cmd == "indices":
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                faltan = indices_faltantes(cursor)
+        finally:
+            conn.close()
+        if not faltan:
+            print("No faltan índices.")
+        for tabla, cols, uso in faltan:
+            print(f"FALTA {tabla}({', '.join(cols)})  <- {uso}")
+    elif cmd == "estado":
+        estado()
+    else:
+        print(f"Comando desconocido: {cmd}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
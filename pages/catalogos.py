@@ -1,8 +1,18 @@
 from utils import apply_base_ui
 apply_base_ui()
 
+import math
+from decimal import Decimal
 import streamlit as st
 from auth import require_login, require_roles, sidebar_session
+import perfil
+from ge_db import (
+    CATALOGOS,
+    ESTADOS_CATALOGO,
+    listar_catalogo_pagina,
+    upsert_catalogo,
+    set_catalogo_status,
+)
 
 st.set_page_config(page_title="Catálogos", layout="wide")
 
@@ -11,4 +21,205 @@ sidebar_session()
 require_roles("ADMIN")
 
 st.title("📚 Catálogos")
-st.write("Clientes, Empresas, Bancos, Cuentas, etc.")
+st.caption("Clientes, Empresas, Bancos y Cuentas")
+
+POR_PAGINA = 50
+
+
+def _entero(v):
+    """Id de la grilla o del CSV ("12", 12, 12.0) -> int; ValueError si no es un entero."""
+    d = Decimal(str(v).strip())
+    if d != d.to_integral_value():
+        raise ValueError(v)
+    return int(d)
+
+
+def validar_filas(filas, extra, primera=1):
+    """
+    Normaliza en su sitio (id a int, status en mayúsculas) y devuelve los errores
+    por fila; `primera` es el número de la primera fila (2 en un CSV con cabecera).
+    """
+    errores = []
+    for n, f in enumerate(filas, start=primera):
+        if f.get("id") not in (None, ""):
+            try:
+                f["id"] = _entero(f["id"])
+            except (ValueError, ArithmeticError):
+                errores.append(f"Fila {n}: el id «{f['id']}» no es un número entero.")
+        if not str(f.get("nombre") or "").strip():
+            errores.append(f"Fila {n}: falta el nombre.")
+        if "status" in f:
+            f["status"] = str(f["status"] or "").strip().upper()
+            if f["status"] not in ESTADOS_CATALOGO:
+                errores.append(f"Fila {n}: estado «{f['status']}» inválido (use {' o '.join(ESTADOS_CATALOGO)}).")
+        for c in extra:
+            if c in f and not str(f[c] or "").strip():
+                errores.append(f"Fila {n}: {c} vacío.")
+    return errores
+
+
+def mostrar_errores(errores, limite=20):
+    st.error(
+        f"No se guardó nada: {len(errores)} problemas.\n\n"
+        + "\n".join(f"- {e}" for e in errores[:limite])
+        + (f"\n- … y {len(errores) - limite} más" if len(errores) > limite else "")
+    )
+
+
+# Mensaje del último guardado (sobrevive al st.rerun)
+msg = st.session_state.pop("cat_msg", None)
+if msg:
+    st.success(msg)
+
+# =========================
+# Filtros (se aplican en la BD)
+# =========================
+with st.container(border=True):
+    f1, f2, f3 = st.columns([2, 3, 2])
+    with f1:
+        catalogo = st.selectbox("Catálogo", list(CATALOGOS.keys()), key="cat_catalogo")
+    with f2:
+        texto = st.text_input("Buscar por nombre", key="cat_texto")
+    with f3:
+        estado = st.selectbox("Estado", ["Todos"] + ESTADOS_CATALOGO, key="cat_estado")
+
+extra = CATALOGOS[catalogo]["extra"]
+
+# Volver a la página 1 cuando cambian los filtros
+filtros = (catalogo, texto, estado)
+if st.session_state.get("cat_filtros") != filtros:
+    st.session_state["cat_filtros"] = filtros
+    st.session_state["cat_pagina"] = 1
+
+pagina = st.session_state.get("cat_pagina", 1)
+
+try:
+    with perfil.seccion("página del catálogo"):
+        rows, total = listar_catalogo_pagina(
+            catalogo,
+            texto=texto,
+            estado=None if estado == "Todos" else estado,
+            pagina=pagina,
+            por_pagina=POR_PAGINA,
+        )
+except Exception as e:
+    st.error(f"No se pudo cargar el catálogo: {e}")
+    st.stop()
+
+paginas = max(math.ceil(total / POR_PAGINA), 1)
+
+# =========================
+# Grilla editable (solo la página actual)
+# =========================
+# pandas recién acá (no en el login ni en los st.stop de arriba); la grilla, el
+# guardado y la carga CSV de más abajo usan este mismo import
+import pandas as pd
+
+cols = ["id", "nombre", "status"] + extra
+df = pd.DataFrame(rows) if rows else pd.DataFrame(columns=cols)
+
+edited = st.data_editor(
+    df[cols],
+    use_container_width=True,
+    hide_index=True,
+    num_rows="dynamic",
+    disabled=["id"],
+    column_config={
+        "status": st.column_config.SelectboxColumn("Estado", options=ESTADOS_CATALOGO, required=True),
+    },
+    key=f"cat_editor_{catalogo}_{pagina}",
+)
+
+p1, p2, p3, _ = st.columns([1, 2, 1, 6])
+with p1:
+    if st.button("◀", disabled=pagina <= 1, key="cat_prev"):
+        st.session_state["cat_pagina"] = pagina - 1
+        st.rerun()
+with p2:
+    st.write(f"Página {pagina} de {paginas} · {total} registros")
+with p3:
+    if st.button("▶", disabled=pagina >= paginas, key="cat_next"):
+        st.session_state["cat_pagina"] = pagina + 1
+        st.rerun()
+
+if st.button("💾 Guardar cambios", type="primary", key="cat_guardar"):
+    # Solo se envían las filas modificadas o nuevas
+    original = {r["id"]: r for r in df.to_dict("records")}
+    cambios = []
+    for r in edited.to_dict("records"):
+        r = {k: (None if pd.isna(v) else v) for k, v in r.items()}
+        if r.get("id") is None or original.get(r["id"]) != r:
+            cambios.append(r)
+
+    errores = validar_filas(cambios, extra)
+    if errores:
+        mostrar_errores(errores)
+    else:
+        try:
+            n = upsert_catalogo(catalogo, cambios)
+        except Exception as e:
+            st.error(f"No se pudieron guardar los cambios: {e}")
+        else:
+            st.session_state["cat_msg"] = f"✅ {n} registros guardados."
+            st.rerun()
+
+st.divider()
+
+# =========================
+# Habilitar / deshabilitar
+# =========================
+st.subheader("⚙️ Estado")
+ids_sel = st.multiselect("IDs de esta página", df["id"].tolist(), key="cat_ids_sel")
+e1, e2, _ = st.columns([1, 1, 4])
+with e1:
+    if st.button("Habilitar", disabled=not ids_sel, key="cat_habilitar"):
+        set_catalogo_status(catalogo, ids_sel, "HABILITADO")
+        st.rerun()
+with e2:
+    if st.button("Deshabilitar", disabled=not ids_sel, key="cat_deshabilitar"):
+        set_catalogo_status(catalogo, ids_sel, "DESHABILITADO")
+        st.rerun()
+
+st.divider()
+
+# =========================
+# Carga masiva CSV
+# =========================
+st.subheader("⬆️ Carga masiva (CSV)")
+st.caption(
+    "Columnas: id (opcional, vacío = nuevo), nombre, status"
+    + "".join(f", {c}" for c in extra)
+    + ". Las filas con id existente se actualizan solo en las columnas que trae el CSV."
+)
+
+archivo = st.file_uploader("Archivo CSV", type=["csv"], key=f"cat_csv_{catalogo}")
+if archivo is not None and st.button("Importar", key="cat_importar"):
+    try:
+        csv_df = pd.read_csv(archivo, dtype=str).fillna("")
+    except Exception as e:
+        st.error(f"No se pudo leer el CSV: {e}")
+        st.stop()
+
+    faltan = [c for c in ["nombre"] if c not in csv_df.columns]
+    if faltan:
+        st.error(f"Faltan columnas: {', '.join(faltan)}")
+        st.stop()
+
+    # Solo las columnas conocidas: las que falten no se tocan en las filas existentes
+    conocidas = [c for c in ["id", "nombre", "status"] + extra if c in csv_df.columns]
+    filas = csv_df[conocidas].to_dict("records")
+    errores = validar_filas(filas, extra, primera=2)
+    if errores:
+        mostrar_errores(errores)
+        st.stop()
+
+    try:
+        n = upsert_catalogo(catalogo, filas)
+    except Exception as e:
+        st.error(f"No se pudo importar el CSV: {e}")
+        st.stop()
+    st.session_state["cat_msg"] = f"✅ {n} registros importados."
+    st.rerun()
+
+
+perfil.mostrar_cascada("catalogos")
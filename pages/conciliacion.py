@@ -0,0 +1,142 @@
+from utils import apply_base_ui
+apply_base_ui()
+
+import time
+from datetime import date, timedelta
+
+import streamlit as st
+from auth import require_login, require_roles, sidebar_session
+import perfil
+from conciliacion import leer_extracto, conciliar
+from dinero import filas_a_unidades
+from ge_db import (
+    listar_bancos,
+    saldos_corridos_banco,
+    movimientos_por_conciliar,
+    guardar_extracto,
+    listar_extractos,
+    listar_lineas_pendientes,
+)
+
+st.set_page_config(page_title="Conciliación", layout="wide")
+
+require_login()
+sidebar_session()
+require_roles("ADMIN", "CONTADOR")
+
+st.title("🏦 Conciliación bancaria")
+
+
+@st.cache_data(ttl=60)
+def load_bancos():
+    return listar_bancos()
+
+
+try:
+    bancos = load_bancos()
+except Exception as e:
+    st.error(f"No se pudo cargar bancos: {e}")
+    st.stop()
+
+bancos_map = {f'{b["nombre"]} (ID {b["id"]})': b["id"] for b in bancos}
+if not bancos_map:
+    st.info("No hay bancos habilitados.")
+    st.stop()
+
+c1, c2 = st.columns([3, 1])
+with c1:
+    banco_sel = st.selectbox("Banco", list(bancos_map.keys()), key="conc_banco")
+with c2:
+    tolerancia = st.number_input("Tolerancia (días)", min_value=0, max_value=30, value=3, key="conc_tol")
+banco_id = bancos_map[banco_sel]
+
+tab_importar, tab_pendientes, tab_saldos = st.tabs(["⬆️ Importar extracto", "❗ Pendientes", "📈 Saldo corrido"])
+
+# =====================================================
+# Importar + conciliar
+# =====================================================
+with tab_importar:
+    archivo = st.file_uploader("Extracto (CSV / XLSX)", type=["csv", "xlsx", "xls"], key="conc_archivo")
+    st.caption(
+        "Columnas: fecha y monto (o débito/crédito del banco); descripción y referencia opcionales. "
+        "Abonos en positivo, cargos en negativo."
+    )
+
+    if archivo is not None and st.button("Importar y conciliar", type="primary", key="conc_importar"):
+        t0 = time.perf_counter()
+        try:
+            lineas = leer_extracto(archivo, archivo.name)
+        except Exception as e:
+            st.error(f"No se pudo leer el extracto: {e}")
+            st.stop()
+
+        if not lineas:
+            st.warning("El extracto no tiene líneas válidas.")
+            st.stop()
+
+        desde = min(l["fecha"] for l in lineas) - timedelta(days=int(tolerancia))
+        hasta = max(l["fecha"] for l in lineas) + timedelta(days=int(tolerancia))
+        with perfil.seccion("movimientos del rango"):
+            movs = movimientos_por_conciliar(banco_id, desde, hasta)
+
+        with perfil.seccion("conciliar"):
+            n, lineas_pend, movs_pend = conciliar(lineas, movs, tolerancia_dias=tolerancia)
+        with perfil.seccion("guardar extracto"):
+            extracto_id = guardar_extracto(banco_id, archivo.name, lineas)
+        dt = time.perf_counter() - t0
+
+        st.success(
+            f"Extracto #{extracto_id}: {len(lineas)} líneas, {n} conciliadas, "
+            f"{len(lineas_pend)} pendientes ({dt:.2f} s)."
+        )
+        if movs_pend:
+            st.warning(f"{len(movs_pend)} movimientos del rango no aparecen en el extracto.")
+
+# =====================================================
+# Pendientes
+# =====================================================
+with tab_pendientes:
+    extractos = listar_extractos(banco_id)
+    if not extractos:
+        st.info("Este banco no tiene extractos importados.")
+    else:
+        ext_map = {
+            f'#{x["id"]} · {x["archivo"]} · {x["desde"]} a {x["hasta"]} · {int(x["pendientes"] or 0)} pendientes': x
+            for x in extractos
+        }
+        ext = ext_map[st.selectbox("Extracto", list(ext_map.keys()), key="conc_extracto")]
+
+        st.markdown("#### Líneas del extracto sin movimiento")
+        pend = listar_lineas_pendientes(ext["id"])
+        if pend:
+            st.dataframe(filas_a_unidades(pend, ["monto_cent"]), use_container_width=True)
+        else:
+            st.caption("Todas las líneas del extracto están conciliadas.")
+
+        st.markdown("#### Movimientos sin línea de extracto")
+        if ext["desde"] and ext["hasta"]:
+            movs = movimientos_por_conciliar(banco_id, ext["desde"], ext["hasta"])
+            if movs:
+                st.dataframe(filas_a_unidades(movs, ["monto_cent"]), use_container_width=True)
+            else:
+                st.caption("Todos los movimientos del período tienen línea de extracto.")
+
+# =====================================================
+# Saldo corrido
+# =====================================================
+with tab_saldos:
+    s1, s2 = st.columns(2)
+    with s1:
+        s_desde = st.date_input("Desde", value=date.today().replace(day=1), key="conc_saldo_desde")
+    with s2:
+        s_hasta = st.date_input("Hasta", value=date.today(), key="conc_saldo_hasta")
+
+    if st.button("Calcular saldo", key="conc_saldo_btn"):
+        rows = saldos_corridos_banco(banco_id, s_desde, s_hasta)
+        if rows:
+            st.dataframe(filas_a_unidades(rows, ["monto_cent", "saldo_cent"]), use_container_width=True)
+        else:
+            st.caption("Sin movimientos en el rango.")
+
+
+perfil.mostrar_cascada("conciliacion")
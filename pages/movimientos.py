@@ -1,22 +1,29 @@
 import streamlit as st
-import pandas as pd
+import json
 import os
 import re
+import uuid
 from datetime import datetime
 from io import BytesIO
 
-from utils import apply_base_ui
+from utils import apply_base_ui, selector_catalogo, topbar
+from dinero import fmt_centavos, a_unidades, tabla_a_unidades, total_columna
+from catalogo_busqueda import IndiceCatalogo
+from lineas_modelo import Lineas, SIN_CUENTA
+from duplicados import huella_movimiento, huella_adjuntos, periodo, sha256_bytes
 from auth import require_login, sidebar_session
+import adjuntos
+import perfil
 
+import ge_db_async as adb
+from cache_consultas import CACHE as CACHE_CONSULTAS, FUERA_DE_RANGO
+from diario_local import DIARIO
 from ge_db import (
-    guardar_movimiento,
     listar_movimientos,
-    obtener_movimiento,
-    listar_detalle_movimiento,
-    listar_clientes,
-    listar_empresas,
-    listar_bancos,
-    listar_cuentas_activas,   # ✅ ahora sí lo usamos
+    guardar_movimientos_lote,
+    validar_movimiento,
+    version_catalogos,
+    buscar_posibles_duplicados,
 )
 
 # =========================
@@ -35,6 +42,9 @@ if rol not in ["ADMIN", "ASISTENTE", "SOCIO"]:
     st.error("⛔ No tienes permisos para acceder a Movimientos.")
     st.stop()
 
+# Hilo que pasa el diario local a MySQL (uno por proceso)
+DIARIO.iniciar_sincronizador()
+
 # =========================
 # 2) Helpers
 # =========================
@@ -44,24 +54,51 @@ def safe_filename(name: str) -> str:
     return name or "archivo"
 
 
-def fmt_money(v: float) -> str:
-    try:
-        return f"{float(v):,.2f}"
-    except Exception:
-        return "0.00"
+@st.cache_resource(ttl=300, show_spinner=False)
+def load_indices_catalogos(version: int):
+    """Índices compartidos por todas las sesiones; se reconstruyen al cambiar la versión."""
+    # Filas compartidas entre procesos (una copia por versión); si no están,
+    # las cuatro consultas a la vez: se espera la más lenta, no la suma
+    clave = ("catalogos_activos", version)
+    en_cache, valor = CACHE_CONSULTAS.obtener(clave)
+    if en_cache:
+        clientes, empresas, bancos, cuentas = valor
+    else:
+        clientes, empresas, bancos, cuentas = adb.ejecutar(
+            adb.listar_clientes(),
+            adb.listar_empresas(),
+            adb.listar_bancos(),
+            adb.listar_cuentas_activas(),
+        )
+        # Fuera de los rangos de fechas: las escrituras de movimientos no la tocan;
+        # un cambio de catálogo cambia la versión (y con ella la clave)
+        CACHE_CONSULTAS.guardar(
+            clave, (clientes, empresas, bancos, cuentas), FUERA_DE_RANGO, FUERA_DE_RANGO, valor
+        )
+    return (
+        IndiceCatalogo(clientes),
+        IndiceCatalogo(empresas),
+        IndiceCatalogo(bancos),
+        IndiceCatalogo(cuentas, etiqueta=etiqueta_cuenta),
+    )
 
 
-@st.cache_data(ttl=60)
-def load_catalogos():
-    clientes = listar_clientes()
-    empresas = listar_empresas()
-    bancos = listar_bancos()
-    return clientes, empresas, bancos
+def hash_upload(f):
+    """sha256 del archivo subido; se calcula una sola vez por file_id."""
+    if f is None:
+        return None
+    cache = st.session_state.setdefault("mov_hash_cache", {})
+    k = getattr(f, "file_id", None) or f.name
+    if k not in cache:
+        cache[k] = sha256_bytes(f.getbuffer())
+    return cache[k]
 
 
-@st.cache_data(ttl=60)
-def load_cuentas():
-    return listar_cuentas_activas()
+def etiqueta_cuenta(c: dict) -> str:
+    cid = c.get("id_cue") or c.get("id") or c.get("id_cuenta")
+    nombre = c.get("nombre_cue") or c.get("nombre") or str(cid)
+    tipo = c.get("tipo_cue") or c.get("tipo") or ""
+    return f"{nombre} (ID {cid}) · {tipo}"
 
 
 def naturaleza_desde_tipo(tipo: str) -> str:
@@ -81,86 +118,10 @@ def naturaleza_desde_tipo(tipo: str) -> str:
     # Default
     return "DEBITO"
 
-def validar_lineas_monto(df: pd.DataFrame, cuentas_label_to_id: dict) -> list:
-    errores = []
-    if df is None or df.empty:
-        return ["Debe existir al menos 1 línea."]
-
-    x = df.copy()
-    x["cuenta"] = x["cuenta"].fillna("Seleccione").astype(str)
-    x["monto"] = pd.to_numeric(x["monto"], errors="coerce").fillna(0.0)
-
-    for i, row in x.iterrows():
-        cuenta_label = row.get("cuenta", "Seleccione")
-        monto = float(row.get("monto", 0.0))
-
-        if cuenta_label == "Seleccione" or cuenta_label not in cuentas_label_to_id:
-            errores.append(f"Línea {i+1}: selecciona una cuenta válida.")
-        if monto <= 0:
-            errores.append(f"Línea {i+1}: el monto debe ser mayor a 0.")
-
-    return errores
-
-
-def construir_lineas_para_guardar(
-    df: pd.DataFrame,
-    cuentas_label_to_id: dict,
-    cuentas_id_to_nat: dict
-):
-    x = df.copy()
-    x["cuenta"] = x["cuenta"].fillna("Seleccione").astype(str)
-    x["monto"] = pd.to_numeric(x["monto"], errors="coerce").fillna(0.0)
-
-    lineas_out = []
-    for _, r in x.iterrows():
-        cuenta_label = r.get("cuenta", "Seleccione")
-        cuenta_id = cuentas_label_to_id.get(cuenta_label)
-
-        monto = float(r.get("monto", 0.0) or 0.0)
-        nat = cuentas_id_to_nat.get(cuenta_id, "DEBITO")  # DEBITO/CREDITO
-
-        deb = monto if nat == "DEBITO" else 0.0
-        cre = monto if nat == "CREDITO" else 0.0
-
-        lineas_out.append({
-            "Cuenta": cuenta_id,                 # <- BD (movimiento_detalle.cuenta)
-            "Descripción": r.get("descripcion", "") or "",
-            "Débito": float(deb),
-            "Crédito": float(cre),
-            "Notas": r.get("notas", "") or "",
-        })
-
-    total_debito = float(sum(l["Débito"] for l in lineas_out))
-    total_credito = float(sum(l["Crédito"] for l in lineas_out))
-    diff = round(total_debito - total_credito, 2)
-
-    return lineas_out, total_debito, total_credito, diff
-
 # =========================
 # 3) Topbar / Header
 # =========================
-st.markdown(
-    """
-    <style>
-      .topbar {
-        background:#0f172a;
-        padding:12px 18px;
-        border-radius:12px;
-        color:white;
-        font-weight:700;
-        display:flex;
-        justify-content:space-between;
-        align-items:center;
-      }
-      .topbar small{opacity:.8;font-weight:600;}
-    </style>
-    <div class="topbar">
-      <div>GESTION ENTERPRISE</div>
-      <small>Movimientos</small>
-    </div>
-    """,
-    unsafe_allow_html=True,
-)
+topbar("Movimientos")
 
 st.write("")
 st.title("Registro de Movimientos Varios")
@@ -170,88 +131,39 @@ st.caption("Movimientos / Registro de Movimientos Varios")
 # =========================
 # 4) Cargar catálogos + cuentas
 # =========================
+# Los índices viven en memoria del servidor (compartidos entre sesiones);
+# al navegador solo se envían los primeros resultados de cada búsqueda.
 try:
-    clientes_db, empresas_db, bancos_db = load_catalogos()
-except Exception as e:
-    st.error(f"No se pudo cargar catálogos desde la BD: {e}")
-    clientes_db, empresas_db, bancos_db = [], [], []
-
-clientes_map = {f'{c["nombre"]} (ID {c["id"]})': c["id"] for c in clientes_db}
-empresas_map = {f'{e["nombre"]} (ID {e["id"]})': e["id"] for e in empresas_db}
-bancos_map   = {f'{b["nombre"]} (ID {b["id"]})': b["id"] for b in bancos_db}
-
-clientes_opts = ["Seleccione"] + list(clientes_map.keys())
-empresas_opts = ["Seleccione"] + list(empresas_map.keys())
-bancos_opts   = ["Seleccione"] + list(bancos_map.keys())
-
-# ---- Cuentas desde BD ----
-try:
-    cuentas_db = load_cuentas()
+    with perfil.seccion("catálogos"):
+        idx_clientes, idx_empresas, idx_bancos, idx_cuentas = load_indices_catalogos(version_catalogos())
 except Exception as e:
-    st.error(f"No se pudo cargar cuentas desde la BD: {e}")
-    cuentas_db = []
+    st.error(f"No se pudo cargar catálogos/cuentas desde la BD: {e}")
+    idx_clientes = idx_empresas = idx_bancos = IndiceCatalogo([])
+    idx_cuentas = IndiceCatalogo([], etiqueta=etiqueta_cuenta)
 
-# Labels para selectbox
+# Mapas completos (solo servidor) para validar y construir líneas
 cuentas_label_to_id = {}
+cuentas_id_to_label = {}
 cuentas_id_to_nat = {}
 
-for c in cuentas_db:
+for label, c in idx_cuentas.por_etiqueta.items():
     cid = c.get("id_cue") or c.get("id") or c.get("id_cuenta")
-    nombre = c.get("nombre_cue") or c.get("nombre") or str(cid)
-    tipo = c.get("tipo_cue") or c.get("tipo") or ""
-    nat = naturaleza_desde_tipo(tipo)
-
-    label = f"{nombre} (ID {cid}) · {tipo}"
     cuentas_label_to_id[label] = cid
-    cuentas_id_to_nat[cid] = nat
-
-cuentas_opts = ["Seleccione"] + list(cuentas_label_to_id.keys())
+    cuentas_id_to_label[cid] = label
+    cuentas_id_to_nat[cid] = naturaleza_desde_tipo(c.get("tipo_cue") or c.get("tipo") or "")
 
 
 # =========================
 # 5) Tabs
 # =========================
-tab_crear, tab_consultar, tab_detalle = st.tabs(["➕ Crear", "🔎 Consultar", "📄 Detalle"])
+tab_crear, tab_consultar, tab_detalle, tab_sync = st.tabs(
+    ["➕ Crear", "🔎 Consultar", "📄 Detalle", "🔄 Sincronización"]
+)
 
 
 # =====================================================
 # TAB 1: CREAR
 # =====================================================
-def normalizar_lineas(df: pd.DataFrame) -> pd.DataFrame:
-    """Asegura columnas/tipos estables para el editor."""
-    if df is None or df.empty:
-        df = pd.DataFrame([{"cuenta": "Seleccione", "descripcion": "", "monto": 0.0, "notas": ""}])
-
-    df = df.copy()
-
-    # Por si llegan columnas con otros nombres (mayúsculas o acentos)
-    ren = {
-        "Cuenta": "cuenta",
-        "Descripción": "descripcion",
-        "Descripcion": "descripcion",
-        "Monto": "monto",
-        "Notas": "notas",
-    }
-    df = df.rename(columns={k: v for k, v in ren.items() if k in df.columns})
-
-    # Garantizar columnas
-    defaults = {"cuenta": "Seleccione", "descripcion": "", "monto": 0.0, "notas": ""}
-    for col, default in defaults.items():
-        if col not in df.columns:
-            df[col] = default
-
-    # Orden y solo columnas necesarias
-    df = df[["cuenta", "descripcion", "monto", "notas"]]
-
-    # Tipos
-    df["cuenta"] = df["cuenta"].fillna("Seleccione").astype(str)
-    df["descripcion"] = df["descripcion"].fillna("").astype(str)
-    df["notas"] = df["notas"].fillna("").astype(str)
-    df["monto"] = pd.to_numeric(df["monto"], errors="coerce").fillna(0.0)
-
-    return df
-
-
 with tab_crear:
     # ---------- Cabecera ----------
     with st.container(border=True):
@@ -269,15 +181,15 @@ with tab_crear:
         with colB:
             c1, c2, c3 = st.columns(3)
             with c1:
-                cliente_sel = st.selectbox("Cliente", clientes_opts, key="mov_cliente_sel")
+                cliente_sel = selector_catalogo("Cliente", idx_clientes, key="mov_cliente_sel")
             with c2:
-                empresa_sel = st.selectbox("Empresa", empresas_opts, key="mov_empresa_sel")
+                empresa_sel = selector_catalogo("Empresa", idx_empresas, key="mov_empresa_sel")
             with c3:
-                banco_sel = st.selectbox("Banco", bancos_opts, key="mov_banco_sel")
+                banco_sel = selector_catalogo("Banco", idx_bancos, key="mov_banco_sel")
 
-    cliente_id = clientes_map.get(cliente_sel)
-    empresa_id = empresas_map.get(empresa_sel)
-    banco_id = bancos_map.get(banco_sel)
+    cliente_id = idx_clientes.id_de(cliente_sel)
+    empresa_id = idx_empresas.id_de(empresa_sel)
+    banco_id = idx_bancos.id_de(banco_sel)
 
     # ---------- Detalle ----------
     st.write("")
@@ -285,45 +197,24 @@ with tab_crear:
         st.subheader("Detalle")
         st.caption("Selecciona una cuenta y escribe el monto. El sistema decide Débito o Crédito según el tipo de cuenta.")
 
-        # Inicializar una sola vez
-        if "lineas" not in st.session_state:
-            st.session_state["lineas"] = pd.DataFrame([{
-                "cuenta": "Seleccione",
-                "descripcion": "",
-                "monto": 0.0,
-                "notas": ""
-            }])
-
-        # Normalizar SIEMPRE antes del editor
-        st.session_state["lineas"] = normalizar_lineas(st.session_state["lineas"])
+        # Inicializar una sola vez (registros compactos; ver lineas_modelo.py)
+        if not isinstance(st.session_state.get("lineas"), Lineas):
+            st.session_state["lineas"] = Lineas()
+        lineas = st.session_state["lineas"]
 
         b1, b2, b3, _ = st.columns([1.2, 1.2, 1.4, 6.2])
 
         with b1:
             if st.button("➕ Nueva", key="mov_nuevo_linea"):
-                st.session_state["lineas"] = pd.concat(
-                    [st.session_state["lineas"],
-                     pd.DataFrame([{"cuenta": "Seleccione", "descripcion": "", "monto": 0.0, "notas": ""}])],
-                    ignore_index=True
-                )
-                st.session_state["lineas"] = normalizar_lineas(st.session_state["lineas"])
+                lineas.nueva()
 
         with b2:
             if st.button("📄 Duplicar", key="mov_dup_linea"):
-                st.session_state["lineas"] = pd.concat(
-                    [st.session_state["lineas"], st.session_state["lineas"].tail(1)],
-                    ignore_index=True
-                )
-                st.session_state["lineas"] = normalizar_lineas(st.session_state["lineas"])
+                lineas.duplicar_ultima()
 
         with b3:
             if st.button("🧹 Limpiar", key="mov_limpiar"):
-                st.session_state["lineas"] = pd.DataFrame([{
-                    "cuenta": "Seleccione",
-                    "descripcion": "",
-                    "monto": 0.0,
-                    "notas": ""
-                }])
+                lineas.limpiar()
 
                 # borrar uploads
                 for k in list(st.session_state.keys()):
@@ -336,53 +227,49 @@ with tab_crear:
 
                 st.rerun()
 
-        # --- Editor (persistente) ---
-        edited = st.data_editor(
-            st.session_state["lineas"],
-            use_container_width=True,
-            hide_index=True,
-            num_rows="dynamic",
-            column_config={
-                "cuenta": st.column_config.SelectboxColumn("Cuenta", options=cuentas_opts, required=True),
-                "descripcion": st.column_config.TextColumn("Descripción", help="Concepto de la línea"),
-                "monto": st.column_config.NumberColumn("Monto", min_value=0.0, step=0.01, format="%.2f"),
-                "notas": st.column_config.TextColumn("Notas"),
-            },
-            key="mov_editor",
+        # Opciones de cuenta: resultados de la búsqueda + las ya usadas en las líneas
+        q_cuenta = st.text_input(
+            "Buscar cuenta", key="mov_cuenta_q", placeholder="Buscar cuenta para el editor..."
         )
+        usadas = [cuentas_id_to_label[c] for c in lineas.cuentas_usadas() if c in cuentas_id_to_label]
+        cuentas_opts = [SIN_CUENTA] + usadas + [
+            c for c in idx_cuentas.buscar(q_cuenta, limite=30) if c not in usadas
+        ]
+
+        # --- Editor: el DataFrame solo existe en este borde ---
+        with perfil.seccion("editor"):
+            edited = st.data_editor(
+                lineas.a_editor(cuentas_id_to_label),
+                use_container_width=True,
+                hide_index=True,
+                num_rows="dynamic",
+                column_config={
+                    "cuenta": st.column_config.SelectboxColumn("Cuenta", options=cuentas_opts, required=True),
+                    "descripcion": st.column_config.TextColumn("Descripción", help="Concepto de la línea"),
+                    "monto": st.column_config.NumberColumn("Monto", min_value=0.0, step=0.01, format="%.2f"),
+                    "notas": st.column_config.TextColumn("Notas"),
+                },
+                key="mov_editor",
+            )
 
-        # Guardar SIEMPRE lo que devuelve el editor
-        if edited is None:
-            edited = st.session_state["lineas"].copy()
-
-        edited = edited.copy()
-
-        # Asegurar columnas (por si algo cambia)
-        defaults = {
-            "cuenta": "Seleccione",
-            "descripcion": "",
-            "monto": 0.0,
-            "notas": "",
-        }
-        for col, default in defaults.items():
-            if col not in edited.columns:
-                edited[col] = default
-
-        # Asegurar tipos
-        edited["cuenta"] = edited["cuenta"].fillna("Seleccione").astype(str)
-        edited["descripcion"] = edited["descripcion"].fillna("").astype(str)
-        edited["notas"] = edited["notas"].fillna("").astype(str)
-        edited["monto"] = pd.to_numeric(edited["monto"], errors="coerce").fillna(0.0)
-
-        # Persistir en session_state
-        st.session_state["lineas"] = edited
+            # Aplicar lo editado sobre los registros (en su sitio)
+            lineas.desde_editor(edited, cuentas_label_to_id)
 
         # Debug naturaleza
-        prev = st.session_state["lineas"].copy()
-        prev["Cuenta_id"] = prev["cuenta"].map(cuentas_label_to_id).fillna("")
-        prev["Naturaleza"] = prev["Cuenta_id"].apply(lambda cid: cuentas_id_to_nat.get(cid, "") if cid != "" else "")
         with st.expander("Ver naturaleza por línea (debug)"):
-            st.dataframe(prev[["cuenta", "Naturaleza", "monto", "descripcion", "notas"]], use_container_width=True)
+            st.dataframe(
+                [
+                    {
+                        "cuenta": cuentas_id_to_label.get(l.cuenta_id, SIN_CUENTA),
+                        "Naturaleza": cuentas_id_to_nat.get(l.cuenta_id, ""),
+                        "monto": a_unidades(l.monto_cent),
+                        "descripcion": l.descripcion,
+                        "notas": l.notas,
+                    }
+                    for l in lineas
+                ],
+                use_container_width=True,
+            )
 
     # ---------- Archivos por línea ----------
     st.write("")
@@ -390,16 +277,20 @@ with tab_crear:
         st.subheader("Archivos por línea")
         st.caption("Adjunta archivos (opcional) para cada línea del detalle.")
         uploaded_files = []
-        for i in range(len(st.session_state["lineas"])):
+        for i in range(len(lineas)):
             f = st.file_uploader(f"Archivo línea {i+1}", key=f"mov_file_{i}")
             uploaded_files.append(f)
 
+        # Soltar los adjuntos de líneas que ya no existen
+        for k in [k for k in st.session_state.keys() if str(k).startswith("mov_file_")]:
+            if int(str(k)[len("mov_file_"):]) >= len(lineas):
+                del st.session_state[k]
+
     # ---------- Validación + Construcción ----------
-    errores_lineas = validar_lineas_monto(st.session_state["lineas"], cuentas_label_to_id)
+    with perfil.seccion("validación"):
+        errores_lineas = lineas.validar(cuentas_id_to_nat)
 
-    lineas_out, total_debito, total_credito, diff = construir_lineas_para_guardar(
-        st.session_state["lineas"], cuentas_label_to_id, cuentas_id_to_nat
-    )
+        lineas_out, total_debito, total_credito, diff = lineas.para_guardar(cuentas_id_to_nat)
 
     tiene_catalogos = (cliente_sel != "Seleccione" and empresa_sel != "Seleccione" and banco_sel != "Seleccione")
     balanceado = (diff == 0)
@@ -412,10 +303,10 @@ with tab_crear:
     with st.container(border=True):
         st.subheader("Resumen")
         m1, m2, m3, m4 = st.columns(4)
-        m1.metric("Líneas", len(st.session_state["lineas"]))
-        m2.metric("Total Débito", fmt_money(total_debito))
-        m3.metric("Total Crédito", fmt_money(total_credito))
-        m4.metric("Diferencia", fmt_money(diff))
+        m1.metric("Líneas", len(lineas))
+        m2.metric("Total Débito", fmt_centavos(total_debito))
+        m3.metric("Total Crédito", fmt_centavos(total_credito))
+        m4.metric("Diferencia", fmt_centavos(diff))
 
         if not tiene_catalogos:
             st.warning("Selecciona Cliente, Empresa y Banco para poder enviar.")
@@ -429,56 +320,103 @@ with tab_crear:
         if tiene_catalogos and not balanceado:
             st.warning("Movimiento no balanceado (Egreso/Gasto). Se guardará igualmente.")
 
+        # Posibles duplicados: consulta por índice de huellas (no recorre el historial)
+        with perfil.seccion("hash adjuntos"):
+            hashes_upload = [hash_upload(f) for f in uploaded_files]
+        if puede_guardar:
+            with perfil.seccion("duplicados"):
+                try:
+                    huella = huella_movimiento(
+                        empresa_id, banco_id, cliente_id,
+                        max(total_debito, total_credito),
+                        [l["Cuenta"] for l in lineas_out],
+                    )
+                    dups = buscar_posibles_duplicados(huella, periodo(fecha_hora), huella_adjuntos(hashes_upload))
+                except Exception:
+                    dups = []
+            if dups:
+                st.warning(
+                    "⚠ Posible duplicado de: "
+                    + ", ".join(
+                        f'ID {d["movimiento_id"]} ({d["fecha_hora"]:%d/%m/%Y}'
+                        + (", mismo archivo" if d["motivo"] == "ADJUNTO" else "") + ")"
+                        for d in dups
+                    )
+                )
+
+        # Modo lote: los movimientos se juntan en la sesión y se guardan todos
+        # juntos con una sola transacción (ver "Lote" más abajo)
+        modo_lote = st.toggle(
+            "Modo lote", key="mov_modo_lote",
+            help="Acumula varios movimientos y guárdalos juntos en la BD.",
+        )
+
         confirmar = False
         if puede_guardar:
             confirmar = st.checkbox("Confirmo que los datos son correctos", key="mov_confirmar")
 
         st.write("")
-        if st.button("✅ Enviar", type="primary", disabled=not (puede_guardar and confirmar), key="mov_enviar"):
+        etiqueta = "➕ Agregar al lote" if modo_lote else "✅ Enviar"
+        if st.button(etiqueta, type="primary", disabled=not (puede_guardar and confirmar), key="mov_enviar"):
             if cliente_id is None or empresa_id is None or banco_id is None:
                 st.error("No se pudieron resolver los IDs desde los catálogos.")
                 st.stop()
 
+            datos = {
+                "fecha_hora": fecha_hora.strip(),
+                "cliente": cliente_sel,
+                "empresa": empresa_sel,
+                "banco": banco_sel,
+                "total_debito_cent": total_debito,
+                "total_credito_cent": total_credito,
+                "lineas": lineas_out,
+                "cliente_id": cliente_id,
+                "empresa_id": empresa_id,
+                "banco_id": banco_id,
+            }
+
+            # Lo que la sincronización va a exigir, antes de decir "registrado"
+            try:
+                validar_movimiento(datos)
+            except ValueError as e:
+                st.error(str(e))
+                st.stop()
+
             os.makedirs("data/uploads", exist_ok=True)
 
-            # Adjuntar paths a líneas
-            saved_paths = []
-            for i, f in enumerate(uploaded_files):
-                if f is None:
-                    saved_paths.append(None)
-                    continue
-                original = safe_filename(f.name)
-                unique_name = f"mov_{datetime.now().strftime('%Y%m%d_%H%M%S')}_linea_{i+1}_{original}"
-                path = os.path.join("data", "uploads", unique_name)
-                with open(path, "wb") as out:
-                    out.write(f.getbuffer())
-                saved_paths.append(path)
+            with perfil.seccion("escribir adjuntos"):
+                # Adjuntar paths a líneas
+                saved_paths = []
+                for i, f in enumerate(uploaded_files):
+                    if f is None:
+                        saved_paths.append(None)
+                        continue
+                    original = safe_filename(f.name)
+                    unique_name = f"mov_{datetime.now().strftime('%Y%m%d_%H%M%S')}_linea_{i+1}_{original}"
+                    path = os.path.join("data", "uploads", unique_name)
+                    with open(path, "wb") as out:
+                        out.write(f.getbuffer())
+                    saved_paths.append(path)
 
             for i in range(len(lineas_out)):
                 lineas_out[i]["archivo"] = saved_paths[i] if i < len(saved_paths) else None
+                lineas_out[i]["archivo_sha256"] = hashes_upload[i] if i < len(hashes_upload) else None
+
+            if modo_lote:
+                # origen_uuid desde ya: reintentar el lote no duplica lo que sí entró
+                datos["origen_uuid"] = uuid.uuid4().hex
+                datos["usuario"] = user.get("usuario")
+                st.session_state.setdefault("mov_lote", []).append(datos)
+                st.session_state["mov_lote_msg"] = f"Agregado al lote ({len(st.session_state['mov_lote'])})"
+            else:
+                # Se confirma en el diario local; el sincronizador lo lleva a MySQL
+                with perfil.seccion("guardar movimiento"):
+                    local_id, _ = DIARIO.encolar(datos, usuario=user.get("usuario"))
 
-            mov_id = guardar_movimiento(
-                fecha_hora,
-                cliente_sel,
-                empresa_sel,
-                banco_sel,
-                float(total_debito),
-                float(total_credito),
-                lineas_out,
-                cliente_id=cliente_id,
-                empresa_id=empresa_id,
-                banco_id=banco_id,
-            )
-
-            st.success(f"Movimiento guardado correctamente ✅ (ID {mov_id})")
+                st.success(f"Movimiento registrado ✅ (diario #{local_id}, se sincroniza con la BD en segundo plano)")
 
-            # ✅ Reset completo
-            st.session_state["lineas"] = pd.DataFrame([{
-                "cuenta": "Seleccione",
-                "descripcion": "",
-                "monto": 0.0,
-                "notas": ""
-            }])
+            # ✅ Reset completo (cliente/empresa/banco se mantienen para el siguiente)
+            lineas.limpiar()
 
             # borrar uploads
             for i in range(len(uploaded_files)):
@@ -490,12 +428,72 @@ with tab_crear:
             if "mov_confirmar" in st.session_state:
                 del st.session_state["mov_confirmar"]
 
+            st.session_state.pop("mov_hash_cache", None)
+
             # reiniciar fecha/hora: borrar la key
             if "mov_fecha_hora" in st.session_state:
                 del st.session_state["mov_fecha_hora"]
 
             st.rerun()
 
+    # ---------- Lote ----------
+    lote = st.session_state.get("mov_lote") or []
+    msg = st.session_state.pop("mov_lote_msg", None)
+    if modo_lote or lote or msg:
+        st.write("")
+        with st.container(border=True):
+            st.subheader(f"Lote ({len(lote)})")
+
+            if msg:
+                st.success(msg)
+
+            if not lote:
+                st.caption("Sin movimientos todavía: completa el formulario y usa «Agregar al lote».")
+            else:
+                st.dataframe(
+                    [
+                        {
+                            "#": n,
+                            "Fecha": d["fecha_hora"],
+                            "Cliente": d["cliente"],
+                            "Empresa": d["empresa"],
+                            "Banco": d["banco"],
+                            "Líneas": len(d["lineas"]),
+                            "Débito": a_unidades(d["total_debito_cent"]),
+                            "Crédito": a_unidades(d["total_credito_cent"]),
+                        }
+                        for n, d in enumerate(lote, start=1)
+                    ],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+                t1, t2 = st.columns(2)
+                t1.metric("Total Débito", fmt_centavos(sum(d["total_debito_cent"] for d in lote)))
+                t2.metric("Total Crédito", fmt_centavos(sum(d["total_credito_cent"] for d in lote)))
+
+                g1, g2, _ = st.columns([1.6, 1.4, 5])
+                with g1:
+                    guardar_lote = st.button(f"✅ Guardar lote ({len(lote)})", type="primary", key="mov_lote_guardar")
+                with g2:
+                    if st.button("🗑 Vaciar lote", key="mov_lote_vaciar"):
+                        st.session_state.pop("mov_lote", None)
+                        st.rerun()
+
+                if guardar_lote:
+                    # Todo o nada: una transacción con inserciones multi-fila
+                    try:
+                        with perfil.seccion("guardar lote"):
+                            ids = guardar_movimientos_lote(lote)
+                    except Exception as e:
+                        st.error(f"No se pudo guardar el lote (no se guardó ninguno; el lote se conserva): {e}")
+                    else:
+                        st.session_state.pop("mov_lote", None)
+                        st.session_state["mov_lote_msg"] = (
+                            f"Lote guardado ✅ ({len(ids)} movimientos: IDs {', '.join(map(str, ids))})"
+                        )
+                        st.rerun()
+
+
 # =====================================================
 # TAB 2: CONSULTAR
 # =====================================================
@@ -515,26 +513,40 @@ with tab_consultar:
             consultar = st.button("Consultar", key="mov_consultar")
 
     if consultar:
-        rows = listar_movimientos(desde, hasta)
-        demo = pd.DataFrame(rows) if rows else pd.DataFrame(
-            columns=["id", "Fecha", "Cliente", "Empresa", "Banco", "Débito", "Crédito", "Estado"]
+        # pandas/openpyxl solo en este camino (no en cada rerun de la página)
+        import pandas as pd
+
+        # Lectura columnar: sin dict por fila; centavos (int64) y fechas quedan nativos (Arrow)
+        with perfil.seccion("consulta"):
+            tabla = listar_movimientos(desde, hasta, columnar=True)
+            t_debito = total_columna(tabla, "Débito")
+            t_credito = total_columna(tabla, "Crédito")
+            # Unidades solo para mostrar / exportar
+            demo = tabla_a_unidades(tabla, ["Débito", "Crédito"]).to_pandas(types_mapper=pd.ArrowDtype)
+
+        k1, k2, k3, _ = st.columns([1, 1.5, 1.5, 4])
+        k1.metric("Movimientos", tabla.num_rows)
+        k2.metric("Total Débito", fmt_centavos(t_debito))
+        k3.metric("Total Crédito", fmt_centavos(t_credito))
+        st.dataframe(demo, use_container_width=True)
+
+        with perfil.seccion("exportar Excel"):
+            buffer = BytesIO()
+            with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+                demo.to_excel(writer, index=False, sheet_name="Movimientos")
+
+        st.download_button(
+            label="Descargar Excel",
+            data=buffer.getvalue(),
+            file_name="movimientos.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key="mov_excel"
         )
     else:
-        demo = pd.DataFrame(columns=["id", "Fecha", "Cliente", "Empresa", "Banco", "Débito", "Crédito", "Estado"])
-
-    st.dataframe(demo, use_container_width=True)
-
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        demo.to_excel(writer, index=False, sheet_name="Movimientos")
-
-    st.download_button(
-        label="Descargar Excel",
-        data=buffer.getvalue(),
-        file_name="movimientos.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="mov_excel"
-    )
+        st.dataframe(
+            {c: [] for c in ["id", "Fecha", "Cliente", "Empresa", "Banco", "Débito", "Crédito", "Estado"]},
+            use_container_width=True,
+        )
 
     st.info("Tip: Usa la pestaña 'Detalle' para seleccionar un ID y ver sus líneas/archivos.")
 
@@ -558,19 +570,21 @@ with tab_detalle:
 
     ids = []
     if cargar_ids:
-        rows = listar_movimientos(d_desde, d_hasta)
-        df_ids = pd.DataFrame(rows) if rows else pd.DataFrame()
-        if not df_ids.empty:
-            col_id = "id" if "id" in df_ids.columns else ("Id" if "Id" in df_ids.columns else None)
-            if col_id:
-                ids = df_ids[col_id].dropna().astype(int).tolist()
+        with perfil.seccion("cargar IDs"):
+            tabla_ids = listar_movimientos(d_desde, d_hasta, columnar=True)
+        ids = tabla_ids.column("id").drop_null().to_pylist()
 
     if not ids:
         st.info("No hay IDs cargados. Usa el rango y presiona 'Cargar IDs'.")
     else:
         mov_id_sel = st.selectbox("Selecciona un ID", ids, key="mov_id_sel")
 
-        mov = obtener_movimiento(int(mov_id_sel))
+        # Cabecera y detalle en paralelo
+        with perfil.seccion("detalle"):
+            mov, det_tabla = adb.ejecutar(
+                adb.obtener_movimiento(int(mov_id_sel)),
+                adb.listar_detalle_movimiento(int(mov_id_sel), columnar=True),
+            )
         if mov:
             with st.container(border=True):
                 c1, c2, c3, c4 = st.columns(4)
@@ -580,30 +594,30 @@ with tab_detalle:
                 c4.metric("Banco", mov.get("banco", ""))
 
                 c5, c6, _ = st.columns([2, 2, 4])
-                c5.metric("Total Débito", fmt_money(mov.get("total_debito", 0)))
-                c6.metric("Total Crédito", fmt_money(mov.get("total_credito", 0)))
+                c5.metric("Total Débito", fmt_centavos(mov.get("total_debito_cent", 0)))
+                c6.metric("Total Crédito", fmt_centavos(mov.get("total_credito_cent", 0)))
 
-            detalle = listar_detalle_movimiento(int(mov_id_sel))
-            det_df = pd.DataFrame(detalle) if detalle else pd.DataFrame(
-                columns=["cuenta", "descripcion", "Débito", "Crédito", "notas", "Archivo"]
-            )
-
-            st.dataframe(det_df, use_container_width=True)
+            # La tabla Arrow va directo a st.dataframe (sin pasar por pandas)
+            st.dataframe(tabla_a_unidades(det_tabla, ["Débito", "Crédito"]), use_container_width=True)
 
             st.markdown("#### Archivos del movimiento")
-            if not det_df.empty and "Archivo" in det_df.columns:
-                for idx, row in det_df.iterrows():
-                    path = row.get("Archivo")
+            if det_tabla.num_rows and "Archivo" in det_tabla.column_names:
+                paths = det_tabla.column("Archivo").to_pylist()
+                # Los de periodos cerrados están en paquetes: se leen con un seek
+                try:
+                    ubicaciones = adjuntos.ubicar([p for p in paths if isinstance(p, str)])
+                except Exception:
+                    ubicaciones = {}
+                for idx, path in enumerate(paths):
                     if isinstance(path, str) and path:
                         try:
-                            with open(path, "rb") as f:
-                                st.download_button(
-                                    label=f"Descargar archivo línea {idx+1}",
-                                    data=f.read(),
-                                    file_name=path.split("\\")[-1].split("/")[-1],
-                                    mime="application/octet-stream",
-                                    key=f"mov_dl_{mov_id_sel}_{idx}"
-                                )
+                            st.download_button(
+                                label=f"Descargar archivo línea {idx+1}",
+                                data=adjuntos.leer(path, ubicaciones.get(path)),
+                                file_name=path.split("\\")[-1].split("/")[-1],
+                                mime="application/octet-stream",
+                                key=f"mov_dl_{mov_id_sel}_{idx}"
+                            )
                         except Exception:
                             st.warning(f"No se pudo leer el archivo: {path}")
             else:
@@ -612,3 +626,84 @@ with tab_detalle:
             st.warning("No se encontró la cabecera del movimiento.")
 
 
+# =====================================================
+# TAB 4: SINCRONIZACIÓN (diario local -> MySQL)
+# =====================================================
+with tab_sync:
+    st.subheader("Diario local")
+    st.caption("Los movimientos enviados se guardan primero en este servidor y se pasan a la BD en segundo plano.")
+
+    s1, s2, _ = st.columns([1.5, 1.5, 5])
+    with s1:
+        if st.button("Sincronizar ahora", key="mov_sync_ahora"):
+            n = DIARIO.sincronizar()
+            if n is None:
+                st.info("Ya hay una sincronización en curso; vuelve a mirar en unos segundos.")
+            else:
+                st.success(f"{n} movimientos sincronizados.")
+    with s2:
+        if st.button("Reintentar errores", key="mov_sync_reintentar"):
+            st.info(f"{DIARIO.reintentar_errores()} entradas vuelven a pendiente.")
+
+    estado = DIARIO.estado()
+    e1, e2, e3, e4 = st.columns(4)
+    e1.metric("Pendientes", estado["pendientes"])
+    e2.metric("Sincronizados", estado["sincronizados"])
+    e3.metric("Con error", estado["errores"])
+    antig = estado["pendiente_mas_antiguo_seg"]
+    e4.metric("Pendiente más antiguo", f"{antig:.0f} s" if antig is not None else "-")
+
+    # ---------- Entradas con error: corregir o descartar ----------
+    con_error = DIARIO.errores()
+    if con_error:
+        with st.container(border=True):
+            st.subheader("Entradas con error")
+            st.caption(
+                "La BD rechazó estos movimientos. Corrige los datos y vuelven a la cola, "
+                "o descártalos si no se van a guardar."
+            )
+            opciones = {
+                f'#{r["id"]} · {r["usuario"] or "-"} · {r["error"] or ""}'[:120]: r["id"] for r in con_error
+            }
+            sel = st.selectbox("Entrada", list(opciones), key="mov_sync_err_sel")
+            entrada = DIARIO.obtener(opciones[sel])
+            if entrada is not None:
+                st.error(entrada["error"] or "Error sin detalle")
+                datos_err = entrada["datos"]
+                fecha_corr = st.text_input(
+                    "Fecha y Hora", value=datos_err.get("fecha_hora", ""), key=f"mov_sync_fecha_{entrada['id']}"
+                )
+                with st.expander("Datos completos (JSON)"):
+                    texto_json = st.text_area(
+                        "Datos", value=json.dumps(datos_err, ensure_ascii=False, indent=2),
+                        height=300, key=f"mov_sync_json_{entrada['id']}", label_visibility="collapsed",
+                    )
+
+                c1, c2, _ = st.columns([1.8, 1.4, 5])
+                with c1:
+                    if st.button("💾 Corregir y reintentar", type="primary", key="mov_sync_corregir"):
+                        try:
+                            nuevos = json.loads(texto_json)
+                            if not isinstance(nuevos, dict):
+                                raise ValueError("Los datos deben ser un objeto JSON.")
+                            nuevos["fecha_hora"] = fecha_corr.strip()
+                            validar_movimiento(nuevos)
+                        except ValueError as e:    # JSONDecodeError también es ValueError
+                            st.error(str(e))
+                        else:
+                            DIARIO.corregir(entrada["id"], nuevos)
+                            st.rerun()
+                with c2:
+                    if st.button("🗑 Descartar", key="mov_sync_descartar"):
+                        DIARIO.descartar(entrada["id"])
+                        st.rerun()
+
+    ultimas = DIARIO.ultimas(50)
+    for r in ultimas:
+        r["creado"] = datetime.fromtimestamp(r["creado"]).strftime("%d/%m/%Y %H:%M:%S")
+        if r["sincronizado"]:
+            r["sincronizado"] = datetime.fromtimestamp(r["sincronizado"]).strftime("%d/%m/%Y %H:%M:%S")
+    st.dataframe(ultimas, use_container_width=True)
+
+
+perfil.mostrar_cascada("movimientos")
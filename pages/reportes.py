@@ -1,8 +1,12 @@
 from utils import apply_base_ui
 apply_base_ui()
 
+from datetime import date, datetime, timedelta
+
 import streamlit as st
 from auth import require_login, require_roles, sidebar_session
+from ge_db import listar_empresas, listar_bancos
+from reportes import DEFINICIONES, FORMATOS, MOTOR, nombre_archivo
 
 st.set_page_config(page_title="Reportes", layout="wide")
 
@@ -11,4 +15,122 @@ sidebar_session()
 require_roles("ADMIN", "CONTADOR")
 
 st.title("📈 Reportes")
-st.info("Aquí haremos informes, métricas, exportaciones, etc.")
+st.caption(
+    "Los reportes se generan en segundo plano y quedan guardados: mientras los "
+    "movimientos del período no cambien, se descargan al instante."
+)
+
+
+@st.cache_data(ttl=300)
+def load_empresas_bancos():
+    return listar_empresas(), listar_bancos()
+
+
+try:
+    empresas, bancos = load_empresas_bancos()
+except Exception as e:
+    st.error(f"No se pudo cargar empresas/bancos: {e}")
+    st.stop()
+
+empresas_map = {f'{e["nombre"]} (ID {e["id"]})': e for e in empresas}
+if not empresas_map:
+    st.info("No hay empresas habilitadas.")
+    st.stop()
+bancos_map = {"Todos": None} | {f'{b["nombre"]} (ID {b["id"]})': b for b in bancos}
+
+# Últimos 24 meses, el pasado primero (el mes en curso al final de la lista)
+mes = date.today().replace(day=1)
+periodos = []
+for _ in range(25):
+    periodos.append(f"{mes:%Y-%m}")
+    mes = (mes - timedelta(days=1)).replace(day=1)
+periodos = periodos[1:] + periodos[:1]
+
+with st.container(border=True):
+    c1, c2, c3, c4, c5 = st.columns([2, 3, 3, 1.5, 1.2])
+    with c1:
+        definicion = st.selectbox(
+            "Reporte", list(DEFINICIONES), format_func=lambda d: DEFINICIONES[d]["titulo"], key="rep_def"
+        )
+    with c2:
+        empresa_sel = st.selectbox("Empresa", list(empresas_map), key="rep_empresa")
+    with c3:
+        banco_sel = st.selectbox("Banco", list(bancos_map), key="rep_banco")
+    with c4:
+        periodo = st.selectbox("Período", periodos, key="rep_periodo")
+    with c5:
+        formato = st.selectbox("Formato", list(FORMATOS), format_func=str.upper, key="rep_formato")
+
+empresa = empresas_map[empresa_sel]
+banco = bancos_map[banco_sel]
+pedido = {
+    "definicion": definicion,
+    "empresa_id": empresa["id"],
+    "empresa": empresa["nombre"],
+    "banco_id": banco["id"] if banco else None,
+    "banco": banco["nombre"] if banco else None,
+    "periodo": periodo,
+    "formato": formato,
+}
+
+# Solo la firma del período (una consulta, en caché) para saber si ya está hecho
+try:
+    clave, ruta = MOTOR.buscar(pedido)
+except Exception as e:
+    st.error(f"No se pudo consultar el período: {e}")
+    st.stop()
+
+estado = "listo" if ruta else MOTOR.estado(clave, formato)
+
+if estado == "listo":
+    st.success("Reporte listo ✅")
+    with open(ruta, "rb") as f:
+        st.download_button(
+            label=f"Descargar {formato.upper()}",
+            data=f.read(),
+            file_name=nombre_archivo(pedido),
+            mime=FORMATOS[formato][0],
+            type="primary",
+            key="rep_descargar",
+        )
+elif estado == "en_curso":
+    st.info("⏳ Generando en segundo plano… puedes seguir usando la aplicación.")
+    if st.button("🔄 Actualizar", key="rep_actualizar"):
+        st.rerun()
+else:
+    if isinstance(estado, tuple):
+        st.error(f"El último intento falló: {estado[1]}")
+    if st.button("⚙️ Generar", type="primary", key="rep_generar"):
+        try:
+            MOTOR.pedir(pedido, clave)
+        except Exception as e:
+            st.error(f"No se pudo encolar el reporte: {e}")
+            st.stop()
+        st.rerun()
+
+# =====================================================
+# Recientes
+# =====================================================
+st.write("")
+st.subheader("Generados recientemente")
+recientes = MOTOR.recientes(limite=30)
+if not recientes:
+    st.caption("Todavía no hay reportes generados.")
+else:
+    st.dataframe(
+        [
+            {
+                "Reporte": DEFINICIONES.get(r["definicion"], {}).get("titulo", r["definicion"]),
+                "Empresa": r.get("empresa") or r["empresa_id"],
+                "Banco": r.get("banco") or "Todos",
+                "Período": r["periodo"],
+                "Formato": r["formato"].upper(),
+                "Filas": r.get("filas"),
+                "KB": round(r["bytes"] / 1024, 1),
+                "Generado": datetime.fromisoformat(r["generado"]).strftime("%d/%m/%Y %H:%M"),
+            }
+            for r in recientes
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
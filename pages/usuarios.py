@@ -1,12 +1,21 @@
 from utils import apply_base_ui
 apply_base_ui()
 
+import math
 import streamlit as st
-import pandas as pd
-import bcrypt
 
 from auth import require_login, sidebar_session, require_roles
-from ge_db import listar_roles, listar_usuarios, crear_usuario, set_usuario_activo, reset_password
+import perfil
+from limite_login import LIMITADOR
+import ge_db_async as adb
+from ge_db import (
+    listar_roles,
+    listar_usuarios_pagina,
+    version_usuarios,
+    crear_usuario,
+    set_usuario_activo,
+    reset_password,
+)
 
 # ✅ 1) Login primero (SIEMPRE)
 require_login()
@@ -22,10 +31,18 @@ rol = user.get("rol", st.session_state.get("rol", "CONSULTA"))
 
 st.title("👤 Gestión de Usuarios")
 
+POR_PAGINA = 50
+
+
+@st.cache_data(ttl=300)
+def load_roles():
+    return listar_roles()
+
+
 # --- Crear usuario ---
 st.subheader("➕ Crear usuario")
 
-roles = listar_roles()
+roles = load_roles()
 roles_map = {r["nombre"]: r["id"] for r in roles}
 rol_sel = st.selectbox("Rol", list(roles_map.keys()), index=0, key="usr_rol_sel")
 
@@ -49,6 +66,8 @@ if st.button("Crear usuario", type="primary", key="usr_crear_btn"):
         st.error("Las contraseñas no coinciden o están vacías.")
         st.stop()
 
+    import bcrypt
+
     pwd_hash = bcrypt.hashpw(pass1.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
     crear_usuario(
@@ -58,30 +77,91 @@ if st.button("Crear usuario", type="primary", key="usr_crear_btn"):
         rol_id=roles_map[rol_sel],
         activo=1 if activo == "Sí" else 0
     )
+    LIMITADOR.olvidar(username)   # por si estaba en la caché negativa del login
 
     st.success("✅ Usuario creado.")
     st.rerun()
 
 st.divider()
 
-# --- Listado ---
+# --- Listado (filtrado y paginado en la BD) ---
 st.subheader("📋 Usuarios")
 
-users = listar_usuarios()
-df = pd.DataFrame(users) if users else pd.DataFrame(columns=["id", "username", "nombre", "rol", "activo"])
-st.dataframe(df, use_container_width=True)
+f1, f2, f3 = st.columns([3, 2, 2])
+with f1:
+    texto = st.text_input("Buscar por usuario, nombre o rol", key="usr_buscar")
+with f2:
+    rol_filtro = st.selectbox("Rol", ["Todos"] + list(roles_map.keys()), key="usr_rol_filtro")
+with f3:
+    estado_filtro = st.selectbox("Estado", ["Todos", "Activos", "Inactivos"], key="usr_estado_filtro")
+
+filtros = (
+    texto.strip(),
+    None if rol_filtro == "Todos" else roles_map[rol_filtro],
+    {"Todos": None, "Activos": 1, "Inactivos": 0}[estado_filtro],
+)
+
+# Pila de cursores: usr_cursores[n] = antes_de de la página n+1 (la primera es None).
+# Al cambiar los filtros se vuelve a la primera página.
+if st.session_state.get("usr_filtros") != filtros:
+    st.session_state["usr_filtros"] = filtros
+    st.session_state["usr_cursores"] = [None]
+cursores = st.session_state["usr_cursores"]
+
+# Caché de la página actual (con índice por id) y del total: se reusa entre reruns
+# mientras no cambien filtros, página ni la versión de usuarios
+version = version_usuarios()
+clave_pagina = (filtros, cursores[-1], version)
+cache = st.session_state.get("usr_pagina")
+if cache is None or cache["clave"] != clave_pagina:
+    texto_f, rol_f, activo_f = filtros
+    necesita_total = (st.session_state.get("usr_total") or {}).get("clave") != (filtros, version)
+    with perfil.seccion("página de usuarios"):
+        if necesita_total:
+            (filas, siguiente), total = adb.ejecutar(
+                adb.listar_usuarios_pagina(texto_f, rol_f, activo_f, cursores[-1], POR_PAGINA),
+                adb.contar_usuarios(texto_f, rol_f, activo_f),
+            )
+            st.session_state["usr_total"] = {"clave": (filtros, version), "n": total}
+        else:
+            filas, siguiente = listar_usuarios_pagina(texto_f, rol_f, activo_f, cursores[-1], POR_PAGINA)
+    cache = {"clave": clave_pagina, "filas": filas, "siguiente": siguiente,
+             "por_id": {f["id"]: f for f in filas}}
+    st.session_state["usr_pagina"] = cache
+
+filas = cache["filas"]
+total = st.session_state["usr_total"]["n"]
+pagina = len(cursores)
+paginas = max(math.ceil(total / POR_PAGINA), 1)
+
+st.dataframe(
+    filas or {c: [] for c in ["id", "usuario", "nombre", "activo", "rol"]},
+    use_container_width=True,
+)
+
+p1, p2, p3, _ = st.columns([1, 2, 1, 6])
+with p1:
+    if st.button("◀", disabled=pagina <= 1, key="usr_prev"):
+        cursores.pop()
+        st.rerun()
+with p2:
+    st.write(f"Página {pagina} de {paginas} · {total} usuarios")
+with p3:
+    if st.button("▶", disabled=cache["siguiente"] is None, key="usr_next"):
+        cursores.append(cache["siguiente"])
+        st.rerun()
 
 # --- Acciones ---
 st.subheader("⚙️ Acciones")
 
-if df.empty:
-    st.info("No hay usuarios.")
+if not filas:
+    st.info("No hay usuarios con ese filtro.")
     st.stop()
 
-user_id = st.selectbox("Selecciona un usuario por ID", df["id"].tolist(), key="usr_user_id")
+user_id = st.selectbox("Selecciona un usuario por ID", list(cache["por_id"].keys()), key="usr_user_id")
 
-u = df[df["id"] == user_id].iloc[0].to_dict()
-st.write(f"**Usuario:** {u['username']} | **Rol:** {u['rol']} | **Activo:** {u['activo']}")
+u = cache["por_id"][user_id]
+st.write(f"**Usuario:** {u['usuario']} | **Rol:** {u['rol']} | **Activo:** {u['activo']}")
 
 c1, c2 = st.columns(2)
 
@@ -90,6 +170,7 @@ with c1:
     nuevo_estado = st.selectbox("Estado", ["Activar", "Desactivar"], index=0, key="usr_estado_sel")
     if st.button("Aplicar estado", key="usr_estado_btn"):
         set_usuario_activo(user_id, 1 if nuevo_estado == "Activar" else 0)
+        LIMITADOR.olvidar(u["usuario"])
         st.success("✅ Estado actualizado.")
         st.rerun()
 
@@ -102,7 +183,13 @@ with c2:
             st.error("Las contraseñas no coinciden o están vacías.")
             st.stop()
 
+        import bcrypt
+
         new_hash = bcrypt.hashpw(np1.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
         reset_password(user_id, new_hash)
+        LIMITADOR.olvidar_confianza(u["usuario"])
         st.success("✅ Contraseña actualizada.")
         st.rerun()
+
+
+perfil.mostrar_cascada("usuarios")
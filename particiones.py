@@ -0,0 +1,220 @@
+# particiones.py
+# Particionado mensual de movimientos / movimiento_detalle por fecha_hora y
+# archivado de años cerrados en tablas comprimidas.
+#
+#   python particiones.py extender --meses 12   (agrega meses futuros)
+#   python particiones.py archivar 2024         (mueve un año cerrado)
+#
+# El particionado inicial es la migración esquema/0005_particiones.py.
+#
+# Notas MySQL: la columna de partición debe estar en toda clave única, por eso
+# la PK pasa a (id, fecha_hora); InnoDB no admite FOREIGN KEY en tablas particionadas.
+import argparse
+import sys
+from datetime import date
+
+from ge_db import get_connection, anios_archivados
+
+TABLAS = ["movimientos", "movimiento_detalle"]
+TABLAS_MENSUALES = TABLAS + ["auditoria"]   # extender también crea los meses de la auditoría
+
+
+def _nombre_particion(anio, mes):
+    return f"p{anio}{mes:02d}"
+
+
+def _meses(desde_anio, hasta_anio):
+    for anio in range(desde_anio, hasta_anio + 1):
+        for mes in range(1, 13):
+            yield anio, mes
+
+
+def _siguiente_mes(anio, mes):
+    return (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def _def_particion(anio, mes):
+    sa, sm = _siguiente_mes(anio, mes)
+    return f"PARTITION {_nombre_particion(anio, mes)} VALUES LESS THAN ('{sa}-{sm:02d}-01')"
+
+
+def ddl_migrar(desde_anio, hasta_anio):
+    """Sentencias para particionar ambas tablas por mes (RANGE COLUMNS sobre fecha_hora)."""
+    particiones = ",\n    ".join(
+        [_def_particion(a, m) for a, m in _meses(desde_anio, hasta_anio)]
+        + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"]
+    )
+    return [
+        # Detalle: fecha denormalizada desde la cabecera
+        "ALTER TABLE movimiento_detalle ADD COLUMN fecha_hora DATETIME NULL AFTER movimiento_id",
+        """
+        UPDATE movimiento_detalle d
+        JOIN movimientos m ON m.id = d.movimiento_id
+        SET d.fecha_hora = m.fecha_hora
+        """,
+        "ALTER TABLE movimiento_detalle MODIFY fecha_hora DATETIME NOT NULL",
+        # PK compuesta (requisito del particionado)
+        "ALTER TABLE movimientos DROP PRIMARY KEY, ADD PRIMARY KEY (id, fecha_hora)",
+        "ALTER TABLE movimiento_detalle DROP PRIMARY KEY, ADD PRIMARY KEY (id, fecha_hora)",
+        f"ALTER TABLE movimientos PARTITION BY RANGE COLUMNS(fecha_hora) (\n    {particiones}\n)",
+        f"ALTER TABLE movimiento_detalle PARTITION BY RANGE COLUMNS(fecha_hora) (\n    {particiones}\n)",
+        """
+        CREATE TABLE IF NOT EXISTS archivo_periodos (
+            anio INT PRIMARY KEY,
+            movimientos INT NOT NULL,
+            archivado_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]
+
+
+def _particiones_existentes(cursor, tabla):
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME AS nombre
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        """,
+        (tabla,),
+    )
+    return {r["nombre"] for r in cursor.fetchall()}
+
+
+def extender(meses=12):
+    """Parte `pmax` para tener particiones hasta `meses` meses en el futuro."""
+    hoy = date.today()
+    objetivo = []
+    anio, mes = hoy.year, hoy.month
+    for _ in range(meses + 1):
+        objetivo.append((anio, mes))
+        anio, mes = _siguiente_mes(anio, mes)
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            for tabla in TABLAS_MENSUALES:
+                existentes = _particiones_existentes(cursor, tabla)
+                if not existentes:
+                    continue    # aún sin particionar (migración pendiente)
+                nuevas = [(a, m) for a, m in objetivo if _nombre_particion(a, m) not in existentes]
+                if not nuevas:
+                    continue
+                defs = ",\n    ".join(
+                    [_def_particion(a, m) for a, m in nuevas]
+                    + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"]
+                )
+                cursor.execute(f"ALTER TABLE {tabla} REORGANIZE PARTITION pmax INTO (\n    {defs}\n)")
+                print(f"{tabla}: {len(nuevas)} particiones nuevas")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _faltantes(cursor, tabla, lista):
+    """Filas de las particiones `lista` de `tabla` que todavía no están en el archivo."""
+    cursor.execute(
+        f"""
+        SELECT COUNT(*) AS n
+        FROM {tabla} PARTITION ({lista}) t
+        LEFT JOIN {tabla}_archivo a ON a.id = t.id AND a.fecha_hora = t.fecha_hora
+        WHERE a.id IS NULL
+        """
+    )
+    return cursor.fetchone()["n"]
+
+
+def archivar(anio):
+    """
+    Copia el año a las tablas *_archivo (ROW_FORMAT=COMPRESSED, sin particiones)
+    y elimina sus particiones mensuales (DROP PARTITION: sin DELETE fila a fila).
+
+    Se puede volver a correr si se cortó a mitad de camino: la copia es INSERT IGNORE
+    (lo ya copiado no choca con la PK) y solo se sueltan particiones que quedaron
+    enteras en el archivo. Hasta que el DROP termina, el año está en ambas tablas y
+    los lectores con UNION ALL lo cuentan dos veces: si el DROP falla, reintentar.
+    """
+    if int(anio) >= date.today().year:
+        raise ValueError(f"El año {anio} no está cerrado.")
+
+    nombres = [_nombre_particion(anio, m) for m in range(1, 13)]
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            for tabla in TABLAS:
+                cursor.execute("SHOW TABLES LIKE %s", (f"{tabla}_archivo",))
+                if cursor.fetchone():
+                    continue
+                cursor.execute(f"CREATE TABLE {tabla}_archivo LIKE {tabla}")
+                cursor.execute(f"ALTER TABLE {tabla}_archivo REMOVE PARTITIONING")
+                cursor.execute(f"ALTER TABLE {tabla}_archivo ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8")
+
+            # Por tabla: una pasada anterior pudo soltar las de una y no las de la otra
+            listas = {}
+            for tabla in TABLAS:
+                presentes = _particiones_existentes(cursor, tabla)
+                parts = [p for p in nombres if p in presentes]
+                if parts:
+                    listas[tabla] = ", ".join(parts)
+            if not listas:
+                print(f"No hay particiones de {anio} para archivar.")
+                return 0
+
+            # Detalle primero; todo en una transacción antes de soltar particiones
+            for tabla in reversed(TABLAS):
+                if tabla in listas:
+                    cursor.execute(
+                        f"INSERT IGNORE INTO {tabla}_archivo SELECT * FROM {tabla} PARTITION ({listas[tabla]})"
+                    )
+            cursor.execute(
+                "SELECT COUNT(*) AS n FROM movimientos_archivo WHERE fecha_hora >= %s AND fecha_hora < %s",
+                (date(int(anio), 1, 1), date(int(anio) + 1, 1, 1)),
+            )
+            n = cursor.fetchone()["n"]
+            cursor.execute(
+                """
+                INSERT INTO archivo_periodos (anio, movimientos) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE movimientos = VALUES(movimientos)
+                """,
+                (int(anio), n),
+            )
+            conn.commit()
+
+            # DROP PARTITION es DDL (commit implícito): solo si todo está entero en el
+            # archivo (un movimiento tardío entre la copia y acá lo impediría)
+            for tabla, lista in listas.items():
+                faltan = _faltantes(cursor, tabla, lista)
+                if faltan:
+                    raise RuntimeError(
+                        f"{tabla}: {faltan} filas de {anio} no están en {tabla}_archivo; "
+                        f"no se sueltan particiones. Vuelva a correr archivar {anio}."
+                    )
+            for tabla, lista in listas.items():
+                cursor.execute(f"ALTER TABLE {tabla} DROP PARTITION {lista}")
+
+        anios_archivados(refrescar=True)
+        print(f"Año {anio}: {n} movimientos archivados")
+        return n
+    finally:
+        conn.close()
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Particionado y archivo de movimientos")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("extender")
+    p.add_argument("--meses", type=int, default=12)
+
+    p = sub.add_parser("archivar")
+    p.add_argument("anio", type=int)
+
+    args = ap.parse_args(argv)
+    if args.cmd == "extender":
+        extender(args.meses)
+    else:
+        archivar(args.anio)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,155 @@
+# perfil.py
+# Perfilado por rerun de las páginas (opcional, lo activa un ADMIN para su sesión
+# desde la barra lateral).
+#
+#   with perfil.seccion("catálogos"):
+#       ...
+#   perfil.mostrar_cascada()     # al final de la página: cascada en la barra lateral
+#
+# Con el perfilado apagado `seccion` no mide nada (coste de una lectura de
+# session_state). "Capturar siguiente rerun" corre ese rerun bajo cProfile
+# (o pyinstrument si está instalado) y deja el resultado en data/perfiles/.
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+import metricas
+
+DIR_PERFILES = os.path.join("data", "perfiles")
+
+_CLAVE_ACTIVO = "_perfil_activo"
+_CLAVE_CAPTURA = "_perfil_capturar"
+_CLAVE_RERUN = "_perfil_rerun"
+_CLAVE_ULTIMA = "_perfil_ultima_captura"
+_CLAVE_T0 = "_rerun_t0"
+
+
+def activo() -> bool:
+    return bool(st.session_state.get(_CLAVE_ACTIVO))
+
+
+def iniciar_rerun():
+    """Marca el inicio del rerun (lo llama require_login, el punto común de todas las páginas)."""
+    st.session_state[_CLAVE_T0] = time.perf_counter()   # duración del rerun para metricas
+
+    # Un rerun cortado (st.stop / st.rerun) no llega a mostrar_cascada: soltar su perfilador
+    previo = st.session_state.pop(_CLAVE_RERUN, None)
+    if previo and previo["perfilador"]:
+        tipo, p = previo["perfilador"]
+        p.stop() if tipo == "pyinstrument" else p.disable()
+
+    if not activo():
+        return
+    rerun = {"pagina": "", "t0": time.perf_counter(), "secciones": [], "perfilador": None}
+
+    motor = st.session_state.pop(_CLAVE_CAPTURA, None)
+    if motor == "pyinstrument":
+        from pyinstrument import Profiler
+
+        rerun["perfilador"] = ("pyinstrument", Profiler())
+        rerun["perfilador"][1].start()
+    elif motor == "cProfile":
+        import cProfile
+
+        rerun["perfilador"] = ("cProfile", cProfile.Profile())
+        rerun["perfilador"][1].enable()
+
+    st.session_state[_CLAVE_RERUN] = rerun
+
+
+@contextmanager
+def seccion(nombre: str):
+    rerun = st.session_state.get(_CLAVE_RERUN)
+    if rerun is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun["secciones"].append((nombre, t - rerun["t0"], time.perf_counter() - t))
+
+
+def _cerrar_captura(rerun):
+    tipo, p = rerun["perfilador"]
+    os.makedirs(DIR_PERFILES, exist_ok=True)
+    base = os.path.join(DIR_PERFILES, f"rerun_{datetime.now():%Y%m%d_%H%M%S}_{rerun['pagina'] or 'pagina'}")
+
+    if tipo == "pyinstrument":
+        p.stop()
+        ruta = base + ".html"
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(p.output_html())
+        resumen = p.output_text(unicode=True, color=False)
+    else:
+        import io
+        import pstats
+
+        p.disable()
+        ruta = base + ".prof"
+        p.dump_stats(ruta)
+        buf = io.StringIO()
+        pstats.Stats(p, stream=buf).sort_stats("cumulative").print_stats(30)
+        resumen = buf.getvalue()
+
+    st.session_state[_CLAVE_ULTIMA] = (ruta, resumen)
+
+
+def _barra(nombre, inicio, dur, total):
+    izq = 100 * inicio / total if total else 0
+    ancho = max(100 * dur / total if total else 0, 0.5)
+    return (
+        f'<div style="font-size:12px;margin:2px 0;">{nombre} · {dur * 1000:.1f} ms'
+        f'<div style="background:#e2e8f0;height:8px;border-radius:4px;">'
+        f'<div style="margin-left:{izq:.1f}%;width:{ancho:.1f}%;height:8px;'
+        f'background:#0f172a;border-radius:4px;"></div></div></div>'
+    )
+
+
+def mostrar_cascada(pagina: str = ""):
+    """Cierra el rerun y dibuja la cascada de secciones en la barra lateral."""
+    t0 = st.session_state.pop(_CLAVE_T0, None)
+    if t0 is not None:
+        metricas.observar("ge_rerun_segundos", time.perf_counter() - t0, pagina=pagina or "-")
+
+    rerun = st.session_state.pop(_CLAVE_RERUN, None)
+    if rerun is None:
+        return
+    rerun["pagina"] = pagina
+    total = time.perf_counter() - rerun["t0"]
+    if rerun["perfilador"]:
+        _cerrar_captura(rerun)
+
+    medido = sum(d for _, _, d in rerun["secciones"])
+    filas = [_barra(n, i, d, total) for n, i, d in rerun["secciones"]]
+    filas.append(_barra("resto (widgets, render, sin sección)", 0, max(total - medido, 0), total))
+
+    with st.sidebar:
+        with st.expander(f"⏱ Rerun: {total * 1000:.0f} ms", expanded=True):
+            st.markdown("".join(filas), unsafe_allow_html=True)
+            ultima = st.session_state.get(_CLAVE_ULTIMA)
+            if ultima:
+                ruta, resumen = ultima
+                st.caption(f"Última captura: {ruta}")
+                with open(ruta, "rb") as f:
+                    st.download_button("Descargar perfil", f.read(), file_name=os.path.basename(ruta),
+                                       key="perfil_descargar")
+                st.code(resumen[:6000])
+
+
+def controles():
+    """Interruptor y captura en la barra lateral (solo lo llama sidebar_session para ADMIN)."""
+    st.checkbox("⏱ Perfilar reruns", key=_CLAVE_ACTIVO)
+    if activo():
+        import importlib.util
+
+        motores = ["cProfile"]
+        if importlib.util.find_spec("pyinstrument"):
+            motores.append("pyinstrument")
+        motor = st.selectbox("Perfilador", motores, key="_perfil_motor")
+        if st.button("Capturar siguiente rerun", key="_perfil_capturar_btn"):
+            st.session_state[_CLAVE_CAPTURA] = motor
+            st.rerun()
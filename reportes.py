@@ -0,0 +1,442 @@
+# reportes.py
+# Motor de reportes: cada reporte (definición x empresa/banco x mes x formato) se
+# arma en un pool de procesos, fuera del proceso de Streamlit, y el archivo queda
+# en una caché por contenido:
+#
+# - Clave = sha256(definición + versión, parámetros, formato, firma de los datos).
+#   La firma (ge_db.firma_reporte: cantidad, último id y totales del período) cambia
+#   cuando entra un movimiento en el período, así que un reporte viejo nunca se
+#   sirve: deja de ser alcanzable y limpiar() lo borra con el tiempo.
+# - data/reportes/<clave[:2]>/<clave>.<ext> (+ .json con los datos del pedido): si
+#   el archivo está, se sirve sin generar nada. Se escribe a un temporal y se
+#   renombra, así nunca se lee uno a medias.
+# - MOTOR.pedir() (página, a demanda) y `python reportes.py programados` (cron, p.
+#   ej. el día 1 de cada mes) generan con el mismo pool.
+#
+#   python reportes.py programados [--periodo 2026-09] [--formatos xlsx,pdf,csv]
+#   python reportes.py limpiar [--max-mb 500]
+#
+# XLSX con openpyxl y PDF con reportlab: se importan solo en el proceso que genera.
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+
+import metricas
+from dinero import a_unidades
+from ge_db import (
+    firma_reporte,
+    listar_empresas,
+    reporte_cuentas,
+    reporte_movimientos,
+    version_catalogos,
+)
+
+DIR_REPORTES = os.path.join("data", "reportes")
+PROCESOS = int(os.environ.get("GE_REPORTES_PROCESOS", str(min(4, os.cpu_count() or 1))))
+MAX_MB = 500
+
+
+def rango_periodo(periodo):
+    """'AAAA-MM' -> (primer día, último día)."""
+    anio, mes = (int(x) for x in str(periodo)[:7].split("-"))
+    desde = date(anio, mes, 1)
+    return desde, (desde + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+# ---- Definiciones ----
+# armar(empresa_id, banco_id, desde, hasta) -> {"columnas": [(nombre, tipo)], "filas": [tupla]}
+# tipo: "texto" | "entero" | "fecha" | "cent" (centavos; se muestran en unidades y se totalizan)
+# Subir "version" al cambiar lo que arma una definición: cambia la clave de sus reportes.
+def _armar_movimientos(empresa_id, banco_id, desde, hasta):
+    filas = reporte_movimientos(empresa_id, desde, hasta, banco_id)
+    return {
+        "columnas": [
+            ("ID", "entero"), ("Fecha", "fecha"), ("Cliente", "texto"), ("Banco", "texto"),
+            ("Débito", "cent"), ("Crédito", "cent"),
+        ],
+        "filas": [
+            (r["id"], r["fecha_hora"], r["cliente"] or "", r["banco"] or "",
+             r["total_debito_cent"], r["total_credito_cent"])
+            for r in filas
+        ],
+    }
+
+
+def _armar_cuentas(empresa_id, banco_id, desde, hasta):
+    filas = reporte_cuentas(empresa_id, desde, hasta, banco_id)
+    return {
+        "columnas": [
+            ("Cuenta", "entero"), ("Nombre", "texto"), ("Líneas", "entero"),
+            ("Débito", "cent"), ("Crédito", "cent"),
+        ],
+        "filas": [
+            (r["cuenta"], r["nombre"] or "", r["lineas"], r["debito_cent"], r["credito_cent"])
+            for r in filas
+        ],
+    }
+
+
+DEFINICIONES = {
+    "movimientos": {"titulo": "Movimientos del mes", "armar": _armar_movimientos, "version": 1},
+    "cuentas": {"titulo": "Resumen por cuenta", "armar": _armar_cuentas, "version": 1},
+}
+
+
+# ---- Formatos ----
+def _totales(reporte):
+    cent = [i for i, (_, tipo) in enumerate(reporte["columnas"]) if tipo == "cent"]
+    if not cent:
+        return None
+    return {i: sum(int(f[i] or 0) for f in reporte["filas"]) for i in cent}
+
+
+def _texto(valor, tipo):
+    if tipo == "cent":
+        return f"{a_unidades(valor):.2f}"
+    if tipo == "fecha" and isinstance(valor, (date, datetime)):
+        return valor.strftime("%d/%m/%Y %H:%M")
+    return "" if valor is None else str(valor)
+
+
+def _csv(reporte, ruta):
+    tipos = [t for _, t in reporte["columnas"]]
+    totales = _totales(reporte)
+    with open(ruta, "w", newline="", encoding="utf-8-sig") as f:    # BOM: Excel lo abre en utf-8
+        w = csv.writer(f)
+        w.writerow([n for n, _ in reporte["columnas"]])
+        for fila in reporte["filas"]:
+            w.writerow([_texto(v, t) for v, t in zip(fila, tipos)])
+        if totales:
+            w.writerow(["Total" if i == 0 else _texto(totales[i], "cent") if i in totales else ""
+                        for i in range(len(tipos))])
+
+
+def _xlsx(reporte, ruta):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    tipos = [t for _, t in reporte["columnas"]]
+    totales = _totales(reporte)
+    wb = Workbook(write_only=True)     # fila a fila, sin tener toda la hoja en memoria
+    ws = wb.create_sheet(reporte["titulo"][:31])
+
+    def celda(valor, tipo, negrita=False):
+        if tipo == "cent":
+            c = WriteOnlyCell(ws, a_unidades(valor))
+            c.number_format = "#,##0.00"
+        elif tipo == "fecha":
+            c = WriteOnlyCell(ws, valor)
+            c.number_format = "dd/mm/yyyy hh:mm"
+        else:
+            c = WriteOnlyCell(ws, valor)
+        if negrita:
+            c.font = Font(bold=True)
+        return c
+
+    ws.append([reporte["titulo"]])
+    ws.append([reporte["subtitulo"]])
+    ws.append([])
+    ws.append([celda(n, "texto", negrita=True) for n, _ in reporte["columnas"]])
+    for fila in reporte["filas"]:
+        ws.append([celda(v, t) for v, t in zip(fila, tipos)])
+    if totales:
+        ws.append([
+            celda("Total", "texto", True) if i == 0 else celda(totales[i], "cent", True) if i in totales else None
+            for i in range(len(tipos))
+        ])
+    wb.save(ruta)
+
+
+def _pdf(reporte, ruta):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    tipos = [t for _, t in reporte["columnas"]]
+    totales = _totales(reporte)
+    datos = [[n for n, _ in reporte["columnas"]]]
+    datos += [[_texto(v, t) for v, t in zip(fila, tipos)] for fila in reporte["filas"]]
+    if totales:
+        datos.append(["Total" if i == 0 else _texto(totales[i], "cent") if i in totales else ""
+                      for i in range(len(tipos))])
+
+    estilo = [
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.black),
+    ]
+    estilo += [("ALIGN", (i, 0), (i, -1), "RIGHT") for i, t in enumerate(tipos) if t in ("cent", "entero")]
+    if totales:
+        estilo += [("LINEABOVE", (0, -1), (-1, -1), 0.5, colors.black),
+                   ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold")]
+
+    hojas = getSampleStyleSheet()
+    doc = SimpleDocTemplate(ruta, pagesize=landscape(A4), title=reporte["titulo"])
+    doc.build([
+        Paragraph(reporte["titulo"], hojas["Title"]),
+        Paragraph(reporte["subtitulo"], hojas["Normal"]),
+        Table(datos, repeatRows=1, style=TableStyle(estilo)),
+    ])
+
+
+FORMATOS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _xlsx),
+    "pdf": ("application/pdf", _pdf),
+    "csv": ("text/csv", _csv),
+}
+
+
+# ---- Generación (corre en un proceso del pool) ----
+def nombre_archivo(pedido):
+    banco = f"_banco{pedido['banco_id']}" if pedido.get("banco_id") is not None else ""
+    return f"{pedido['definicion']}_emp{pedido['empresa_id']}{banco}_{pedido['periodo']}.{pedido['formato']}"
+
+
+def _generar(pedido, ruta):
+    """Arma el reporte y lo deja en `ruta` (+ ruta.json). Devuelve (bytes, segundos)."""
+    t = time.perf_counter()
+    d = DEFINICIONES[pedido["definicion"]]
+    desde, hasta = rango_periodo(pedido["periodo"])
+    reporte = d["armar"](pedido["empresa_id"], pedido.get("banco_id"), desde, hasta)
+    reporte["titulo"] = d["titulo"]
+    reporte["subtitulo"] = (
+        f"{pedido.get('empresa') or 'Empresa ' + str(pedido['empresa_id'])}"
+        + (f" · {pedido['banco']}" if pedido.get("banco") else "")
+        + f" · {pedido['periodo']} · generado {datetime.now():%d/%m/%Y %H:%M}"
+    )
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        FORMATOS[pedido["formato"]][1](reporte, tmp)
+        with open(tmp + ".json", "w", encoding="utf-8") as f:
+            json.dump({**pedido, "filas": len(reporte["filas"]), "generado": datetime.now().isoformat()},
+                      f, ensure_ascii=False)
+        # El .json primero: quien ve el archivo ya encuentra sus datos
+        os.replace(tmp + ".json", ruta + ".json")
+        os.replace(tmp, ruta)
+    finally:
+        for p in (tmp, tmp + ".json"):
+            if os.path.exists(p):
+                os.remove(p)
+    return os.path.getsize(ruta), time.perf_counter() - t
+
+
+# ---- Motor ----
+class MotorReportes:
+    def __init__(self, directorio=DIR_REPORTES, procesos=PROCESOS):
+        self.directorio = directorio
+        self.procesos = procesos
+        self._ejecutor = None
+        self._lock = threading.Lock()
+        self._en_curso = {}      # clave -> Future (compartido por las sesiones del proceso)
+        self._errores = {}       # clave -> mensaje del último intento fallido
+
+    def _pool(self):
+        """El pool de procesos (con self._lock tomado); se crea en el primer pedido."""
+        if self._ejecutor is None:
+            # spawn: los procesos no heredan hilos ni conexiones de Streamlit
+            self._ejecutor = ProcessPoolExecutor(
+                max_workers=self.procesos, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._ejecutor
+
+    def _descartar_pool(self, pool):
+        """Un worker murió (OOM, kill): el pool queda roto; el próximo pedido arma otro."""
+        if self._ejecutor is pool:
+            self._ejecutor = None
+            pool.shutdown(wait=False)
+
+    def clave(self, pedido):
+        desde, hasta = rango_periodo(pedido["periodo"])
+        firma = firma_reporte(pedido["empresa_id"], desde, hasta, pedido.get("banco_id"))
+        contenido = [
+            pedido["definicion"], DEFINICIONES[pedido["definicion"]]["version"],
+            pedido["empresa_id"], pedido.get("banco_id"), pedido["periodo"], pedido["formato"],
+            firma, version_catalogos(),
+        ]
+        return hashlib.sha256(json.dumps(contenido, default=str).encode()).hexdigest()
+
+    def ruta(self, clave, formato):
+        return os.path.join(self.directorio, clave[:2], f"{clave}.{formato}")
+
+    def buscar(self, pedido):
+        """(clave, ruta del archivo o None si hay que generarlo)."""
+        clave = self.clave(pedido)
+        ruta = self.ruta(clave, pedido["formato"])
+        if os.path.exists(ruta):
+            metricas.contar("ge_reportes_cache_total", resultado="acierto")
+            os.utime(ruta)      # para limpiar(): los más usados quedan
+            return clave, ruta
+        metricas.contar("ge_reportes_cache_total", resultado="fallo")
+        return clave, None
+
+    def pedir(self, pedido, clave=None):
+        """Encola la generación si no está hecha ni en curso. Devuelve la clave."""
+        clave = clave or self.clave(pedido)
+        ruta = self.ruta(clave, pedido["formato"])
+        with self._lock:
+            # Dos sesiones pidiendo el mismo reporte: se genera una vez
+            if os.path.exists(ruta) or clave in self._en_curso:
+                return clave
+            pool = self._pool()
+            try:
+                futuro = pool.submit(_generar, pedido, ruta)
+            except BrokenProcessPool:
+                self._descartar_pool(pool)
+                pool = self._pool()
+                futuro = pool.submit(_generar, pedido, ruta)
+            self._en_curso[clave] = futuro
+            self._errores.pop(clave, None)
+        futuro.add_done_callback(lambda f: self._terminado(clave, pedido["formato"], f, pool))
+        return clave
+
+    def _terminado(self, clave, formato, futuro, pool):
+        with self._lock:
+            self._en_curso.pop(clave, None)
+            error = futuro.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._descartar_pool(pool)
+                self._errores[clave] = "El proceso que generaba el reporte terminó de forma inesperada."
+            elif error is not None:
+                self._errores[clave] = str(error) or type(error).__name__
+        if error is not None:
+            metricas.contar("ge_reportes_errores_total", formato=formato)
+            return
+        _, segundos = futuro.result()
+        metricas.contar("ge_reportes_generados_total", formato=formato)
+        metricas.observar("ge_reportes_segundos", segundos, formato=formato)
+
+    def estado(self, clave, formato):
+        """Uno de: "listo", "en_curso", ("error", mensaje) o None (nunca pedido)."""
+        if os.path.exists(self.ruta(clave, formato)):
+            return "listo"
+        with self._lock:
+            if clave in self._en_curso:
+                return "en_curso"
+            if clave in self._errores:
+                return "error", self._errores[clave]
+        return None
+
+    def esperar(self, timeout=None):
+        with self._lock:
+            futuros = list(self._en_curso.values())
+        wait(futuros, timeout=timeout)
+
+    def errores(self):
+        with self._lock:
+            return dict(self._errores)
+
+    def en_curso(self):
+        with self._lock:
+            return len(self._en_curso)
+
+    def recientes(self, limite=20):
+        """Datos (.json) de los últimos reportes generados, más nuevos primero."""
+        if not os.path.isdir(self.directorio):
+            return []
+        metas = []
+        for sub in os.scandir(self.directorio):
+            if sub.is_dir():
+                metas += [e for e in os.scandir(sub.path) if e.name.endswith(".json")]
+        metas.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        out = []
+        for e in metas[:limite]:
+            ruta = e.path[: -len(".json")]
+            if not os.path.exists(ruta):
+                continue
+            with open(e.path, encoding="utf-8") as f:
+                out.append({**json.load(f), "ruta": ruta, "bytes": os.path.getsize(ruta)})
+        return out
+
+    def limpiar(self, max_bytes=MAX_MB * 1024 * 1024):
+        """Borra los reportes menos usados (mtime) hasta quedar bajo `max_bytes`."""
+        if not os.path.isdir(self.directorio):
+            return 0
+        archivos = []
+        for sub in os.scandir(self.directorio):
+            if sub.is_dir():
+                archivos += [
+                    (e.stat().st_mtime, e.stat().st_size, e.path)
+                    for e in os.scandir(sub.path)
+                    if not e.name.endswith((".json", ".tmp"))
+                ]
+        total = sum(n for _, n, _ in archivos)
+        borrados = 0
+        for _, n, ruta in sorted(archivos):
+            if total <= max_bytes:
+                break
+            for p in (ruta, ruta + ".json"):
+                if os.path.exists(p):
+                    os.remove(p)
+            total -= n
+            borrados += 1
+        return borrados
+
+
+MOTOR = MotorReportes()
+
+
+def _metricas_reportes():
+    return [("ge_reportes_en_curso", {}, MOTOR.en_curso())]
+
+
+metricas.registrar_recolector(_metricas_reportes)
+
+
+# ---- Programados ----
+def programados(periodo=None, formatos=("xlsx", "pdf", "csv"), definiciones=None):
+    """Todas las definiciones x empresas habilitadas x formatos del mes (por defecto el pasado)."""
+    if periodo is None:
+        periodo = f"{(date.today().replace(day=1) - timedelta(days=1)):%Y-%m}"
+    pedidos = 0
+    for emp in listar_empresas():
+        for definicion in definiciones or DEFINICIONES:
+            for formato in formatos:
+                pedido = {
+                    "definicion": definicion, "empresa_id": emp["id"], "empresa": emp["nombre"],
+                    "banco_id": None, "periodo": periodo, "formato": formato,
+                }
+                clave, ruta = MOTOR.buscar(pedido)
+                if ruta is None:
+                    MOTOR.pedir(pedido, clave)
+                    pedidos += 1
+    MOTOR.esperar()
+    return pedidos
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Reportes por empresa y período")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("programados")
+    p.add_argument("--periodo", help="AAAA-MM (por defecto el mes pasado)")
+    p.add_argument("--formatos", default="xlsx,pdf,csv")
+
+    p = sub.add_parser("limpiar")
+    p.add_argument("--max-mb", type=int, default=MAX_MB)
+
+    args = ap.parse_args(argv)
+    if args.cmd == "programados":
+        t = time.perf_counter()
+        n = programados(args.periodo, tuple(f.strip() for f in args.formatos.split(",") if f.strip()))
+        print(f"{n} reportes generados en {time.perf_counter() - t:.1f} s ({MOTOR.procesos} procesos)")
+        for clave, error in MOTOR.errores().items():
+            print(f"ERROR {clave[:12]}: {error}")
+    else:
+        print(f"{MOTOR.limpiar(args.max_mb * 1024 * 1024)} reportes borrados")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,6 +1,10 @@
+from functools import lru_cache
+
 import streamlit as st
 
-def apply_base_ui(hide_nav: bool = False):
+@lru_cache(maxsize=None)
+def _css_base(hide_nav: bool) -> str:
+    """El bloque <style> se arma una vez por proceso, no en cada rerun."""
     base = """
     header {visibility: hidden;}
     .block-container { padding-top: 2rem; }
@@ -25,4 +29,61 @@ def apply_base_ui(hide_nav: bool = False):
         }
         """
 
-    st.markdown(f"<style>{base}{hide}</style>", unsafe_allow_html=True)
+    return f"<style>{base}{hide}</style>"
+
+
+def apply_base_ui(hide_nav: bool = False):
+    st.markdown(_css_base(bool(hide_nav)), unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=None)
+def _html_topbar(seccion: str) -> str:
+    return f"""
+    <style>
+      .topbar {{
+        background:#0f172a;
+        padding:12px 18px;
+        border-radius:12px;
+        color:white;
+        font-weight:700;
+        display:flex;
+        justify-content:space-between;
+        align-items:center;
+      }}
+      .topbar small{{opacity:.8;font-weight:600;}}
+    </style>
+    <div class="topbar">
+      <div>GESTION ENTERPRISE</div>
+      <small>{seccion}</small>
+    </div>
+    """
+
+
+def topbar(seccion: str):
+    st.markdown(_html_topbar(seccion), unsafe_allow_html=True)
+
+
+def selector_catalogo(label: str, indice, key: str, limite: int = 20):
+    """
+    Selector con búsqueda: un text_input filtra el índice y el selectbox
+    solo recibe los primeros `limite` resultados (no todo el catálogo).
+    Devuelve la etiqueta elegida o "Seleccione".
+    """
+    q = st.text_input(
+        f"Buscar {label.lower()}",
+        key=f"{key}_q",
+        placeholder=f"Buscar {label.lower()}...",
+        label_visibility="collapsed",
+    )
+    opts = indice.buscar(q, limite=limite)
+
+    # Mantener la selección actual aunque ya no esté entre los resultados
+    actual = st.session_state.get(key)
+    if actual and actual != "Seleccione" and actual not in opts and indice.fila(actual):
+        opts = [actual] + opts
+
+    opts = ["Seleccione"] + opts
+    if actual not in opts:
+        st.session_state.pop(key, None)
+
+    return st.selectbox(label, opts, key=key)